@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Concurrent page fetcher for runningintheusa.com
+Keeps several listing pages in flight at once under a per-host rate budget
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from pagination import PagePlan
+from race_scraper import RaceScraper, DEFAULT_BASE_URL, DEFAULT_DISTANCE
+
+
+class TokenBucket:
+    """Token bucket that limits how often requests may start"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second (requests per second)
+            burst: Maximum number of tokens that can be saved up (default: 1)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """Per-host request budget: requests per second plus maximum concurrency"""
+
+    def __init__(self, requests_per_second: float = 1.0, max_concurrency: int = 4, burst: int = 1):
+        """
+        Initialize the limiter
+
+        Args:
+            requests_per_second: Sustained request rate allowed per host (default: 1.0)
+            max_concurrency: Maximum requests in flight per host (default: 4)
+            burst: Requests that may start back to back after an idle period (default: 1)
+        """
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def limit(self, url: str):
+        """Hold a concurrency slot and a rate token for the URL's host"""
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            self._semaphores[host] = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphores[host]:
+            await self._buckets[host].acquire()
+            yield
+
+
+class AsyncRaceScraper:
+    """Fetches listing pages concurrently, returning races in page order"""
+
+    def __init__(self, scraper: RaceScraper = None, requests_per_second: float = 1.0,
+                 max_concurrency: int = 4, burst: int = 1, use_cloudscraper: bool = True,
+                 base_url: str = DEFAULT_BASE_URL):
+        """
+        Initialize the async scraper
+
+        Args:
+            scraper: RaceScraper whose session and parsing are reused (created if omitted)
+            requests_per_second: Per-host request rate budget (default: 1.0)
+            max_concurrency: Maximum page requests in flight per host (default: 4)
+            burst: Requests that may start back to back after an idle period (default: 1)
+            use_cloudscraper: Passed to RaceScraper when one is created
+            base_url: Passed to RaceScraper when one is created
+        """
+        self.scraper = scraper or RaceScraper(use_cloudscraper=use_cloudscraper, base_url=base_url)
+        self.max_concurrency = max_concurrency
+        self.limiter = HostRateLimiter(requests_per_second, max_concurrency, burst)
+        # requests is blocking, so each in-flight page runs on its own worker thread
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def scrape_page_async(self, url: str) -> List[Dict[str, str]]:
+        """
+        Scrape a single page once the host's rate budget allows it
+
+        Args:
+            url: The URL to scrape
+
+        Returns:
+            List of dictionaries containing race information
+        """
+        races, _ = await self.fetch_listing_async(url)
+        return races
+
+    async def fetch_listing_async(self, url: str) -> Tuple[List[Dict[str, str]], Optional[bytes]]:
+        """Scrape a single page once the host's rate budget allows it, also returning its HTML"""
+        waiting = time.perf_counter()
+        async with self.limiter.limit(url):
+            self.scraper.metrics.observe('rate_limit_wait', time.perf_counter() - waiting)
+            loop = asyncio.get_running_loop()
+            # The rate limiter replaces the scraper's random per-request delay
+            return await loop.run_in_executor(self._executor, self.scraper.fetch_listing, url, False)
+
+    async def iter_races_async(self, start_date: str, end_date: str, max_pages: int = 20, plan: PagePlan = None,
+                               distance: str = DEFAULT_DISTANCE) -> AsyncIterator[Dict[str, str]]:
+        """
+        Yield races within a date range as soon as the next page in order arrives
+
+        Page 1 is fetched first. If it links to the listing's other pages, exactly
+        those pages are requested, max_concurrency at a time. Otherwise pages are
+        requested in order through a sliding window and pagination stops at the
+        first empty or short page, as in RaceScraper.scrape_date_range; requests
+        already started for later pages are discarded. No new page is requested
+        while the consumer is busy with the previous one, so at most
+        max_concurrency pages are buffered.
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape (default: 20)
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+
+        Yields:
+            Race dictionaries in page order
+        """
+        plan = plan or PagePlan(max_pages)
+        pages: Dict[int, List[Dict[str, str]]] = {}
+        pending: Dict[asyncio.Future, int] = {}
+        next_page = 1
+        next_to_yield = 1
+
+        try:
+            while next_to_yield <= plan.last_page:
+                # Until page 1 has shown the page count, only it is requested
+                window = self.max_concurrency if 1 in plan.observed else 1
+                while next_page <= plan.last_page and len(pending) < window:
+                    url = self.scraper.build_url(start_date, end_date, next_page, distance)
+                    pending[asyncio.ensure_future(self.fetch_listing_async(url))] = next_page
+                    next_page += 1
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = pending.pop(task)
+                    races, content = task.result()
+                    plan.observe(page, races, content, failed=content is None)
+                    pages[page] = races
+                    if races:
+                        self.scraper.metrics.count('pages')
+                        self.scraper.metrics.count('races', len(races))
+                    print(f"Found {len(races)} races on page {page}")
+
+                # Drop requests for pages past the end of the listing
+                for task, page in list(pending.items()):
+                    if page > plan.last_page:
+                        task.cancel()
+                        del pending[task]
+
+                while next_to_yield <= plan.last_page and next_to_yield in pages:
+                    for race in pages.pop(next_to_yield):
+                        yield race
+                    next_to_yield += 1
+
+            if plan.truncated or plan.incomplete:
+                print(plan.summary())
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def scrape_date_range_async(self, start_date: str, end_date: str, max_pages: int = 20,
+                                      plan: PagePlan = None,
+                                      distance: str = DEFAULT_DISTANCE) -> List[Dict[str, str]]:
+        """
+        Scrape all races within a date range, fetching pages concurrently
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape (default: 20)
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+
+        Returns:
+            List of all races found, in page order
+        """
+        print(f"Starting concurrent scrape for dates: {start_date} to {end_date}")
+        print(f"Maximum pages: {max_pages}, concurrency: {self.max_concurrency}")
+        print("-" * 60)
+
+        with self.scraper.metrics.timer('scrape'):
+            all_races = [race async for race in self.iter_races_async(start_date, end_date, max_pages, plan, distance)]
+
+        print(f"Total races: {len(all_races)}")
+        print("-" * 60)
+        return all_races
+
+    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20,
+                          plan: PagePlan = None, distance: str = DEFAULT_DISTANCE) -> List[Dict[str, str]]:
+        """Blocking wrapper around scrape_date_range_async"""
+        return asyncio.run(self.scrape_date_range_async(start_date, end_date, max_pages, plan, distance))
+
+    def export_to_excel(self, races: List[Dict[str, str]], filename: str = None) -> str:
+        """Export races to an Excel file"""
+        return self.scraper.export_to_excel(races, filename)
+
+    def close(self):
+        """Shut down the worker threads"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
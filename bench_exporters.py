@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the race exporters
+Writes N synthetic races in each format and reports wall time and peak RSS.
+Each format runs in its own process so peak memory is measured separately.
+
+Usage:
+    python bench_exporters.py [--races 100000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+FORMATS = ['csv', 'jsonl', 'parquet', 'xlsx', 'pandas-xlsx']
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_one(fmt: str, count: int, directory: str) -> dict:
+    """Export count races in one format and measure it"""
+    from fake_site import generate_races
+
+    baseline_mb = peak_rss_mb()
+    started = time.perf_counter()
+
+    if fmt == 'pandas-xlsx':
+        from race_scraper import RaceScraper
+        filename = RaceScraper(use_cloudscraper=False).export_to_excel(
+            list(generate_races(count)), os.path.join(directory, 'races_pandas.xlsx'))
+    else:
+        from exporters import export_races
+        filename = export_races(generate_races(count), os.path.join(directory, 'races'), fmt)
+
+    return {
+        'format': fmt,
+        'races': count,
+        'seconds': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'baseline_rss_mb': round(baseline_mb, 1),
+        'file_mb': round(os.path.getsize(filename) / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--races', type=int, default=100000, help='number of races to export')
+    parser.add_argument('--format', choices=FORMATS, help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.format:
+        # Child process: run a single format and report back as JSON
+        result = run_one(args.format, args.races, args.directory)
+        print('BENCH ' + json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'format':<12} {'seconds':>8} {'peak RSS MB':>12} {'file MB':>8}")
+        for fmt in FORMATS:
+            output = subprocess.run(
+                [sys.executable, __file__, '--races', str(args.races), '--format', fmt, '--directory', directory],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.split('BENCH ', 1)[1])
+            print(f"{fmt:<12} {result['seconds']:>8.2f} {result['peak_rss_mb']:>12.1f} {result['file_mb']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the scraping engines and listing parsers
+Scrapes synthetic listings of 10 to 10,000 races per page from a local
+FakeRaceSite with every engine and parser, then parses a corpus of listing
+pages (the same synthetic pages plus any recorded pages in fixtures/) with
+every parser. The site can add latency and answer some requests with 429 or
+5xx. Each engine case runs in its own process so peak memory is measured
+separately.
+
+Results are saved as bench_results/<commit>.json so runs can be compared
+across commits.
+
+Usage:
+    python bench_scraper.py [--sizes 10,100,1000,10000] [--pages 5] [--latency 0.01]
+                            [--throttle-rate 0.02] [--error-rate 0.02]
+    python bench_scraper.py --compare HEAD~1
+    python bench_scraper.py --record 01-31-2026 02-01-2026
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from bench_exporters import peak_rss_mb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, 'fixtures')
+RESULTS_DIR = os.path.join(HERE, 'bench_results')
+
+ENGINES = ['requests', 'async']
+PARSERS = ['bs4', 'lxml']
+SIZES = [10, 100, 1000, 10000]
+RANGE = ("01-01-2026", "12-31-2026")
+
+# Metrics compared between runs, and whether a higher value is better
+COMPARED = {
+    'us_per_item': False,
+    'pages_per_sec': True,
+    'races_per_sec': True,
+    'peak_rss_mb': False,
+    'export_seconds': False,
+}
+
+
+def corpus(sizes: List[int]) -> Dict[str, bytes]:
+    """Listing pages to parse: one synthetic page per size plus every recorded fixture"""
+    from fake_site import make_races, render_listing_page
+
+    pages = {f"synthetic-{size}": render_listing_page(make_races(size)).encode('utf-8') for size in sizes}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, 'rb') as f:
+            pages[f"fixture-{os.path.splitext(os.path.basename(path))[0]}"] = f.read()
+    return pages
+
+
+def bench_parser(parser_name: str, page: str, content: bytes, min_seconds: float = 0.2) -> dict:
+    """Parse one page repeatedly and report the best time per race"""
+    from parsers import get_parser
+
+    parser = get_parser(parser_name)
+    items = len(parser.parse(content))
+    best = float('inf')
+    rounds = 0
+    started = time.perf_counter()
+    while rounds < 3 or time.perf_counter() - started < min_seconds:
+        round_started = time.perf_counter()
+        parser.parse(content)
+        best = min(best, time.perf_counter() - round_started)
+        rounds += 1
+
+    return {
+        'page': page,
+        'parser': parser_name,
+        'items': items,
+        'bytes': len(content),
+        'rounds': rounds,
+        'ms_per_page': round(best * 1000, 3),
+        'us_per_item': round(best / items * 1e6, 3) if items else None,
+    }
+
+
+def run_engine_case(engine: str, parser: str, size: int, pages: int, latency: float = 0.0,
+                    throttle_rate: float = 0.0, error_rate: float = 0.0, export_format: str = 'csv',
+                    directory: str = None) -> dict:
+    """
+    Scrape pages * size races from a local fake site with one engine and parser
+
+    Returns:
+        Dictionary of throughput, request, memory and export measurements
+    """
+    from exporters import export_races
+    from fake_site import FakeRaceSite, make_races
+    from metrics import Metrics
+    from race_scraper import RaceScraper
+
+    races = make_races(size * pages)
+    metrics = Metrics()
+    baseline_mb = peak_rss_mb()
+
+    with FakeRaceSite(races, page_size=size, pagination=True, latency=latency, throttle_rate=throttle_rate,
+                      error_rate=error_rate, retry_after=0) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, parser=parser, metrics=metrics)
+        started = time.perf_counter()
+        if engine == 'async':
+            from async_scraper import AsyncRaceScraper
+            with AsyncRaceScraper(scraper, requests_per_second=1000, max_concurrency=4) as async_scraper:
+                scraped = async_scraper.scrape_date_range(*RANGE, max_pages=pages + 1)
+        else:
+            scraped, _ = scraper.paginate(*RANGE, max_pages=pages + 1, delay=False)
+        seconds = time.perf_counter() - started
+        status_counts = dict(site.status_counts)
+
+    with tempfile.TemporaryDirectory(dir=directory) as output_dir:
+        started = time.perf_counter()
+        export_races(scraped, os.path.join(output_dir, 'races'), export_format)
+        export_seconds = time.perf_counter() - started
+
+    counters = metrics.counters
+    return {
+        'engine': engine,
+        'parser': parser,
+        'size': size,
+        'pages': pages,
+        'races': len(scraped),
+        'complete': len(scraped) == len(races),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(pages / seconds, 2),
+        'races_per_sec': round(len(scraped) / seconds, 1),
+        'requests': int(counters.get('requests', 0)),
+        'retries': int(counters.get('retries', 0)),
+        'status_counts': {str(status): count for status, count in sorted(status_counts.items())},
+        'parse_seconds': round(metrics.stages['parse'].sum, 3) if 'parse' in metrics.stages else None,
+        'export_format': export_format,
+        'export_seconds': round(export_seconds, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'baseline_rss_mb': round(baseline_mb, 1),
+    }
+
+
+def current_commit() -> str:
+    """Short hash of HEAD, marked -dirty when the working tree has changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def save_results(results: dict, directory: str = RESULTS_DIR) -> str:
+    """Store a run as <directory>/<commit>.json"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{results['commit']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def load_results(reference: str, directory: str = RESULTS_DIR) -> dict:
+    """Load a stored run from a file path, a commit hash or any git revision"""
+    if not os.path.exists(reference):
+        path = os.path.join(directory, f"{reference}.json")
+        if not os.path.exists(path):
+            commit = subprocess.run(['git', 'rev-parse', '--short', reference], cwd=HERE,
+                                    capture_output=True, text=True).stdout.strip()
+            path = os.path.join(directory, f"{commit}.json")
+        reference = path
+    with open(reference, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _case_key(row: dict) -> tuple:
+    if 'engine' in row:
+        return ('engine', row['engine'], row['parser'], row['size'])
+    return ('parser', row['parser'], row['page'])
+
+
+def compare(current: dict, previous: dict, threshold: float = 0.1) -> List[dict]:
+    """
+    Compare matching cases of two runs
+
+    Args:
+        current: The new run
+        previous: The run to compare against
+        threshold: Relative change that counts as a regression (default: 10%)
+
+    Returns:
+        One entry per case and metric: the old and new values, the relative change,
+        and whether it got worse by more than threshold
+    """
+    before = {_case_key(row): row for row in previous['parsers'] + previous['engines']}
+    changes = []
+    for row in current['parsers'] + current['engines']:
+        old = before.get(_case_key(row))
+        if not old:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            if not row.get(metric) or not old.get(metric):
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            changes.append({
+                'case': ' '.join(str(part) for part in _case_key(row)[1:]),
+                'metric': metric,
+                'before': old[metric],
+                'after': row[metric],
+                'change': round(change, 4),
+                'regression': worse > threshold,
+            })
+    return changes
+
+
+def print_comparison(changes: List[dict], previous: dict):
+    print(f"\nCompared with {previous['commit']} ({previous['created']}):")
+    for change in changes:
+        flag = '  REGRESSION' if change['regression'] else ''
+        print(f"  {change['case']:<28} {change['metric']:<15} {change['before']:>10g} -> "
+              f"{change['after']:>10g} ({change['change']:+.1%}){flag}")
+
+
+def record_fixtures(start_date: str, end_date: str, max_pages: int = 3) -> List[str]:
+    """Save live listing pages into fixtures/ so later runs parse real markup"""
+    from race_scraper import RaceScraper
+
+    scraper = RaceScraper()
+    saved = []
+    for page in range(1, max_pages + 1):
+        races, content = scraper.fetch_listing(scraper.build_url(start_date, end_date, page))
+        if not content:
+            break
+        path = os.path.join(FIXTURES, f"recorded_{start_date}_{end_date}_page-{page}.html")
+        with open(path, 'wb') as f:
+            f.write(content)
+        print(f"Saved {len(races)} races to {path}")
+        saved.append(path)
+        if not races:
+            break
+    return saved
+
+
+def run_engine_in_child(case: dict, directory: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, '--case', json.dumps(case), '--directory', directory],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.split('BENCH ', 1)[1])
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='races per page, comma separated')
+    parser.add_argument('--pages', type=int, default=5, help='pages per engine case (default: 5)')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='engines to run, comma separated')
+    parser.add_argument('--parsers', default=','.join(PARSERS), help='parsers to run, comma separated')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the site waits per request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--export', default='csv', help='export format timed after each scrape (default: csv)')
+    parser.add_argument('--results', default=RESULTS_DIR, help='directory for stored runs')
+    parser.add_argument('--compare', metavar='REF', help='compare with a stored run (commit, revision or path)')
+    parser.add_argument('--no-save', action='store_true', help="don't store this run")
+    parser.add_argument('--record', nargs=2, metavar=('START', 'END'),
+                        help='save live listing pages for a date range into fixtures/ and exit')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # Child process: run a single engine case and report back as JSON
+        result = run_engine_case(directory=args.directory, **json.loads(args.case))
+        print('BENCH ' + json.dumps(result))
+        return
+
+    if args.record:
+        record_fixtures(*args.record)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    parsers = args.parsers.split(',')
+    engines = args.engines.split(',')
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f"unknown engine '{name}'; browser engines need Chrome and are not benchmarked")
+
+    results = {
+        'commit': current_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'sizes': sizes, 'pages': args.pages, 'latency': args.latency,
+                     'throttle_rate': args.throttle_rate, 'error_rate': args.error_rate, 'export': args.export},
+        'parsers': [],
+        'engines': [],
+    }
+
+    # Engine cases run first, while this process is still small: children inherit its peak RSS
+    print(f"{'engine':<9} {'parser':<6} {'size':>6} {'pages/s':>8} {'races/s':>9} {'retries':>7} "
+          f"{'peak MB':>8} {'export s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for engine in engines:
+            for name in parsers:
+                for size in sizes:
+                    case = {'engine': engine, 'parser': name, 'size': size, 'pages': args.pages,
+                            'latency': args.latency, 'throttle_rate': args.throttle_rate,
+                            'error_rate': args.error_rate, 'export_format': args.export}
+                    row = run_engine_in_child(case, directory)
+                    results['engines'].append(row)
+                    flag = '' if row['complete'] else '  incomplete'
+                    print(f"{engine:<9} {name:<6} {size:>6} {row['pages_per_sec']:>8.1f} "
+                          f"{row['races_per_sec']:>9.0f} {row['retries']:>7} {row['peak_rss_mb']:>8.1f} "
+                          f"{row['export_seconds']:>8.2f}{flag}")
+
+    print(f"\n{'page':<34} {'parser':<6} {'items':>6} {'ms/page':>9} {'µs/item':>9}")
+    for page, content in corpus(sizes).items():
+        for name in parsers:
+            row = bench_parser(name, page, content)
+            results['parsers'].append(row)
+            print(f"{page:<34} {name:<6} {row['items']:>6} {row['ms_per_page']:>9.2f} "
+                  f"{row['us_per_item'] or 0:>9.2f}")
+
+    if not args.no_save:
+        print(f"\nSaved results to {save_results(results, args.results)}")
+    if args.compare:
+        previous = load_results(args.compare, args.results)
+        print_comparison(compare(results, previous), previous)
+
+
+if __name__ == '__main__':
+    main()
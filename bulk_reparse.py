@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Bulk re-parse of an HtmlArchive across processes
+Parsing listing HTML is CPU-bound, so one process only ever uses one core.
+This spreads the archived pages over a process pool in chunks: each worker
+reads its pages straight from the memory-mapped segments, parses them and
+sends back the races as one compact JSON payload. Results are merged in the
+order the pages sit in the archive, whatever order the chunks finish in.
+Only listing pages are parsed; race detail pages kept by enrichment and
+archived error or challenge pages are skipped.
+
+Usage:
+    python bulk_reparse.py .race_archive --output races.csv [--workers 8] [--parser lxml]
+                           [--chunk-size 256] [--all-versions]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from html_archive import HtmlArchive, RecordLocation, SegmentReader
+from parsers import get_parser
+
+# Listing URLs end in their page number, e.g. .../10k-to-100m/page-2; race detail pages don't
+LISTING_PATH = re.compile(r'(?:^|/)page-\d+/?$')
+
+
+def is_listing_url(url: str) -> bool:
+    """Whether an archived URL is a listing page (rather than a race detail page)"""
+    return LISTING_PATH.search(urlsplit(url).path) is not None
+
+
+class ChunkResult(NamedTuple):
+    """What a worker sends back for one chunk of pages"""
+    index: int
+    worker: int  # process id
+    seconds: float
+    pages: int
+    html_bytes: int
+    errors: int
+    payload: bytes  # JSON {"fields": [...], "pages": [[row, ...], ...]}, rows in field order
+
+
+# Set once per worker process by _init_worker
+_parser = None
+_reader: Optional[SegmentReader] = None
+
+
+def _init_worker(parser_name: str):
+    global _parser, _reader
+    _parser = get_parser(parser_name)
+    _reader = SegmentReader()
+
+
+def parse_chunk(index: int, locations: List[RecordLocation]) -> ChunkResult:
+    """
+    Read and parse one chunk of archived pages in a worker process
+
+    Field names are sent once per chunk and each race as a list of values,
+    so the payload stays small however many races the chunk holds.
+
+    Args:
+        index: Position of the chunk, used to merge the results in order
+        locations: Where the chunk's pages sit in the archive's segments
+
+    Returns:
+        ChunkResult with the races of every page, in page order
+    """
+    started = time.perf_counter()
+    fields: Dict[str, int] = {}
+    pages = []
+    html_bytes = errors = 0
+    for location in locations:
+        try:
+            body = _reader.read(location.path, location.codec, location.offset, location.size, location.raw_size)
+            html_bytes += len(body)
+            races = _parser.parse(body)
+        except Exception as e:
+            # A corrupt record or unparseable page costs that page, not the run
+            print(f"Error parsing {location.url}: {e}", file=sys.stderr)
+            errors += 1
+            races = []
+        rows = []
+        for race in races:
+            for field in race:
+                fields.setdefault(field, len(fields))
+            rows.append([race.get(field) for field in fields])
+        pages.append(rows)
+
+    payload = json.dumps({'fields': list(fields), 'pages': pages}, ensure_ascii=False,
+                         separators=(',', ':')).encode('utf-8')
+    return ChunkResult(index, os.getpid(), time.perf_counter() - started, len(locations), html_bytes,
+                       errors, payload)
+
+
+def decode_chunk(result: ChunkResult) -> List[List[Dict[str, str]]]:
+    """Races per page from a chunk's payload"""
+    data = json.loads(result.payload)
+    fields = data['fields']
+    return [[{field: value for field, value in zip(fields, row) if value is not None} for row in rows]
+            for rows in data['pages']]
+
+
+class BulkReparser:
+    """Re-parses every page of an archive on a process pool"""
+
+    def __init__(self, archive_path: str, parser: str = 'lxml', workers: int = None,
+                 chunk_size: int = 256, latest: bool = True):
+        """
+        Args:
+            archive_path: HtmlArchive directory
+            parser: Listing parser backend, 'bs4' or 'lxml' (default: 'lxml')
+            workers: Worker processes (default: one per CPU core)
+            chunk_size: Pages handed to a worker at a time (default: 256)
+            latest: Only the most recent copy of each URL (default: True)
+        """
+        if not os.path.isdir(archive_path):
+            raise FileNotFoundError(f"No archive at {archive_path}")
+        get_parser(parser)  # reject unknown parsers before starting any process
+        self.archive_path = archive_path
+        self.parser = parser
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.latest = latest
+        self.stats = {'pages': 0, 'races': 0, 'errors': 0, 'chunks': 0, 'skipped': 0, 'error_pages': 0,
+                      'seconds': 0.0}
+        # Per worker process: chunks, pages, html_bytes, seconds spent parsing
+        self.worker_stats: Dict[int, Dict[str, float]] = {}
+
+    def run(self) -> Iterator[Tuple[RecordLocation, List[Dict[str, str]]]]:
+        """
+        Parse the archive, yielding each page as soon as every page before it is done
+
+        At most two chunks per worker are in flight or waiting to be yielded,
+        so memory stays flat on archives of any size.
+
+        Yields:
+            (location, races) for every listing page, in archive order
+        """
+        with HtmlArchive(self.archive_path) as archive:
+            archived = archive.locations(self.latest)
+        # Detail pages and error or challenge pages would only come back as empty listings
+        listings = [location for location in archived if is_listing_url(location.url)]
+        locations = [location for location in listings if location.status < 400]
+        self.stats['skipped'] = len(archived) - len(listings)
+        self.stats['error_pages'] = len(listings) - len(locations)
+        chunks = [locations[start:start + self.chunk_size]
+                  for start in range(0, len(locations), self.chunk_size)]
+        print(f"Re-parsing {len(locations)} pages in {len(chunks)} chunks with {self.workers} workers")
+
+        started = time.perf_counter()
+        finished: Dict[int, ChunkResult] = {}
+        pending = {}
+        next_chunk = next_to_yield = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.parser,)) as pool:
+            while next_to_yield < len(chunks):
+                while next_chunk < len(chunks) and len(pending) + len(finished) < self.workers * 2:
+                    pending[pool.submit(parse_chunk, next_chunk, chunks[next_chunk])] = next_chunk
+                    next_chunk += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    result = future.result()
+                    finished[result.index] = result
+                    self._record(result)
+
+                while next_to_yield in finished:
+                    result = finished.pop(next_to_yield)
+                    for location, races in zip(chunks[next_to_yield], decode_chunk(result)):
+                        self.stats['races'] += len(races)
+                        yield location, races
+                    next_to_yield += 1
+
+        self.stats['seconds'] = time.perf_counter() - started
+
+    def races(self) -> Iterator[Dict[str, str]]:
+        """Every race in the archive, in archive order"""
+        for _, races in self.run():
+            yield from races
+
+    def _record(self, result: ChunkResult):
+        worker = self.worker_stats.setdefault(result.worker, {'chunks': 0, 'pages': 0, 'html_bytes': 0,
+                                                              'seconds': 0.0})
+        worker['chunks'] += 1
+        worker['pages'] += result.pages
+        worker['html_bytes'] += result.html_bytes
+        worker['seconds'] += result.seconds
+        self.stats['chunks'] += 1
+        self.stats['pages'] += result.pages
+        self.stats['errors'] += result.errors
+
+    def report(self) -> str:
+        """Overall and per-worker throughput"""
+        seconds = self.stats['seconds'] or 1e-9
+        lines = [f"{self.stats['pages']} pages, {self.stats['races']} races in {self.stats['seconds']:.2f}s "
+                 f"({self.stats['pages'] / seconds:.0f} pages/s, {len(self.worker_stats)} workers, "
+                 f"{self.stats['errors']} errors, {self.stats['skipped']} detail pages and "
+                 f"{self.stats['error_pages']} error pages skipped)"]
+        for pid, worker in sorted(self.worker_stats.items()):
+            busy = worker['seconds'] or 1e-9
+            lines.append(f"  worker {pid}: {worker['chunks']} chunks, {worker['pages']} pages, "
+                         f"{worker['pages'] / busy:.0f} pages/s, {worker['html_bytes'] / busy / 1e6:.1f} MB/s "
+                         f"of HTML (busy {worker['seconds']:.2f}s)")
+        return '\n'.join(lines)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archive', help='HtmlArchive directory')
+    parser.add_argument('--output', '-o', help='export the races here (default: only report throughput)')
+    parser.add_argument('--format', choices=('csv', 'jsonl', 'parquet', 'xlsx'),
+                        help='output format (default: from --output)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU core)')
+    parser.add_argument('--parser', choices=('bs4', 'lxml'), default='lxml', help='HTML parser (default: lxml)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='pages per worker task (default: 256)')
+    parser.add_argument('--all-versions', action='store_true',
+                        help='parse every archived copy of a page, not just the latest')
+    args = parser.parse_args(argv)
+
+    try:
+        reparser = BulkReparser(args.archive, args.parser, args.workers, args.chunk_size,
+                                latest=not args.all_versions)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if args.output:
+        from exporters import export_races
+        export_races(reparser.races(), args.output, args.format)
+    else:
+        for _ in reparser.run():
+            pass
+    print(reparser.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Checkpoint journal for long scrapes
+Appends every completed page to a JSON Lines file as soon as it is parsed,
+so an interrupted scrape can resume without fetching those pages again
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from pagination import PaginationInfo
+
+DEFAULT_CHECKPOINT = '.scrape_checkpoint.jsonl'
+
+
+class CompletedPage(NamedTuple):
+    """A page recorded in the journal"""
+    page: int
+    races: List[Dict[str, str]]
+    pagination: PaginationInfo
+    parsed_with: Optional[str] = None  # parser option the races were parsed with, e.g. 'links'
+
+
+class Checkpoint:
+    """Append-only journal of completed pages, keyed by page URL"""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT, resume: bool = True):
+        """
+        Open the journal
+
+        Args:
+            path: JSON Lines file to append to (default: .scrape_checkpoint.jsonl)
+            resume: Reuse pages already in the file; False starts a fresh journal
+        """
+        self.path = path
+        self.pages: Dict[str, CompletedPage] = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            # A crash mid-write leaves at most one partial line at the end. Cut it off,
+            # or the next record would be appended to it and be unreadable too.
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+
+        for line in data[:end].decode('utf-8', errors='replace').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self.pages[entry['url']] = CompletedPage(
+                entry['page'], entry['races'], PaginationInfo(*entry.get('pagination', (None, None))),
+                entry.get('parsed_with'))
+        if self.pages:
+            races = sum(len(completed.races) for completed in self.pages.values())
+            print(f"Resuming from {self.path}: {len(self.pages)} pages, {races} races already scraped")
+
+    def lookup(self, url: str) -> Optional[CompletedPage]:
+        """The journal entry for a page, or None if it hasn't been completed"""
+        return self.pages.get(url)
+
+    def record(self, url: str, page: int, races: List[Dict[str, str]], pagination: PaginationInfo = None,
+               parsed_with: str = None):
+        """
+        Append a completed page and flush it to disk
+
+        Args:
+            url: Page URL
+            page: Page number
+            races: Races parsed from the page
+            pagination: What the page said about the listing's size
+            parsed_with: Parser option the races depend on, e.g. 'links' (default: none)
+        """
+        pagination = pagination or PaginationInfo(None, None)
+        entry = {'url': url, 'page': page, 'races': races, 'pagination': list(pagination), 'at': time.time()}
+        if parsed_with:
+            entry['parsed_with'] = parsed_with
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pages[url] = CompletedPage(page, races, pagination, parsed_with)
+
+    def close(self):
+        """Close the journal, keeping the file if any page was recorded"""
+        if not self._file.closed:
+            self._file.close()
+        if not self.pages and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def remove(self):
+        """Close and delete the journal once its scrape has been saved"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def checkpoint_options(argv: Sequence[str] = None) -> argparse.Namespace:
+    """
+    Read --resume and --checkpoint from the command line, ignoring other arguments
+
+    Returns:
+        Namespace with resume (bool) and checkpoint (journal path)
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip pages already recorded in the checkpoint journal')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT,
+                        help=f'Checkpoint journal file (default: {DEFAULT_CHECKPOINT})')
+    options, _ = parser.parse_known_args(argv)
+    return options
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Race de-duplication
+Drops repeated races from overlapping scrapes, including copies whose names
+are spelled slightly differently
+"""
+
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from race_model import parse_listing_date, parse_location
+
+STOPWORDS = frozenset({'a', 'an', 'and', 'the', 'of'})
+
+_TOKEN = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Reduce a name to lower-case words, so '5K & 10K Run' and '5k/10k run' match
+
+    Accents, punctuation and filler words ('and', 'the', ...) are dropped.
+    """
+    text = unicodedata.normalize('NFKD', name.casefold())
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(token for token in _TOKEN.findall(text) if token not in STOPWORDS)
+
+
+def trigrams(text: str) -> frozenset:
+    """Character trigrams of a normalized string, padded at both ends"""
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two trigram sets (1.0 means identical)"""
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class DedupReport:
+    """Which races were dropped as copies of another, and why"""
+
+    def __init__(self):
+        self.total = 0
+        self.exact: List[Tuple[Dict[str, str], Dict[str, str]]] = []
+        self.fuzzy: List[Tuple[Dict[str, str], Dict[str, str], float]] = []
+
+    @property
+    def merged(self) -> int:
+        """Number of races dropped"""
+        return len(self.exact) + len(self.fuzzy)
+
+    def summary(self) -> str:
+        return (f"{self.total - self.merged} unique of {self.total} races "
+                f"({len(self.exact)} exact and {len(self.fuzzy)} fuzzy duplicates merged)")
+
+
+def prefix_length(size: int, threshold: float) -> int:
+    """
+    How many of a set's sorted trigrams to index or probe
+
+    Two sets with Jaccard similarity >= threshold always share a trigram within
+    these prefixes, so only races sharing one need a full comparison.
+    """
+    return size - math.ceil(threshold * size) + 1
+
+
+class _Entry:
+    """A kept race with the normalized values it is compared on; trigrams are rebuilt when needed"""
+
+    __slots__ = ('race', 'name', 'city', 'size')
+
+    def __init__(self, race: Dict[str, str], name: str, city: str, size: int):
+        self.race = race
+        self.name = name
+        self.city = city
+        self.size = size
+
+
+class Deduplicator:
+    """
+    Keeps the first copy of each race
+
+    Every race is first looked up by an exact normalized key. If that misses,
+    it is compared only with races kept for the same date and state that
+    mention the same numbers (its block), and within the block only with
+    races sharing a trigram from the prefix of its sorted trigrams, so the
+    work stays close to linear in the number of races. Races match when both
+    their names and cities are similar enough.
+    """
+
+    def __init__(self, threshold: float = 0.8, fuzzy: bool = True):
+        """
+        Args:
+            threshold: Trigram similarity (0-1) names and cities need to count as the same race
+            fuzzy: Also merge near-identical names; False merges exact normalized matches only
+        """
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.races: List[Dict[str, str]] = []
+        self.report = DedupReport()
+        self._keys: Dict[Tuple[str, str, str, str], Dict[str, str]] = {}
+        self._blocks: Dict[Tuple[str, str, str], Dict[str, List[_Entry]]] = {}
+
+    def _match(self, postings: Dict[str, List[_Entry]], name_grams: frozenset,
+               prefix: List[str], city: str) -> Optional[Tuple[_Entry, float]]:
+        candidates = {id(kept): kept for gram in prefix for kept in postings.get(gram, ())}
+
+        best = None
+        size = len(name_grams)
+        for kept in candidates.values():
+            # Sets whose sizes differ this much can't reach the threshold
+            if not self.threshold * size <= kept.size <= size / self.threshold:
+                continue
+            if kept.city != city and similarity(trigrams(kept.city), trigrams(city)) < self.threshold:
+                continue
+            score = similarity(trigrams(kept.name), name_grams)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (kept, score)
+        return best
+
+    def add(self, race: Dict[str, str]) -> bool:
+        """
+        Add a race
+
+        Returns:
+            True if it was kept, False if it duplicates a race already added
+        """
+        self.report.total += 1
+        parsed_date = parse_listing_date(race['Date'])
+        day = parsed_date.isoformat() if parsed_date else normalize_name(race['Date'])
+        city, state = parse_location(race['Location'])
+        city = normalize_name(city)
+        state = state or ''
+        name = normalize_name(race['Race Name'])
+
+        key = (day, state, city, name)
+        original = self._keys.get(key)
+        if original is not None:
+            self.report.exact.append((original, race))
+            return False
+
+        if self.fuzzy:
+            # Names must mention the same numbers, so '5K' and '10K' editions stay apart
+            numbers = ' '.join(sorted(token for token in name.split() if any(c.isdigit() for c in token)))
+            postings = self._blocks.setdefault((day, state, numbers), {})
+            name_grams = trigrams(name)
+            prefix = sorted(name_grams)[:prefix_length(len(name_grams), self.threshold)]
+            match = self._match(postings, name_grams, prefix, city)
+            if match is not None:
+                kept, score = match
+                self._keys[key] = kept.race
+                self.report.fuzzy.append((kept.race, race, score))
+                return False
+
+            entry = _Entry(race, name, city, len(name_grams))
+            for gram in prefix:
+                postings.setdefault(gram, []).append(entry)
+
+        self._keys[key] = race
+        self.races.append(race)
+        return True
+
+    def extend(self, races: Iterable[Dict[str, str]]):
+        """Add several races"""
+        for race in races:
+            self.add(race)
+
+
+def deduplicate(races: Iterable[Dict[str, str]], threshold: float = 0.8,
+                fuzzy: bool = True) -> Tuple[List[Dict[str, str]], DedupReport]:
+    """
+    Drop repeated races, keeping the first copy of each in the original order
+
+    Args:
+        races: Races from one or more scrapes
+        threshold: Trigram similarity (0-1) names and cities need to count as the same race
+        fuzzy: Also merge near-identical names; False merges exact normalized matches only
+
+    Returns:
+        (unique races, DedupReport of what was merged)
+    """
+    deduplicator = Deduplicator(threshold, fuzzy)
+    deduplicator.extend(races)
+    return deduplicator.races, deduplicator.report
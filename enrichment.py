@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Race detail enrichment
+Listing pages only give a race's date, name and location. Each race links to a
+detail page with its distances, start time and registration link. This
+fetches those pages through a bounded queue with per-host limits and attaches
+their fields to the races. Parsed details are kept in SQLite. Detail pages
+rarely change, so later runs skip races whose details are already known.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from async_scraper import HostRateLimiter
+from race_scraper import RaceScraper
+
+DETAIL_FIELDS = ['Distances', 'Start Time', 'Registration URL']
+
+# Label on the detail page (lower case, without the colon) -> field it fills
+DETAIL_LABELS = {
+    'distance': 'Distances',
+    'distances': 'Distances',
+    'events': 'Distances',
+    'start time': 'Start Time',
+    'start': 'Start Time',
+    'time': 'Start Time',
+    'registration': 'Registration URL',
+    'register': 'Registration URL',
+}
+
+
+class DetailParser:
+    """Reads the labelled fields of a race detail page (table rows or a definition list)"""
+
+    def __init__(self):
+        from lxml import etree
+
+        self._rows = etree.XPath('//tr[th and td] | //dl/dt[following-sibling::dd]')
+        self._links = etree.XPath('//a[@href]')
+
+    def parse(self, content: bytes) -> Dict[str, str]:
+        """
+        Extract the detail fields of a race
+
+        Args:
+            content: Raw HTML of the detail page
+
+        Returns:
+            The DETAIL_FIELDS found on the page; missing ones are left out
+        """
+        import lxml.html
+        from lxml import etree
+
+        try:
+            document = lxml.html.document_fromstring(content)
+        except etree.ParserError:
+            return {}
+
+        details = {}
+        for row in self._rows(document):
+            if row.tag == 'tr':
+                label, value = row.find('th'), row.find('td')
+            else:
+                label, value = row, row.getnext()
+            field = DETAIL_LABELS.get(label.text_content().strip().rstrip(':').strip().lower())
+            if field is None or field in details:
+                continue
+            if field == 'Registration URL':
+                link = value.find('.//a[@href]')
+                text = link.get('href') if link is not None else value.text_content()
+            else:
+                text = value.text_content()
+            text = ' '.join(text.split())
+            if text:
+                details[field] = text
+
+        if 'Registration URL' not in details:
+            # Some pages only have a "Register" button outside the table
+            for link in self._links(document):
+                if 'regist' in link.text_content().lower():
+                    details['Registration URL'] = link.get('href')
+                    break
+        return details
+
+
+class DetailCache:
+    """Parsed race details on disk, keyed by detail page URL"""
+
+    def __init__(self, path: str = '.race_details.sqlite', ttl: float = 30 * 24 * 3600):
+        """
+        Open (or create) the cache
+
+        Args:
+            path: SQLite file holding the details (default: .race_details.sqlite)
+            ttl: Seconds a race's details are reused before the page is fetched again (default: 30 days)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        # Enrichment workers store details from their threads, so one connection is shared under a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS details ('
+            ' url TEXT PRIMARY KEY,'
+            ' fields TEXT NOT NULL,'
+            ' fetched_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def lookup(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        The details of a race, unless they are missing or older than the TTL
+
+        Args:
+            url: The race's detail page URL
+
+        Returns:
+            Dictionary of detail fields, or None
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT fields, fetched_at FROM details WHERE url = ?', (url,)).fetchone()
+            if row is None or time.time() - row[1] >= self.ttl:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def store(self, url: str, fields: Dict[str, str]):
+        """Keep the details parsed from a race's detail page"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO details VALUES (?, ?, ?)',
+                               (url, json.dumps(fields), time.time()))
+            self._conn.commit()
+            self.stats['stored'] += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM details').fetchone()[0]
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
+
+
+class RaceEnricher:
+    """Fetches race detail pages concurrently and merges their fields into the races"""
+
+    def __init__(self, scraper: RaceScraper = None, cache: DetailCache = None, max_concurrency: int = 8,
+                 requests_per_second: float = 4.0, per_host: int = 4, burst: int = 1, queue_size: int = None):
+        """
+        Initialize the enricher
+
+        Args:
+            scraper: RaceScraper whose session, retries and metrics are used (created if omitted)
+            cache: Optional DetailCache; races it already has details for are not fetched again
+            max_concurrency: Detail pages fetched at once across all hosts (default: 8)
+            requests_per_second: Request rate budget per host (default: 4.0)
+            per_host: Maximum requests in flight per host (default: 4)
+            burst: Requests that may start back to back after an idle period (default: 1)
+            queue_size: Detail URLs waiting for a worker before the producer pauses (default: 2 per worker)
+        """
+        self.scraper = scraper or RaceScraper(links=True)
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        # The limiter's semaphores belong to one event loop, so each enrich_async run builds its own
+        self.requests_per_second = requests_per_second
+        self.per_host = per_host
+        self.burst = burst
+        self.queue_size = queue_size or max_concurrency * 2
+        self.parser = DetailParser()
+        self.stats = {'races': 0, 'already_enriched': 0, 'no_link': 0, 'cached': 0, 'fetched': 0, 'failed': 0}
+
+    def fetch_details(self, url: str) -> Dict[str, str]:
+        """
+        Fetch and parse one detail page, keeping the result in the cache
+
+        A page without any detail fields (a challenge page, or a layout the parser
+        doesn't know) is not cached, so it is fetched again next time.
+
+        Raises:
+            requests.exceptions.RequestException: If the page can't be fetched
+        """
+        response = self.scraper.fetch_page(url)
+        with self.scraper.metrics.timer('detail_parse'):
+            details = self.parser.parse(response.content)
+        if not details:
+            return details
+        if self.cache is not None:
+            self.cache.store(url, details)
+        self.scraper.metrics.count('details_fetched')
+        return details
+
+    async def enrich_async(self, races: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Attach detail fields to races, fetching each distinct detail page once
+
+        Races that already carry detail fields, or whose details are cached, cost
+        no request. The races are read lazily and at most queue_size detail URLs
+        wait for a worker, so memory does not grow with the number of pages to fetch.
+
+        Args:
+            races: Races scraped with links=True, so they carry a 'URL'
+
+        Returns:
+            The races in the same order, enriched where their detail page could be read
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        limiter = HostRateLimiter(self.requests_per_second, self.per_host, self.burst)
+        details: Dict[str, Dict[str, str]] = {}
+        collected = []
+        loop = asyncio.get_running_loop()
+
+        async def worker(executor: ThreadPoolExecutor):
+            while True:
+                url = await queue.get()
+                if url is None:
+                    return
+                waiting = time.perf_counter()
+                async with limiter.limit(url):
+                    self.scraper.metrics.observe('rate_limit_wait', time.perf_counter() - waiting)
+                    try:
+                        fields = await loop.run_in_executor(executor, self.fetch_details, url)
+                        if fields:
+                            details[url] = fields
+                            self.stats['fetched'] += 1
+                        else:
+                            print(f"No race details found on {url}")
+                            self.stats['failed'] += 1
+                    except requests.exceptions.RequestException as e:
+                        print(f"Error fetching race details {url}: {e}")
+                        self.stats['failed'] += 1
+                    except Exception as e:
+                        # A page the parser or cache chokes on must not take the worker down with it
+                        print(f"Error reading race details {url}: {type(e).__name__}: {e}")
+                        self.stats['failed'] += 1
+
+        async def produce():
+            queued = set()
+            for race in races:
+                collected.append(race)
+                self.stats['races'] += 1
+                url = race.get('URL')
+                if any(field in race for field in DETAIL_FIELDS):
+                    self.stats['already_enriched'] += 1
+                elif not url:
+                    self.stats['no_link'] += 1
+                elif url not in queued:
+                    queued.add(url)
+                    cached = self.cache.lookup(url) if self.cache is not None else None
+                    if cached is not None:
+                        details[url] = cached
+                        self.stats['cached'] += 1
+                    else:
+                        await queue.put(url)
+            for _ in range(self.max_concurrency):
+                await queue.put(None)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            tasks = [asyncio.create_task(produce())]
+            tasks += [asyncio.create_task(worker(executor)) for _ in range(self.max_concurrency)]
+            try:
+                # If any task fails the others are cancelled, so a full queue can't leave the producer waiting
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        enriched = []
+        for race in collected:
+            if race.get('URL') in details and not any(field in race for field in DETAIL_FIELDS):
+                race = {**race, **details[race['URL']]}
+            enriched.append(race)
+        return enriched
+
+    def enrich(self, races: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Blocking wrapper around enrich_async"""
+        return asyncio.run(self.enrich_async(races))
+
+    def summary(self) -> str:
+        """One line describing the enrichment runs so far"""
+        return (f"{self.stats['races']} races: {self.stats['fetched']} detail pages fetched, "
+                f"{self.stats['cached']} from the cache, "
+                f"{self.stats['already_enriched']} already enriched, {self.stats['no_link']} without a link, "
+                f"{self.stats['failed']} failed")
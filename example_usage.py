@@ -5,6 +5,8 @@ This demonstrates how to use the scraper programmatically
 """
 
 from race_scraper import RaceScraper
+from race_model import RaceTable
+from dedup import deduplicate
 
 
 def example_basic_usage():
@@ -49,13 +51,14 @@ def example_custom_processing():
     )
 
     if races:
-        # Custom processing: filter races by state
+        # Custom processing: filter races by state, using the parsed state codes
         target_state = "UT"
-        utah_races = [r for r in races if r['Location'].endswith(target_state)]
+        table = RaceTable.from_dicts(races)
+        utah_races = [table[row] for row in table.rows_in_state(target_state)]
 
         print(f"\nFound {len(utah_races)} races in {target_state}:")
         for race in utah_races:
-            print(f"  - {race['Race Name']} on {race['Date']}")
+            print(f"  - {race.name} on {race.date.strftime('%A, %B %d') if race.date else race.date_text}")
 
         # You could also:
         # - Group by state
@@ -84,7 +87,11 @@ def example_multiple_date_ranges():
         races = scraper.scrape_date_range(start, end, max_pages=5)
         all_races.extend(races)
 
-    print(f"\nTotal races from all date ranges: {len(all_races)}")
+    # Overlapping ranges and shifting pages can return the same race twice
+    all_races, report = deduplicate(all_races)
+    print(f"\nTotal races from all date ranges: {report.summary()}")
+    for kept, dropped, score in report.fuzzy:
+        print(f"  merged '{dropped['Race Name']}' into '{kept['Race Name']}' ({score:.2f})")
 
     # Export all races to one file
     if all_races:
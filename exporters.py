@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Streaming race exporters
+Write races to CSV, JSON Lines, Parquet or Excel in row batches, without
+holding the whole result set in memory
+"""
+
+import csv
+import json
+import os
+from importlib.util import find_spec
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Sequence
+
+from metrics import METRICS
+from race_model import parse_listing_date
+
+# pyarrow is imported by ParquetExporter when it is used; checking for it here is free
+PYARROW_AVAILABLE = find_spec('pyarrow') is not None
+
+FIELDNAMES = ['Date', 'Race Name', 'Location']
+
+
+def fieldnames(races: List[Dict[str, str]], fields: Sequence[str] = ()) -> List[str]:
+    """
+    FIELDNAMES, then the declared extra fields, then any other fields the races carry, in order of appearance
+
+    Args:
+        races: The first batch of races
+        fields: Extra fields to always include, e.g. 'URL' and the enrichment fields
+    """
+    names = list(FIELDNAMES)
+    for field in fields:
+        if field not in names:
+            names.append(field)
+    for race in races:
+        for field in race:
+            if field not in names:
+                names.append(field)
+    return names
+
+
+def check_fields(races: List[Dict[str, str]], columns: Sequence[str]):
+    """
+    Make sure a later batch has no fields missing from the columns already written
+
+    Raises:
+        ValueError: If a race has a field that isn't a column; declare it in fields instead
+    """
+    known = set(columns)
+    for race in races:
+        if not known.issuperset(race):
+            extra = ', '.join(sorted(set(race) - known))
+            raise ValueError(f"Fields {extra} first appear after the header was written; "
+                             f"pass them in fields so they get a column")
+
+
+def batched(races: Iterable[Dict[str, str]], size: int) -> Iterator[List[Dict[str, str]]]:
+    """Split an iterable of races into lists of at most size races"""
+    iterator = iter(races)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CsvExporter:
+    """Writes races as UTF-8 CSV with a header row"""
+
+    extension = '.csv'
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def write(self, races: Iterable[Dict[str, str]], filename: str, fields: Sequence[str] = ()) -> int:
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = None
+            for batch in batched(races, self.batch_size):
+                # Columns come from the declared fields and the first batch, so the header can be
+                # written before the rest is read
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames(batch, fields))
+                    writer.writeheader()
+                else:
+                    check_fields(batch, writer.fieldnames)
+                writer.writerows(batch)
+                count += len(batch)
+            if writer is None:
+                csv.DictWriter(f, fieldnames=fieldnames([], fields)).writeheader()
+        return count
+
+
+class JsonLinesExporter:
+    """Writes one JSON object per race per line"""
+
+    extension = '.jsonl'
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def write(self, races: Iterable[Dict[str, str]], filename: str, fields: Sequence[str] = ()) -> int:
+        # Each line carries its own fields, so nothing needs declaring
+        count = 0
+        with open(filename, 'w', encoding='utf-8') as f:
+            for batch in batched(races, self.batch_size):
+                f.write(''.join(json.dumps(race, ensure_ascii=False) + '\n' for race in batch))
+                count += len(batch)
+        return count
+
+
+class ParquetExporter:
+    """Writes compressed columnar Parquet with a typed date column (requires pyarrow)"""
+
+    extension = '.parquet'
+
+    def __init__(self, batch_size: int = 50000, compression: str = 'zstd'):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        import pyarrow as pa
+
+        self.batch_size = batch_size
+        self.compression = compression
+        # 'Date' is a real date32 column; the listing text is kept for dates that don't parse
+        self.schema = pa.schema([
+            ('Date', pa.date32()),
+            ('Race Name', pa.string()),
+            ('Location', pa.string()),
+            ('Date Text', pa.string()),
+        ])
+
+    def write(self, races: Iterable[Dict[str, str]], filename: str, fields: Sequence[str] = ()) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        count = 0
+        writer = None
+        extras: List[str] = []
+        try:
+            for batch in batched(races, self.batch_size):
+                if writer is None:
+                    # Declared fields and extra fields of the first batch become string columns after the typed ones
+                    extras = fieldnames(batch, fields)[len(FIELDNAMES):]
+                    schema = self.schema
+                    for field in extras:
+                        schema = schema.append(pa.field(field, pa.string()))
+                    writer = pq.ParquetWriter(filename, schema, compression=self.compression)
+                else:
+                    check_fields(batch, FIELDNAMES + extras)
+                date_text = [race['Date'] for race in batch]
+                table = pa.Table.from_arrays([
+                    pa.array([parse_listing_date(text) for text in date_text], type=pa.date32()),
+                    pa.array([race['Race Name'] for race in batch], type=pa.string()),
+                    pa.array([race['Location'] for race in batch], type=pa.string()),
+                    pa.array(date_text, type=pa.string()),
+                ] + [pa.array([race.get(field) for race in batch], type=pa.string()) for field in extras],
+                    schema=writer.schema)
+                writer.write_table(table)
+                count += len(batch)
+            if writer is None:
+                schema = self.schema
+                for field in fieldnames([], fields)[len(FIELDNAMES):]:
+                    schema = schema.append(pa.field(field, pa.string()))
+                writer = pq.ParquetWriter(filename, schema, compression=self.compression)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+
+class XlsxExporter:
+    """Writes Excel through openpyxl's write-only mode, which streams rows in constant memory"""
+
+    extension = '.xlsx'
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def write(self, races: Iterable[Dict[str, str]], filename: str, fields: Sequence[str] = ()) -> int:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Sheet1')
+        columns = None
+        count = 0
+        try:
+            for batch in batched(races, self.batch_size):
+                if columns is None:
+                    columns = fieldnames(batch, fields)
+                    sheet.append(columns)
+                else:
+                    check_fields(batch, columns)
+                for race in batch:
+                    sheet.append([race.get(field) for field in columns])
+                count += len(batch)
+        except Exception:
+            # Finish the write-only sheet (keeping the rows so far, as the CSV exporter does)
+            workbook.save(filename)
+            raise
+        if columns is None:
+            sheet.append(fieldnames([], fields))
+        workbook.save(filename)
+        return count
+
+
+EXPORTERS = {
+    'csv': CsvExporter,
+    'jsonl': JsonLinesExporter,
+    'parquet': ParquetExporter,
+    'xlsx': XlsxExporter,
+}
+
+
+def export_races(races: Iterable[Dict[str, str]], filename: str, fmt: str = None,
+                 fields: Sequence[str] = ()) -> str:
+    """
+    Stream races to a file
+
+    Columns are FIELDNAMES, then fields, then any other field of the first batch.
+    Declare fields that only some races carry (such as 'URL' or the enrichment
+    fields), since a later batch with a field that has no column is an error.
+
+    Args:
+        races: Any iterable of race dictionaries, e.g. RaceScraper.iter_races(...)
+        filename: Output filename; the extension is added if missing
+        fmt: 'csv', 'jsonl', 'parquet' or 'xlsx' (default: taken from the extension)
+        fields: Extra columns to include after FIELDNAMES (default: none)
+
+    Returns:
+        The filename of the exported file
+
+    Raises:
+        ValueError: For an unknown format, or races with undeclared fields after the first batch
+    """
+    if fmt is None:
+        fmt = os.path.splitext(filename)[1].lstrip('.').lower() or 'xlsx'
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORTERS)}")
+
+    exporter = EXPORTERS[fmt]()
+    if not filename.endswith(exporter.extension):
+        filename += exporter.extension
+
+    with METRICS.timer('export'):
+        count = exporter.write(races, filename, fields)
+    METRICS.count('races_exported', count)
+    print(f"\n✓ Successfully exported {count} races to {filename}")
+    return filename
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for runningintheusa.com
+Serves synthetic listing and race detail pages over HTTP so scrapers can be tested offline
+"""
+
+import hashlib
+import html
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Dict, Optional, Tuple
+
+from query_planner import DistanceBand, parse_distance
+from race_model import parse_distances
+from race_scraper import DEFAULT_DISTANCE
+
+PAGE_PATH = re.compile(r'^/classic/list/map/(?P<range>[^/]+)/(?P<distance>[^/]+)/page-(?P<page>\d+)/?$')
+DETAIL_PATH = re.compile(r'^/race/(?P<slug>[a-z0-9-]+)/?$')
+
+STATES = ['UT', 'AZ', 'CA', 'CO', 'NV', 'OR', 'WA', 'TX', 'NY', 'FL']
+CITIES = ['Moab', 'Tucson', 'Oakland', 'Boulder', 'Reno', 'Bend', 'Seattle', 'Austin', 'Albany', 'Tampa']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def generate_races(count: int) -> Iterator[Dict[str, str]]:
+    """Lazily generate deterministic synthetic races in the scraper's output format"""
+    for i in range(count):
+        city_index = i % len(CITIES)
+        yield {
+            'Date': f"{MONTHS[(i // 28) % 12]} {i % 28 + 1}, 2026",
+            'Race Name': f"Race Number {i + 1} Trail Run",
+            'Location': f"{CITIES[city_index]}, {STATES[city_index]}",
+        }
+
+
+def make_races(count: int) -> List[Dict[str, str]]:
+    """Generate deterministic synthetic races in the scraper's output format"""
+    return list(generate_races(count))
+
+
+def race_slug(race: Dict[str, str]) -> str:
+    """Detail page path segment of a race, e.g. 'race-number-1-trail-run'"""
+    return re.sub(r'[^a-z0-9]+', '-', race['Race Name'].lower()).strip('-')
+
+
+def race_details(race: Dict[str, str]) -> Dict[str, str]:
+    """The fields a race's detail page shows, derived from the race so they are repeatable"""
+    size = len(race['Race Name'])
+    return {
+        'Distances': ['5K', '5K, 10K', 'Half Marathon, 10K', 'Marathon, Half Marathon'][size % 4],
+        'Start Time': f"{6 + size % 3}:30 AM",
+        'Registration URL': f"https://register.example/{race_slug(race)}",
+    }
+
+
+def render_detail_page(race: Dict[str, str]) -> str:
+    """Render a race's detail page: a table of labelled fields"""
+    details = race_details(race)
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Race</title></head>\n<body>\n'
+        f'<h1>{html.escape(race["Race Name"])}</h1>\n'
+        '<table class="race-details">\n'
+        f'  <tr><th>Date:</th><td>{html.escape(race["Date"])}</td></tr>\n'
+        f'  <tr><th>Location:</th><td>{html.escape(race["Location"])}</td></tr>\n'
+        f'  <tr><th>Distances:</th><td>{details["Distances"]}</td></tr>\n'
+        f'  <tr><th>Start Time:</th><td>{details["Start Time"]}</td></tr>\n'
+        f'  <tr><th>Registration:</th><td><a href="{details["Registration URL"]}">Register online</a></td></tr>\n'
+        '</table>\n</body></html>\n'
+    )
+
+
+def render_pagination(link_path: str, page: int, last_page: int, window: int = None) -> str:
+    """
+    Render a pagination bar linking to the other pages of a listing
+
+    Args:
+        link_path: Listing path the page segment is appended to
+        page: Current page number
+        last_page: Number of pages in the listing
+        window: Only link pages this close to the current one (default: link every page)
+    """
+    first, last = 1, last_page
+    if window is not None:
+        first, last = max(1, page - window), min(last_page, page + window)
+    links = [f'<a href="{link_path}/page-{number}">{number}</a>' if number != page
+             else f'<span class="current">{number}</span>'
+             for number in range(first, last + 1)]
+    return '<div class="pagination">' + ' '.join(links) + '</div>\n'
+
+
+def render_listing_page(races: List[Dict[str, str]], footer: str = '') -> str:
+    """Render races as a listing page using the same markup as the live site"""
+    items = []
+    for race in races:
+        items.append(
+            '<div class="list-item">\n'
+            f'  <div class="date">{html.escape(race["Date"])}</div>\n'
+            f'  <div class="name"><a class="thick" href="/race/{race_slug(race)}">{html.escape(race["Race Name"])}</a></div>\n'
+            f'  <div class="location">{html.escape(race["Location"])}</div>\n'
+            '</div>'
+        )
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Races</title></head>\n'
+        '<body><div class="list">\n' + '\n'.join(items) + '\n</div>\n' + footer + '</body></html>\n'
+    )
+
+
+class FakeRaceSite:
+    """Serves a fixed set of races, paginated like the live listing pages"""
+
+    def __init__(self, races: List[Dict[str, str]], page_size: int = 10, latency: float = 0.0,
+                 required_cookie: str = None, pagination: bool = False, link_window: int = None,
+                 show_total: bool = False, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, retry_after: Optional[float] = None, seed: int = 0):
+        """
+        Initialize the fake site (call start() or use it as a context manager)
+
+        Args:
+            races: Races served across all pages, in order
+            page_size: Number of races per listing page (default: 10)
+            latency: Seconds to wait before answering each request (default: 0)
+            required_cookie: "name=value" cookie a request must carry, like a verified
+                session; requests without it get a 403 challenge page (default: none)
+            pagination: Render a pagination bar linking to the other pages (default: False)
+            link_window: Only link pages this close to the current one (default: all pages)
+            show_total: Render a "Showing 1-10 of N races" line (default: False)
+            throttle_rate: Fraction of page requests answered 429 Too Many Requests (default: 0)
+            error_rate: Fraction of page requests answered with error_status (default: 0)
+            error_status: Status code for injected server errors (default: 503)
+            retry_after: Retry-After seconds sent with injected 429 and 503 responses (default: none)
+            seed: Seed for choosing which requests fail, so runs are repeatable (default: 0)
+        """
+        self.races = races
+        self.page_size = page_size
+        self.latency = latency
+        self.required_cookie = required_cookie
+        self.pagination = pagination
+        self.link_window = link_window
+        self.show_total = show_total
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.requested_paths: List[str] = []
+        self.status_counts: Dict[int, int] = {}
+        self._random = random.Random(seed)
+        self._filtered: Dict[Tuple[str, str], tuple] = {}
+        self._by_slug: Tuple[tuple, Dict[str, Dict[str, str]]] = ((), {})
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to a scraper's base_url argument"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/classic/list/map"
+
+    def page_html(self, page: int, date_range: str = None, distance: str = DEFAULT_DISTANCE) -> str:
+        """
+        Render a single page; pages past the end render with no races
+
+        Args:
+            page: Page number, starting at 1
+            date_range: URL range segment ("MM-DD-YYYY-to-MM-DD-YYYY"); races outside it are left out
+            distance: URL distance segment; races with a distance outside it are left out
+        """
+        races = self.races_in_range(date_range, distance) if date_range else self.races
+
+        start = (page - 1) * self.page_size
+        page_races = races[start:start + self.page_size]
+
+        footer = ''
+        if page_races and self.show_total:
+            footer += (f'<div class="results">Showing {start + 1}-{start + len(page_races)} '
+                       f'of {len(races)} races</div>\n')
+        last_page = -(-len(races) // self.page_size)
+        if page_races and self.pagination and last_page > 1:
+            link_path = f"/classic/list/map/{date_range or 'all'}/{distance}"
+            footer += render_pagination(link_path, page, last_page, self.link_window)
+        return render_listing_page(page_races, footer)
+
+    def races_in_range(self, date_range: str, distance: str = DEFAULT_DISTANCE) -> List[Dict[str, str]]:
+        """
+        Races inside a URL range and distance segment, remembered until the race list is replaced or grows
+
+        A race whose name gives no distance is listed under every distance segment.
+        """
+        key = (id(self.races), len(self.races))
+        cached = self._filtered.get((date_range, distance))
+        if cached and cached[0] == key:
+            return cached[1]
+
+        start_text, _, end_text = date_range.partition('-to-')
+        first = datetime.strptime(start_text, "%m-%d-%Y")
+        last = datetime.strptime(end_text, "%m-%d-%Y")
+        band = parse_distance(distance)
+        races = [race for race in self.races
+                 if first <= datetime.strptime(race['Date'], "%b %d, %Y") <= last
+                 and self._in_band(race, band)]
+        self._filtered[(date_range, distance)] = (key, races)
+        return races
+
+    def race_by_slug(self, slug: str) -> Optional[Dict[str, str]]:
+        """The race whose detail page path segment is slug"""
+        key = (id(self.races), len(self.races))
+        if self._by_slug[0] != key:
+            self._by_slug = (key, {race_slug(race): race for race in self.races})
+        return self._by_slug[1].get(slug)
+
+    @staticmethod
+    def _in_band(race: Dict[str, str], band: DistanceBand) -> bool:
+        distances = parse_distances(race['Race Name'])
+        return not distances or any(band.low <= km <= band.high for km in distances)
+
+    def injected_fault(self) -> Optional[int]:
+        """Status code to fail the next page request with, or None to serve it"""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return self.error_status
+        return None
+
+    def _count_status(self, status: int):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections open between requests, like a real server
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with site._lock:
+                    site.requested_paths.append(self.path)
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    if site.latency:
+                        time.sleep(site.latency)
+
+                    match = PAGE_PATH.match(self.path)
+                    detail = DETAIL_PATH.match(self.path)
+                    race = site.race_by_slug(detail.group('slug')) if detail else None
+                    if not match and race is None:
+                        self.send_error(404)
+                        return
+
+                    fault = site.injected_fault()
+                    if fault:
+                        site._count_status(fault)
+                        self.send_response(fault)
+                        if site.retry_after is not None:
+                            self.send_header('Retry-After', f"{site.retry_after:g}")
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+
+                    cookies = [c.strip() for c in self.headers.get('Cookie', '').split(';')]
+                    if site.required_cookie and site.required_cookie not in cookies:
+                        site._count_status(403)
+                        self.send_error(403, 'Verifying you are human')
+                        return
+
+                    if match:
+                        body = site.page_html(int(match.group('page')), match.group('range'),
+                                              match.group('distance')).encode('utf-8')
+                    else:
+                        body = render_detail_page(race).encode('utf-8')
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        site._count_status(304)
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+
+                    site._count_status(200)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html; charset=utf-8')
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with site._lock:
+                        site.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeRaceSite':
+        """Start serving on a free local port in a background thread"""
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
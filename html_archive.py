@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Compressed archive of fetched listing pages
+Keeps the raw HTML of every page a scraper fetches in append-only segment
+files, so a parser fix or a new field can be applied to past crawls by
+replaying them from disk instead of crawling the site again
+"""
+
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from importlib.util import find_spec
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from race_scraper import RaceScraper
+
+# zstandard is imported when a zstd segment is written or read; checking for it here is free
+ZSTD_AVAILABLE = find_spec('zstandard') is not None
+
+CODECS = ('zstd', 'zlib')
+EXTENSIONS = {'zstd': 'zst', 'zlib': 'zz'}
+
+# Newest successful copy first; an error page only when a URL has nothing better
+PREFERRED_COPY = 'status BETWEEN 200 AND 299 DESC, fetched_at DESC'
+
+# Each record starts with a header, so the index can be rebuilt from the segments alone:
+# magic, URL length, HTTP status, fetch time, HTML size, compressed size
+RECORD_MAGIC = b'RHA1'
+RECORD_HEADER = struct.Struct('<4sHHdII')
+
+
+class ArchivedPage(NamedTuple):
+    """One fetch of a page"""
+    url: str
+    fetched_at: float
+    status: int
+    body: bytes
+
+
+class RecordLocation(NamedTuple):
+    """Where one archived fetch sits on disk"""
+    url: str
+    fetched_at: float
+    status: int
+    path: str
+    codec: str
+    offset: int
+    size: int
+    raw_size: int
+
+
+class ArchiveMiss(requests.exceptions.RequestException):
+    """A replayed URL was never archived"""
+
+
+class _Codec:
+    """Compresses each record as its own frame, so one page can be read without its neighbours"""
+
+    def __init__(self, name: str, level: int = None):
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec '{name}'. Choose from: {', '.join(CODECS)}")
+        self.name = name
+        if name == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstd archives require zstandard: pip install zstandard")
+            import zstandard
+
+            self._compressor = zstandard.ZstdCompressor(level=level or 3)
+            self._decompressor = zstandard.ZstdDecompressor()
+        else:
+            self.level = 6 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == 'zstd':
+            return self._compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes, size: int) -> bytes:
+        if self.name == 'zstd':
+            return self._decompressor.decompress(data, max_output_size=size)
+        return zlib.decompress(data)
+
+
+class SegmentReader:
+    """Reads records out of memory-mapped segment files, remapping a segment once it has grown"""
+
+    def __init__(self):
+        self._codecs: Dict[str, _Codec] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._files: Dict[str, object] = {}
+
+    def read(self, path: str, codec: str, offset: int, size: int, raw_size: int) -> bytes:
+        """Decompress the record at offset, touching only its own bytes"""
+        if codec not in self._codecs:
+            self._codecs[codec] = _Codec(codec)
+        mapped = self._maps.get(path)
+        if mapped is None or offset + size > len(mapped):
+            # First read of this segment, or it has grown since it was mapped
+            if mapped is not None:
+                mapped.close()
+            if path not in self._files:
+                self._files[path] = open(path, 'rb')
+            mapped = self._maps[path] = mmap.mmap(self._files[path].fileno(), 0, access=mmap.ACCESS_READ)
+        return self._codecs[codec].decompress(mapped[offset:offset + size], raw_size)
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        for f in self._files.values():
+            f.close()
+        self._maps.clear()
+        self._files.clear()
+
+
+class HtmlArchive:
+    """
+    Append-only archive of raw page HTML
+
+    Pages are appended to numbered segment files, each record compressed on
+    its own (zstd when zstandard is installed, zlib otherwise). A SQLite index
+    maps every URL and fetch time to its segment and offset, and segments are
+    read through mmap, so reading a page decompresses only that page.
+    """
+
+    def __init__(self, path: str = '.race_archive', codec: str = None, level: int = None,
+                 max_segment_bytes: int = 64 * 1024 * 1024):
+        """
+        Open (or create) an archive directory
+
+        Args:
+            path: Directory holding the segments and index.sqlite (default: .race_archive)
+            codec: 'zstd' or 'zlib' for new records (default: zstd if zstandard is installed, else zlib)
+            level: Compression level (default: 3 for zstd, 6 for zlib)
+            max_segment_bytes: Size at which a new segment file is started (default: 64 MiB)
+        """
+        self.path = path
+        self.codec = _Codec(codec or ('zstd' if ZSTD_AVAILABLE else 'zlib'), level)
+        self.max_segment_bytes = max_segment_bytes
+        self.stats = {'appended': 0, 'raw_bytes': 0, 'stored_bytes': 0, 'reads': 0}
+        os.makedirs(path, exist_ok=True)
+
+        # Scrapers may append from worker threads, so one connection is shared under a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, codec TEXT NOT NULL)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' url TEXT NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' status INTEGER NOT NULL,'
+            ' segment INTEGER NOT NULL,'
+            ' offset INTEGER NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' raw_size INTEGER NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at)')
+        self._conn.commit()
+
+        self._reader = SegmentReader()
+        self._segment_codecs: Dict[int, str] = {}
+        self._segment, self._writer = None, None
+
+    def segment_path(self, segment: int, codec: str) -> str:
+        return os.path.join(self.path, f"{segment:06d}.{EXTENSIONS[codec]}")
+
+    def _open_segment(self, size: int):
+        """The segment to append a record of size bytes to, starting a new one when needed"""
+        if self._writer is None:
+            row = self._conn.execute('SELECT id, codec FROM segments ORDER BY id DESC LIMIT 1').fetchone()
+            if row and row[1] == self.codec.name:
+                self._segment = row[0]
+                self._writer = open(self.segment_path(self._segment, self.codec.name), 'ab')
+        if self._writer is not None and self._writer.tell() + size <= self.max_segment_bytes:
+            return
+        if self._writer is not None and self._writer.tell() == 0:
+            return  # a record bigger than max_segment_bytes still gets a segment of its own
+
+        if self._writer is not None:
+            self._writer.close()
+        self._segment = self._conn.execute('INSERT INTO segments (codec) VALUES (?)',
+                                           (self.codec.name,)).lastrowid
+        self._writer = open(self.segment_path(self._segment, self.codec.name), 'ab')
+
+    def append(self, url: str, body: bytes, fetched_at: float = None, status: int = 200):
+        """
+        Add a fetched page
+
+        Args:
+            url: The page URL
+            body: Raw HTML exactly as fetched
+            fetched_at: Unix time of the fetch (default: now)
+            status: HTTP status of the response (default: 200)
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        encoded_url = url.encode('utf-8')
+        frame = self.codec.compress(body)
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(encoded_url), status, fetched_at, len(body), len(frame))
+
+        with self._lock:
+            self._open_segment(len(header) + len(encoded_url) + len(frame))
+            offset = self._writer.tell() + len(header) + len(encoded_url)
+            self._writer.write(header + encoded_url + frame)
+            self._writer.flush()
+            # The record is on disk before the index points at it
+            self._conn.execute(
+                'INSERT INTO pages (url, fetched_at, status, segment, offset, size, raw_size)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, fetched_at, status, self._segment, offset, len(frame), len(body))
+            )
+            self._conn.commit()
+            self.stats['appended'] += 1
+            self.stats['raw_bytes'] += len(body)
+            self.stats['stored_bytes'] += len(frame)
+
+    def _segment_codec(self, segment: int) -> str:
+        if segment not in self._segment_codecs:
+            self._segment_codecs[segment] = self._conn.execute(
+                'SELECT codec FROM segments WHERE id = ?', (segment,)).fetchone()[0]
+        return self._segment_codecs[segment]
+
+    def _read(self, segment: int, offset: int, size: int, raw_size: int) -> bytes:
+        """Decompress one record straight out of its memory-mapped segment"""
+        codec = self._segment_codec(segment)
+        self.stats['reads'] += 1
+        return self._reader.read(self.segment_path(segment, codec), codec, offset, size, raw_size)
+
+    def lookup(self, url: str, at: float = None) -> Optional[ArchivedPage]:
+        """
+        The latest archived fetch of a URL
+
+        A successful copy is preferred over a later error or challenge page, so a
+        fetch that was throttled or blocked doesn't hide the last good one.
+
+        Args:
+            url: The page URL
+            at: Only consider fetches at or before this Unix time (default: any)
+
+        Returns:
+            The archived page, or None if the URL was not archived (by that time)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fetched_at, status, segment, offset, size, raw_size FROM pages'
+                f' WHERE url = ? AND fetched_at <= ? ORDER BY {PREFERRED_COPY} LIMIT 1',
+                (url, float('inf') if at is None else at)
+            ).fetchone()
+            if row is None:
+                return None
+            fetched_at, status, segment, offset, size, raw_size = row
+            return ArchivedPage(url, fetched_at, status, self._read(segment, offset, size, raw_size))
+
+    def versions(self, url: str) -> List[float]:
+        """Fetch times of every archived copy of a URL, oldest first"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT fetched_at FROM pages WHERE url = ? ORDER BY fetched_at', (url,))]
+
+    def locations(self, latest: bool = False) -> List[RecordLocation]:
+        """
+        Where every archived page sits, in the order the records sit on disk
+
+        Args:
+            latest: Only the most recent fetch of each URL, preferring successful ones as lookup
+                does (default: every fetch)
+
+        Returns:
+            RecordLocation entries, enough for another process to read the pages itself
+        """
+        query = ('SELECT url, fetched_at, status, pages.segment, offset, size, raw_size, codec'
+                 ' FROM pages JOIN segments ON segments.id = pages.segment')
+        if latest:
+            query += (' WHERE pages.rowid IN (SELECT rowid FROM pages p WHERE p.url = pages.url'
+                      f' ORDER BY {PREFERRED_COPY} LIMIT 1)')
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY pages.segment, offset').fetchall()
+        return [RecordLocation(url, fetched_at, status, os.path.abspath(self.segment_path(segment, codec)),
+                               codec, offset, size, raw_size)
+                for url, fetched_at, status, segment, offset, size, raw_size, codec in rows]
+
+    def pages(self, latest: bool = False) -> Iterator[ArchivedPage]:
+        """
+        Every archived page, in the order the records sit on disk
+
+        Args:
+            latest: Only the most recent fetch of each URL, preferring successful ones (default: every fetch)
+
+        Yields:
+            ArchivedPage records
+        """
+        for location in self.locations(latest):
+            with self._lock:
+                self.stats['reads'] += 1
+                body = self._reader.read(location.path, location.codec, location.offset,
+                                         location.size, location.raw_size)
+            yield ArchivedPage(location.url, location.fetched_at, location.status, body)
+
+    def rebuild_index(self) -> int:
+        """
+        Re-create the index by scanning every segment's record headers
+
+        Recovers records appended just before a crash, which reached the
+        segment file but not the index.
+
+        Returns:
+            Number of records indexed
+        """
+        with self._lock:
+            self._close_files()
+            segments = self._conn.execute('SELECT id, codec FROM segments ORDER BY id').fetchall()
+            self._conn.execute('DELETE FROM pages')
+            count = 0
+            for segment, codec in segments:
+                for row in self._scan(segment, codec):
+                    self._conn.execute(
+                        'INSERT INTO pages (url, fetched_at, status, segment, offset, size, raw_size)'
+                        ' VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+                    count += 1
+            self._conn.commit()
+            return count
+
+    def _scan(self, segment: int, codec: str) -> Iterator[Tuple[str, float, int, int, int, int, int]]:
+        path = self.segment_path(segment, codec)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = 0
+            while position + RECORD_HEADER.size <= len(mapped):
+                magic, url_size, status, fetched_at, raw_size, size = RECORD_HEADER.unpack_from(mapped, position)
+                offset = position + RECORD_HEADER.size + url_size
+                if magic != RECORD_MAGIC or offset + size > len(mapped):
+                    print(f"Segment {path} ends in a partial record at byte {position}; ignoring the rest")
+                    return
+                url = mapped[position + RECORD_HEADER.size:offset].decode('utf-8')
+                yield url, fetched_at, status, segment, offset, size, raw_size
+                position = offset + size
+
+    def summary(self) -> str:
+        with self._lock:
+            count, raw, stored = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        ratio = raw / stored if stored else 0
+        return f"{count} pages, {raw / 1e6:.1f} MB of HTML stored in {stored / 1e6:.1f} MB ({ratio:.1f}x)"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def _close_files(self):
+        self._reader.close()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        """Close the segment files and the index"""
+        with self._lock:
+            self._close_files()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayScraper(RaceScraper):
+    """
+    Scrapes listing pages out of an HtmlArchive instead of the network
+
+    Everything after the fetch (parsing, pagination, checkpoints, exports)
+    is RaceScraper's own code, so a replay gives the races the current
+    parser finds in the archived HTML. There is no delay between pages.
+    """
+
+    def __init__(self, archive: HtmlArchive, at: float = None, **scraper_options):
+        """
+        Args:
+            archive: Archive to read pages from
+            at: Replay the latest copy of each page fetched at or before this Unix time (default: latest)
+            **scraper_options: Passed on to RaceScraper (e.g. base_url of the archived crawl, parser)
+        """
+        super().__init__(use_cloudscraper=False, **scraper_options)
+        self.source = archive
+        self.at = at
+
+    def get_random_delay(self, min_delay: float = 2.0, max_delay: float = 5.0) -> float:
+        return 0.0
+
+    def fetch_page(self, url: str, extra_headers: Dict[str, str] = None) -> requests.Response:
+        """
+        Serve a page from the archive
+
+        Raises:
+            ArchiveMiss: If the URL is not in the archive
+            requests.exceptions.HTTPError: If the archived response was an error status
+        """
+        page = self.source.lookup(url, self.at)
+        if page is None:
+            raise ArchiveMiss(f"{url} is not in the archive")
+        self.metrics.count('archive_reads')
+        response = requests.Response()
+        response.url = url
+        response.status_code = page.status
+        response._content = page.body
+        response.raise_for_status()
+        return response
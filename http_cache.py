@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP response cache for listing pages
+Stores page bodies and their parsed races in SQLite, keyed by URL
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, NamedTuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+
+class CachedResponse(NamedTuple):
+    """A cached listing page"""
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    races: List[Dict[str, str]]
+    parsed_with: Optional[str] = None  # parser option the races were parsed with, e.g. 'links'
+
+
+class ResponseCache:
+    """On-disk response cache with TTLs, conditional GET and LRU eviction"""
+
+    def __init__(self, path: str = '.race_cache.sqlite', ttl: float = 3600,
+                 max_bytes: int = 200 * 1024 * 1024):
+        """
+        Open (or create) the cache
+
+        Args:
+            path: SQLite file holding the cache (default: .race_cache.sqlite)
+            ttl: Seconds a cached page is served without asking the server (default: 3600)
+            max_bytes: Total body size kept before least recently used pages are evicted
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'changed': 0, 'evictions': 0}
+        # Scrapers may call in from worker threads, so one connection is shared under a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' url TEXT PRIMARY KEY,'
+            ' body BLOB NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' fetched_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' races TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(responses)')]
+        if 'parsed_with' not in columns:
+            # Caches written before race links existed hold plain races, which NULL stands for
+            self._conn.execute('ALTER TABLE responses ADD COLUMN parsed_with TEXT')
+        self._conn.commit()
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """
+        Find the cached copy of a URL, fresh or stale
+
+        Args:
+            url: The page URL
+
+        Returns:
+            The cached response, or None if the URL has never been cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, etag, last_modified, fetched_at, races, parsed_with FROM responses WHERE url = ?',
+                (url,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+        body, etag, last_modified, fetched_at, races, parsed_with = row
+        return CachedResponse(url, body, etag, last_modified, fetched_at, json.loads(races), parsed_with)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether a cached page is still within its TTL"""
+        return time.time() - entry.fetched_at < self.ttl
+
+    def record_hit(self):
+        """Count a page served from the cache without any request"""
+        with self._lock:
+            self.stats['hits'] += 1
+
+    def conditional_headers(self, entry: CachedResponse) -> Dict[str, str]:
+        """Headers that let the server answer 304 Not Modified for a cached page"""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def mark_revalidated(self, entry: CachedResponse, response: 'requests.Response'):
+        """Restart a cached page's TTL after the server answered 304 Not Modified"""
+        with self._lock:
+            self.stats['revalidated'] += 1
+            self._conn.execute(
+                'UPDATE responses SET fetched_at = ?, etag = ?, last_modified = ? WHERE url = ?',
+                (time.time(), response.headers.get('ETag', entry.etag),
+                 response.headers.get('Last-Modified', entry.last_modified), entry.url)
+            )
+            self._conn.commit()
+
+    def store(self, url: str, response: 'requests.Response', races: List[Dict[str, str]],
+              previous: CachedResponse = None, parsed_with: str = None):
+        """
+        Cache a freshly downloaded page and the races parsed from it
+
+        Args:
+            url: The page URL
+            response: The 200 response
+            races: Races parsed from the response body
+            previous: The stale entry this response replaces, if any
+            parsed_with: Parser option the races depend on, e.g. 'links' (default: none)
+        """
+        body = response.content
+        now = time.time()
+        with self._lock:
+            if previous is not None:
+                self.stats['changed'] += 1
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses'
+                ' (url, body, etag, last_modified, fetched_at, accessed_at, size, races, parsed_with)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 now, now, len(body), json.dumps(races), parsed_with)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def replace_races(self, url: str, races: List[Dict[str, str]], parsed_with: str = None):
+        """Swap a cached page's races for ones parsed again with other parser options"""
+        with self._lock:
+            self._conn.execute('UPDATE responses SET races = ?, parsed_with = ? WHERE url = ?',
+                               (json.dumps(races), parsed_with, url))
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute(
+                'SELECT url, size FROM responses ORDER BY accessed_at').fetchall():
+            self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self.stats['evictions'] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Remove every cached page"""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
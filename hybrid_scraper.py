@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Hybrid Race Scraper for runningintheusa.com
+Uses a real browser only to establish a verified session, then continues
+with the lightweight requests session
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+from checkpoint import Checkpoint, checkpoint_options
+from race_scraper import RaceScraper, DEFAULT_BASE_URL
+from transport import Transport
+
+
+class HybridRaceScraper(RaceScraper):
+    """Loads the first page in Chrome, then scrapes over HTTP with the browser's session"""
+
+    def __init__(self, headless: bool = False, manual_verification: bool = True,
+                 base_url: str = DEFAULT_BASE_URL, browser=None, **scraper_options):
+        """
+        Initialize the hybrid scraper
+
+        Args:
+            headless: Run the browser in headless mode (no GUI) - default False for manual verification
+            manual_verification: Pause for manual human verification on the first page
+            base_url: Listing URL that page paths are appended to (default: the live site)
+            browser: An existing SeleniumRaceScraper to use instead of starting one
+            **scraper_options: Passed on to RaceScraper (e.g. cache, parser)
+        """
+        # Its own transport: the browser's cookies must not leak into the shared session
+        scraper_options.setdefault('transport', Transport())
+        super().__init__(use_cloudscraper=False, base_url=base_url, **scraper_options)
+
+        if browser is None:
+            from race_scraper_selenium import SeleniumRaceScraper
+            browser = SeleniumRaceScraper(headless=headless, manual_verification=manual_verification,
+                                          base_url=base_url, metrics=self.metrics)
+        self.browser = browser
+        self.session_transferred = False
+        self.stats = {'http_pages': 0, 'browser_pages': 0, 'fallbacks': 0}
+
+    def transfer_session(self):
+        """Copy the browser's cookies and user agent into the requests session"""
+        for cookie in self.browser.driver.get_cookies():
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''), path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False),
+            )
+
+        # The verified session is tied to the browser's user agent, so stop rotating
+        self.user_agents = [self.browser.driver.execute_script('return navigator.userAgent')]
+        self.session_transferred = True
+        print(f"✓ Moved {len(self.session.cookies)} cookies from the browser to the HTTP session")
+
+    def fetch_listing(self, url: str, delay: bool = True) -> Tuple[List[Dict[str, str]], Optional[bytes]]:
+        """
+        Scrape a page over HTTP, falling back to the browser if it comes back empty or blocked
+
+        Args:
+            url: The URL to scrape
+            delay: Sleep a random human-like delay before HTTP requests (default: True)
+
+        Returns:
+            Tuple of (races, raw HTML)
+        """
+        if not self.session_transferred:
+            listing = self.browser_page(url)
+            self.transfer_session()
+            return listing
+
+        # Error responses and challenge pages both come back without races
+        races, content = super().fetch_listing(url, delay)
+        self.stats['http_pages'] += 1
+        if races:
+            return races, content
+
+        # Empty or blocked: let the browser try, and pick up any refreshed session
+        print("Falling back to the browser...")
+        self.stats['fallbacks'] += 1
+        self.metrics.count('browser_fallbacks')
+        races, content = self.browser_page(url)
+        if races:
+            self.transfer_session()
+        return races, content
+
+    def browser_page(self, url: str) -> Tuple[List[Dict[str, str]], str]:
+        """Scrape a page in the browser, returning its races and page source"""
+        self.stats['browser_pages'] += 1
+        browser_races = self.browser.scrape_page(url)
+        page_source = self.browser.driver.page_source
+        if self.archive is not None and page_source:
+            # The rendered page, which replaces any challenge page archived for this URL over HTTP
+            with self.metrics.timer('archive'):
+                self.archive.append(url, page_source.encode('utf-8'))
+        # This scraper's parser keeps race links (links=True) like the HTTP pages do;
+        # the browser's lenient parser is only used when ours finds nothing
+        with self.metrics.timer('parse'):
+            races = self.parse_races(page_source.encode('utf-8'), url) if page_source else []
+        return races or browser_races, page_source
+
+    def close(self):
+        """Close the browser"""
+        self.browser.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    """Main function to run the hybrid scraper"""
+    print("=" * 60)
+    print("Hybrid Race Scraper for runningintheusa.com")
+    print("=" * 60)
+    print()
+
+    # Get user input
+    print("Enter date range in MM-DD-YYYY format")
+    start_date = input("Start date (e.g., 01-31-2026): ").strip()
+    end_date = input("End date (e.g., 02-01-2026): ").strip()
+
+    # Validate date format
+    try:
+        datetime.strptime(start_date, "%m-%d-%Y")
+        datetime.strptime(end_date, "%m-%d-%Y")
+    except ValueError:
+        print("Error: Invalid date format. Please use MM-DD-YYYY format.")
+        sys.exit(1)
+
+    # Ask for max pages
+    max_pages_input = input("Maximum pages to scrape (default 20): ").strip()
+    max_pages = int(max_pages_input) if max_pages_input else 20
+
+    # Ask for output filename
+    output_file = input("Output filename (press Enter for auto-generated): ").strip()
+    if not output_file:
+        output_file = None
+
+    print()
+    print("NOTE: A Chrome browser window will open for the first page only.")
+    print("You will be asked to complete any human verification challenges.")
+    print()
+
+    # Every finished page goes to the checkpoint journal, so a failed run can be resumed
+    options = checkpoint_options()
+    checkpoint = Checkpoint(options.checkpoint, resume=options.resume)
+
+    try:
+        with HybridRaceScraper(headless=False, manual_verification=True) as scraper:
+            races = scraper.scrape_date_range(start_date, end_date, max_pages, checkpoint=checkpoint)
+
+            if races:
+                # Export to Excel
+                filename = scraper.export_to_excel(races, output_file)
+                checkpoint.remove()
+
+                # Display summary
+                print()
+                print("=" * 60)
+                print("SUMMARY")
+                print("=" * 60)
+                print(f"Total races found: {len(races)}")
+                print(f"Output file: {filename}")
+                print(f"Pages over HTTP: {scraper.stats['http_pages']}, "
+                      f"in the browser: {scraper.stats['browser_pages']}")
+                print()
+                print("Sample of first 3 races:")
+                for i, race in enumerate(races[:3], 1):
+                    print(f"{i}. {race['Date']}, {race['Race Name']}, {race['Location']}")
+            else:
+                print("\nNo races found for the specified date range.")
+
+    except KeyboardInterrupt:
+        print("\n\nScraping interrupted by user.")
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        checkpoint.close()
+        if os.path.exists(checkpoint.path):
+            print(f"Finished pages are saved in {checkpoint.path}; run again with --resume to continue.")
+
+
+if __name__ == "__main__":
+    main()
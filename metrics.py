@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the scrapers
+Per-stage timers with histograms, plus counters (pages, bytes, cache hits,
+retries), reported as JSON, as Prometheus text, or as a printed summary
+"""
+
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+    from http.server import ThreadingHTTPServer
+
+# Upper bounds in seconds; pages take from milliseconds (cache, parse) to tens of seconds (browser)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_PREFIX = 'race_scraper'
+
+
+class Histogram:
+    """Durations counted into fixed buckets, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the overflow (+Inf) bucket; not cumulative
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside the bucket that holds it"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'min': _rounded(self.min),
+            'p50': _rounded(self.quantile(0.5)),
+            'p95': _rounded(self.quantile(0.95)),
+            'max': _rounded(self.max),
+        }
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+class Metrics:
+    """
+    Thread-safe registry of stage timings and counters for a run
+
+    Stages nest (a page's 'request' happens inside 'scrape'), so their totals
+    overlap and are not meant to add up to the wall time.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.started = time.time()
+        self._started_clock = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        """Record one timing for a stage"""
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.buckets)
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count(self, name: str, amount: float = 1):
+        """Add to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        """Forget everything recorded so far and restart the wall clock"""
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started = time.time()
+            self._started_clock = time.perf_counter()
+
+    @property
+    def wall_time(self) -> float:
+        return time.perf_counter() - self._started_clock
+
+    def report(self) -> Dict:
+        """
+        Structured report of the run so far
+
+        Returns:
+            Dictionary with the start time, wall time, counters, and per-stage
+            count/total/mean/min/p50/p95/max seconds plus the share of wall time
+        """
+        wall = self.wall_time
+        with self._lock:
+            stages = {name: histogram.to_dict() for name, histogram in sorted(self.stages.items())}
+            counters = dict(sorted(self.counters.items()))
+        for stage in stages.values():
+            stage['share'] = round(stage['total'] / wall, 4) if wall else None
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started)),
+            'wall_time': round(wall, 6),
+            'counters': counters,
+            'stages': stages,
+        }
+
+    def write_report(self, path: str) -> Dict:
+        """Write the report as JSON and return it"""
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def summary(self) -> str:
+        """The report as a short table for the console"""
+        report = self.report()
+        lines = [f"Run time {report['wall_time']:.2f}s"]
+        if report['stages']:
+            lines.append(f"{'stage':<16}{'count':>7}{'total s':>10}{'mean s':>9}{'p95 s':>9}{'share':>8}")
+            for name, stage in report['stages'].items():
+                lines.append(f"{name:<16}{stage['count']:>7}{stage['total']:>10.3f}{stage['mean']:>9.3f}"
+                             f"{stage['p95']:>9.3f}{stage['share']:>8.1%}")
+        if report['counters']:
+            lines.append(', '.join(f"{name}: {value:g}" for name, value in report['counters'].items()))
+        return '\n'.join(lines)
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            stages = sorted(self.stages.items())
+
+        lines = []
+        for name, value in counters:
+            metric = f"{PROMETHEUS_PREFIX}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+
+        metric = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        if stages:
+            lines += [f"# HELP {metric} Time spent per scrape stage", f"# TYPE {metric} histogram"]
+        for name, histogram in stages:
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+
+        metric = f"{PROMETHEUS_PREFIX}_uptime_seconds"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {self.wall_time:.3f}"]
+        return '\n'.join(lines) + '\n'
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+# Shared by every scraper in the process unless one is given its own registry
+METRICS = Metrics()
+
+
+class MetricsServer:
+    """Serves a Metrics registry at /metrics in the Prometheus text format"""
+
+    def __init__(self, metrics: Metrics = None, port: int = 9108, host: str = '127.0.0.1'):
+        """
+        Args:
+            metrics: Registry to serve (default: the process-wide METRICS)
+            port: Port to listen on; 0 picks a free one (default: 9108)
+            host: Interface to bind (default: localhost only)
+        """
+        self.metrics = metrics or METRICS
+        self.host = host
+        self.port = port
+        self._server: Optional['ThreadingHTTPServer'] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'MetricsServer':
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Serving metrics at {self.url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+@contextmanager
+def profiled(path: str = None, sort: str = 'cumulative', limit: int = 25) -> Iterator['cProfile.Profile']:
+    """
+    Run the enclosed block under cProfile and print its most expensive functions
+
+    Args:
+        path: Also save the raw profile here, for snakeviz or pstats (optional)
+        sort: pstats sort key (default: 'cumulative')
+        limit: Number of functions to print (default: 25)
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+            print(f"Profile saved to {path}")
+        pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
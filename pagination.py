@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Pagination planning for listing pages
+Reads the page count from the listing's own pagination links so scrapers
+know where a range ends instead of guessing from short pages
+"""
+
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional, Union
+
+# A full listing page has at least this many races; a shorter page is the last one
+FULL_PAGE_SIZE = 10
+
+PAGE_LINK = re.compile(r'href\s*=\s*["\'][^"\']*?/page-(\d+)/?["\']', re.IGNORECASE)
+RESULT_COUNT = re.compile(
+    r'(?:\bof\s+|\btotal:?\s*)([\d,]+)\s+(?:races|results|events)\b'
+    r'|\b([\d,]+)\s+(?:races|results|events)\s+found\b',
+    re.IGNORECASE,
+)
+
+
+class PaginationInfo(NamedTuple):
+    """What a listing page says about the size of its result set"""
+    last_page: Optional[int]
+    total_results: Optional[int]
+
+
+def read_pagination(content: Union[bytes, str, None]) -> PaginationInfo:
+    """
+    Find the highest linked page number and any result count on a listing page
+
+    Args:
+        content: Raw HTML (bytes from requests or page_source from Selenium)
+
+    Returns:
+        PaginationInfo; fields are None when the page doesn't show them
+    """
+    if not content:
+        return PaginationInfo(None, None)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+
+    pages = [int(number) for number in PAGE_LINK.findall(content)]
+    count = RESULT_COUNT.search(content)
+    total = int((count.group(1) or count.group(2)).replace(',', '')) if count else None
+    return PaginationInfo(max(pages) if pages else None, total)
+
+
+class PagePlan:
+    """
+    Tracks where a paginated range ends as its pages come in
+
+    Page 1's pagination links (or result count) give the last page, so the
+    scraper can stop without requesting an empty trailing page and can fetch
+    the known pages concurrently. Pages may be observed in any order. Without
+    pagination on the page, it falls back to stopping at the first empty or
+    short page, with the page size learned from page 1.
+    """
+
+    def __init__(self, max_pages: int = 20):
+        """
+        Args:
+            max_pages: Most pages that may be fetched
+        """
+        self.max_pages = max_pages
+        self.page_size = FULL_PAGE_SIZE
+        self.listed_pages: Optional[int] = None
+        self.total_results: Optional[int] = None
+        self.observed: Dict[int, int] = {}
+        self._end = max_pages
+        # First page past the listing's end, going by a short or empty page that loaded fine
+        self._stop = math.inf
+        # Pages that failed to load, or listed pages that came back without races
+        self.missing: List[int] = []
+
+    @property
+    def known(self) -> bool:
+        """Whether the listing said how many pages it has"""
+        return self.listed_pages is not None
+
+    @property
+    def last_page(self) -> int:
+        """Last page worth fetching given what has been observed so far"""
+        if self.known:
+            return min(self._end, self.listed_pages, self.max_pages)
+        return self._end
+
+    def observe(self, page: int, races: List[Dict[str, str]], content: Union[bytes, str, None] = None,
+                info: PaginationInfo = None, failed: bool = False):
+        """
+        Record a fetched page
+
+        Args:
+            page: Page number
+            races: Races parsed from it
+            content: Its raw HTML, read for pagination links
+            info: Pagination already read from the page, instead of content
+            failed: The page could not be loaded, so its emptiness says nothing about the listing's end
+        """
+        self.observed[page] = len(races)
+        if info is None:
+            info = read_pagination(content)
+
+        if page == 1 and races and (info.last_page or 0) > 1:
+            # Page 1 is full whenever there are more pages, so it shows the page size
+            self.page_size = len(races)
+
+        if info.total_results is not None and races:
+            self.total_results = info.total_results
+            self._list(math.ceil(info.total_results / self.page_size))
+        if info.last_page is not None:
+            # Pagination bars may only show nearby pages, so later pages can extend this
+            self._list(max(info.last_page, page))
+
+        if not races:
+            self._end = min(self._end, page - 1)
+            if failed or (self.known and page <= self.listed_pages):
+                if page not in self.missing:
+                    self.missing.append(page)
+            else:
+                self._stop = min(self._stop, page)
+        elif len(races) < self.page_size:
+            self._end = min(self._end, page)
+            self._stop = min(self._stop, page + 1)
+
+    def _list(self, pages: int):
+        self.listed_pages = max(self.listed_pages or 0, pages)
+
+    def is_last(self, page: int) -> bool:
+        """Whether nothing after this page needs fetching"""
+        return page >= self.last_page
+
+    @property
+    def truncated(self) -> bool:
+        """Whether max_pages cut the range short"""
+        if self.known:
+            return self.listed_pages > self.max_pages and self._end >= self.max_pages
+        return self._end >= self.max_pages and self.observed.get(self.max_pages, 0) >= self.page_size
+
+    @property
+    def lost_pages(self) -> List[int]:
+        """Missing pages that belong to the listing, rather than failed requests past its end"""
+        if self.known:
+            return sorted(page for page in self.missing if page <= self.listed_pages)
+        return sorted(page for page in self.missing if page < self._stop)
+
+    @property
+    def incomplete(self) -> bool:
+        """Whether a page of the listing failed or came back empty, so races in the range are missing"""
+        return bool(self.lost_pages)
+
+    def summary(self) -> str:
+        if self.incomplete:
+            listed = f" of {self.listed_pages}" if self.known else ""
+            return (f"Warning: page {self.lost_pages[0]}{listed} came back without races; "
+                    f"the pages from there on were not scraped")
+        if self.truncated and self.known:
+            return (f"Warning: max_pages is {self.max_pages} but the listing goes on to page "
+                    f"{self.listed_pages}; later pages were not scraped")
+        if self.truncated:
+            return f"Warning: page {self.max_pages} was still full; the range may continue past max_pages"
+        if self.known:
+            return f"Listing has {self.listed_pages} pages of up to {self.page_size} races"
+        return "Listing shows no page count; stopped at the first short page"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Listing page parser backends
+Both backends turn a listing page into the same list of race dictionaries.
+bs4 and lxml are imported by the backend that uses them, not at module load.
+"""
+
+import re
+from typing import List, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import lxml.html
+
+
+class BeautifulSoupParser:
+    """Reference parser: builds a BeautifulSoup tree and searches each item"""
+
+    name = 'bs4'
+
+    def __init__(self, links: bool = False):
+        """
+        Args:
+            links: Also keep each race's detail page link (the href of a.thick) as 'URL' (default: False)
+        """
+        self.links = links
+
+    def parse(self, content: bytes) -> List[Dict[str, str]]:
+        """
+        Extract race information from a listing page
+
+        Args:
+            content: Raw HTML of the listing page
+
+        Returns:
+            List of dictionaries containing race information
+        """
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, 'lxml')
+        races = []
+
+        # Find all race listings - they are in div elements with class 'list-item'
+        for item in soup.find_all('div', class_='list-item'):
+            try:
+                # Extract date
+                date_elem = item.find('div', class_='date')
+                if not date_elem:
+                    continue
+
+                # The date format is typically "Jan 31, 2026"
+                date_text = date_elem.get_text(strip=True)
+
+                # Extract race name
+                name_elem = item.find('a', class_='thick')
+                if not name_elem:
+                    continue
+                race_name = name_elem.get_text(strip=True)
+
+                # Extract location (city and state)
+                location_elem = item.find('div', class_='location')
+                if not location_elem:
+                    continue
+                location_text = location_elem.get_text(strip=True)
+
+                race = {
+                    'Date': date_text,
+                    'Race Name': race_name,
+                    'Location': location_text
+                }
+                if self.links and name_elem.get('href'):
+                    race['URL'] = name_elem['href']
+                races.append(race)
+
+            except Exception as e:
+                print(f"Error parsing race item: {e}")
+                continue
+
+        return races
+
+
+def _class_step(tag: str, css_class: str) -> str:
+    """XPath step matching a tag whose class list contains css_class, like bs4's class_="""
+    return f'{tag}[contains(concat(" ", normalize-space(@class), " "), " {css_class} ")]'
+
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+_SKIPPED_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+_DECLARED_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+
+class LxmlParser:
+    """Fast parser: one lxml parse plus precompiled XPath lookups per item"""
+
+    name = 'lxml'
+
+    def __init__(self, links: bool = False):
+        """
+        Args:
+            links: Also keep each race's detail page link (the href of a.thick) as 'URL' (default: False)
+        """
+        from lxml import etree
+
+        self.links = links
+        # Compiled once per parser; the [1] keeps only the first match, like bs4's find()
+        self._items = etree.XPath('//' + _class_step('div', 'list-item'))
+        self._date = etree.XPath('descendant::' + _class_step('div', 'date') + '[1]')
+        self._name = etree.XPath('descendant::' + _class_step('a', 'thick') + '[1]')
+        self._location = etree.XPath('descendant::' + _class_step('div', 'location') + '[1]')
+        self._html_parsers: Dict[str, 'lxml.html.HTMLParser'] = {}
+
+    def parse(self, content: bytes) -> List[Dict[str, str]]:
+        """
+        Extract race information from a listing page
+
+        Args:
+            content: Raw HTML of the listing page
+
+        Returns:
+            List of dictionaries containing race information
+        """
+        import lxml.html
+        from lxml import etree
+
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        try:
+            document = lxml.html.document_fromstring(content, parser=self._html_parser(_detect_encoding(content)))
+        except etree.ParserError:
+            # Empty or whitespace-only document
+            return []
+        races = []
+
+        for item in self._items(document):
+            date_elem = self._date(item)
+            if not date_elem:
+                continue
+            name_elem = self._name(item)
+            if not name_elem:
+                continue
+            location_elem = self._location(item)
+            if not location_elem:
+                continue
+
+            race = {
+                'Date': _stripped_text(date_elem[0]),
+                'Race Name': _stripped_text(name_elem[0]),
+                'Location': _stripped_text(location_elem[0])
+            }
+            if self.links and name_elem[0].get('href'):
+                race['URL'] = name_elem[0].get('href')
+            races.append(race)
+
+        return races
+
+    def _html_parser(self, encoding: str) -> 'lxml.html.HTMLParser':
+        import lxml.html
+
+        if encoding not in self._html_parsers:
+            self._html_parsers[encoding] = lxml.html.HTMLParser(encoding=encoding)
+        return self._html_parsers[encoding]
+
+
+def _detect_encoding(content: bytes) -> str:
+    """Pick the document encoding in the same order BeautifulSoup tries them"""
+    if content.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8'
+    match = _DECLARED_CHARSET.search(content, 0, 4096)
+    if match:
+        declared = match.group(1).decode('ascii', 'replace').lower()
+        try:
+            content.decode(declared)
+            return declared
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        content.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+
+def _stripped_text(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element"""
+    if len(element) == 0:
+        return element.text.strip() if element.text else ''
+
+    parts = []
+    _collect_text(element, parts)
+    return ''.join(part.strip() for part in parts if part.strip())
+
+
+def _collect_text(node, parts: List[str]):
+    """Append a subtree's text in document order, skipping comments and scripts"""
+    # Comments and processing instructions have a non-string tag; only their tail is text
+    if isinstance(node.tag, str) and node.tag not in _SKIPPED_TEXT_TAGS and node.text:
+        parts.append(node.text)
+    for child in node:
+        _collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+
+PARSERS = {
+    BeautifulSoupParser.name: BeautifulSoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+
+def get_parser(name: str = 'bs4', links: bool = False):
+    """
+    Create a parser backend by name
+
+    Args:
+        name: 'bs4' (reference) or 'lxml' (fast)
+        links: Also keep each race's detail page link as 'URL' (default: False)
+
+    Returns:
+        A parser instance with a parse(content) method
+    """
+    try:
+        parser_class = PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser '{name}'. Choose from: {', '.join(PARSERS)}")
+    return parser_class(links=links)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Query planning across listing facets
+Turns several date-range and distance-band queries into the fewest
+non-overlapping listing crawls, then routes each crawled race back to every
+query that asked for it, so consumers with different filters share one crawl
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Tuple, TYPE_CHECKING
+
+from dedup import Deduplicator
+from pagination import PagePlan
+from race_model import KM_PER_MILE, parse_listing_date
+from race_scraper import DEFAULT_DISTANCE
+from sharding import format_date, parse_date
+
+if TYPE_CHECKING:
+    from race_scraper import RaceScraper
+
+# One end of a distance segment: kilometres ('5k') or miles ('100m'), as in the listing URLs
+_BOUND = re.compile(r'^(\d+(?:\.\d+)?)(k|m)$')
+
+
+class DistanceBand(NamedTuple):
+    """An inclusive distance range as the listing's URL segment spells it"""
+    low: float  # km
+    high: float  # km
+    segment: str
+
+
+def parse_bound(text: str) -> float:
+    """Kilometres for one end of a distance segment, e.g. '5k' -> 5.0, '100m' -> 160.9344"""
+    match = _BOUND.match(text)
+    if not match:
+        raise ValueError(f"Invalid distance '{text}'. Use kilometres or miles, e.g. '5k' or '100m'")
+    value = float(match.group(1))
+    return value if match.group(2) == 'k' else value * KM_PER_MILE
+
+
+def parse_distance(segment: str) -> DistanceBand:
+    """
+    Parse a listing distance segment such as '10k-to-100m'
+
+    Args:
+        segment: '<low>-to-<high>', each end in kilometres ('k') or miles ('m')
+
+    Returns:
+        DistanceBand with both ends in kilometres
+
+    Raises:
+        ValueError: If the segment is malformed or its low end is above its high end
+    """
+    segment = segment.strip().lower()
+    low_text, separator, high_text = segment.partition('-to-')
+    if not separator:
+        raise ValueError(f"Invalid distance segment '{segment}'. Use '<low>-to-<high>', e.g. '5k-to-10k'")
+    band = DistanceBand(parse_bound(low_text), parse_bound(high_text), segment)
+    if band.low > band.high:
+        raise ValueError(f"Distance segment '{segment}' starts above where it ends")
+    return band
+
+
+class Query(NamedTuple):
+    """Races one consumer wants: a date range and a distance band"""
+    name: str
+    start_date: str  # MM-DD-YYYY
+    end_date: str  # MM-DD-YYYY
+    distance: str = DEFAULT_DISTANCE
+
+
+class Crawl(NamedTuple):
+    """One paginated listing to scrape and the queries its races are routed to"""
+    start_date: str
+    end_date: str
+    distance: str
+    queries: Tuple[str, ...]
+
+
+def elementary_bands(bands: Iterable[DistanceBand]) -> List[DistanceBand]:
+    """
+    Split overlapping distance bands at every band's ends
+
+    Each returned band lies either entirely inside or entirely outside each
+    input band. Adjacent bands only share their end distance, because the
+    listing's bands include both ends. A single-distance band ('5k-to-5k')
+    stays a band of its own.
+
+    Args:
+        bands: Requested distance bands
+
+    Returns:
+        Elementary bands covered by at least one input band, shortest distances first
+    """
+    bands = list(bands)
+    bounds: Dict[float, str] = {}
+    for band in bands:
+        low_text, _, high_text = band.segment.partition('-to-')
+        bounds.setdefault(band.low, low_text)
+        bounds.setdefault(band.high, high_text)
+    points = sorted(bounds)
+
+    pieces = [DistanceBand(low, high, f"{bounds[low]}-to-{bounds[high]}")
+              for low, high in zip(points, points[1:])
+              if any(band.low <= low and high <= band.high for band in bands)]
+    pieces.extend(DistanceBand(point, point, f"{bounds[point]}-to-{bounds[point]}")
+                  for point in sorted({band.low for band in bands if band.low == band.high}))
+    return sorted(pieces, key=lambda band: (band.low, band.high))
+
+
+class QueryPlan:
+    """
+    Shares one crawl between many queries
+
+    The requested distance bands are cut into elementary bands, so no distance
+    is crawled twice. Within each band, the date ranges of every query that
+    covers it are merged into as few ranges as possible. Each crawled race is
+    then given to every query whose date range holds it; a race listed under
+    two bands (such as '5K & 10K') is kept once per query.
+    """
+
+    def __init__(self, queries: Iterable[Query]):
+        """
+        Plan the crawls for a set of queries
+
+        Args:
+            queries: Queries with unique names
+
+        Raises:
+            ValueError: If a name repeats, a date is not MM-DD-YYYY or a range is empty
+        """
+        self.queries: Dict[str, Query] = {}
+        self._dates: Dict[str, Tuple[date, date]] = {}
+        self._bands: Dict[str, DistanceBand] = {}
+        for query in queries:
+            if query.name in self.queries:
+                raise ValueError(f"Query name '{query.name}' is used twice")
+            start, end = parse_date(query.start_date), parse_date(query.end_date)
+            if start > end:
+                raise ValueError(f"Query '{query.name}' ends before it starts")
+            self.queries[query.name] = query
+            self._dates[query.name] = (start, end)
+            self._bands[query.name] = parse_distance(query.distance)
+
+        self.crawls = self._plan()
+        self.truncated_crawls: List[Crawl] = []
+        self.incomplete_crawls: List[Crawl] = []
+        self.stats = {'crawls': 0, 'races': 0, 'duplicates': 0}
+        self._results: Dict[str, Deduplicator] = {name: Deduplicator(fuzzy=False) for name in self.queries}
+
+    def _plan(self) -> List[Crawl]:
+        crawls = []
+        for band in elementary_bands(self._bands.values()):
+            covering = sorted((self._dates[name], name) for name, query_band in self._bands.items()
+                              if query_band.low <= band.low and band.high <= query_band.high)
+
+            # Merge overlapping or back-to-back date ranges into single crawls
+            runs: List[Tuple[date, date, List[str]]] = []
+            for (start, end), name in covering:
+                if runs and start <= runs[-1][1] + timedelta(days=1):
+                    runs[-1] = (runs[-1][0], max(runs[-1][1], end), runs[-1][2] + [name])
+                else:
+                    runs.append((start, end, [name]))
+
+            crawls.extend(Crawl(format_date(start), format_date(end), band.segment, tuple(names))
+                          for start, end, names in runs)
+        return crawls
+
+    def route(self, crawl: Crawl, races: Iterable[Dict[str, str]]):
+        """
+        Hand a crawl's races to the queries that asked for them
+
+        Races whose date can't be read go to every query the crawl serves,
+        since the listing already filtered them to the crawl's dates.
+
+        Args:
+            crawl: One of this plan's crawls
+            races: Races scraped for it
+        """
+        for race in races:
+            self.stats['races'] += 1
+            day = parse_listing_date(race['Date'])
+            for name in crawl.queries:
+                start, end = self._dates[name]
+                if (day is None or start <= day <= end) and not self._results[name].add(race):
+                    self.stats['duplicates'] += 1
+
+    def results(self) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Races routed so far, per query name, in date order
+
+        Returns:
+            Dictionary of query name to its races
+        """
+        return {name: sorted(deduplicator.races, key=lambda race: parse_listing_date(race['Date']) or date.max)
+                for name, deduplicator in self._results.items()}
+
+    def execute(self, scraper: 'RaceScraper', max_pages: int = 20,
+                delay: bool = True) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Scrape every crawl in the plan and route its races
+
+        Crawls that reach max_pages are recorded in truncated_crawls, and crawls
+        with a page that failed to load in incomplete_crawls.
+
+        Args:
+            scraper: RaceScraper (or subclass) to crawl with
+            max_pages: Pagination ceiling for a single crawl (default: 20)
+            delay: Keep the random human-like delay before each request (default: True)
+
+        Returns:
+            Dictionary of query name to its races, as results() returns it
+        """
+        print(f"Planned {len(self.crawls)} crawls for {len(self.queries)} queries")
+        for crawl in self.crawls:
+            print(f"Crawling {crawl.distance} from {crawl.start_date} to {crawl.end_date} "
+                  f"for {', '.join(crawl.queries)}")
+            plan = PagePlan(max_pages)
+            races, truncated = scraper.paginate(crawl.start_date, crawl.end_date, max_pages, delay,
+                                                distance=crawl.distance, plan=plan)
+            if plan.incomplete:
+                print(f"Warning: crawl {crawl.distance} {crawl.start_date} to {crawl.end_date} "
+                      f"is missing page {plan.lost_pages[0]}; results incomplete")
+                self.incomplete_crawls.append(crawl)
+            if truncated:
+                print(f"Warning: crawl {crawl.distance} {crawl.start_date} to {crawl.end_date} "
+                      f"hit {max_pages} pages; results truncated")
+                self.truncated_crawls.append(crawl)
+            self.stats['crawls'] += 1
+            self.route(crawl, races)
+
+        print(f"Routed {self.stats['races']} crawled races to {len(self.queries)} queries "
+              f"({self.stats['duplicates']} duplicates dropped)")
+        return self.results()
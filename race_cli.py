@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Command-line race scraper for unattended runs
+
+Scrapes one or more date ranges without prompting, sharing one scraper (and
+its HTTP session and connection pool) across every range, and exits with a
+status code that says how the batch went:
+
+    0  every range scraped completely
+    1  unexpected error
+    2  bad arguments or job file
+    3  at least one range returned no races
+    4  at least one range was cut short by --max-pages
+    5  at least one range is missing a page that failed to load
+  130  interrupted
+
+Examples:
+    python race_cli.py --start 01-31-2026 --end 02-01-2026 --output races.csv
+    python race_cli.py --jobs jobs.txt --engine async --concurrency 4 --cache .race_cache.sqlite
+    python -m race_cli --range 01-01-2026:01-31-2026 --range 02-01-2026:02-28-2026 --format parquet
+
+A job file has one range per line, "START END [OUTPUT]" (blank lines and
+# comments are skipped), or is a JSON list / JSON Lines of objects with
+"start", "end" and optionally "output" and "max_pages".
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import List, Dict, NamedTuple, Optional, Sequence
+
+from metrics import METRICS, MetricsServer, profiled
+from sharding import parse_date
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_NO_RACES = 3
+EXIT_TRUNCATED = 4
+EXIT_INCOMPLETE = 5
+EXIT_INTERRUPTED = 130
+
+ENGINES = ('requests', 'async', 'hybrid', 'selenium', 'pool', 'replay')
+FORMATS = ('csv', 'jsonl', 'parquet', 'xlsx')
+
+# Same page limit the interactive scrapers enforce
+MAX_PAGES_LIMIT = 50
+
+
+class Job(NamedTuple):
+    """One date range to scrape"""
+    start: str
+    end: str
+    output: Optional[str] = None
+    max_pages: Optional[int] = None
+
+
+class JobResult(NamedTuple):
+    """How a job went"""
+    job: Job
+    races: List[Dict[str, str]]
+    truncated: bool
+    seconds: float
+    output: Optional[str] = None
+    error: Optional[str] = None
+    incomplete: bool = False  # a listed page came back without races
+
+
+def check_date(text: str) -> str:
+    """Validate an MM-DD-YYYY date"""
+    try:
+        parse_date(text)
+    except ValueError:
+        raise ValueError(f"Invalid date '{text}'. Please use MM-DD-YYYY format.")
+    return text
+
+
+def check_max_pages(value) -> int:
+    """Validate a page limit"""
+    try:
+        pages = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid max_pages '{value}'. Please use a whole number.")
+    if not 1 <= pages <= MAX_PAGES_LIMIT:
+        raise ValueError(f"max_pages must be between 1 and {MAX_PAGES_LIMIT}, not {pages}")
+    return pages
+
+
+def make_job(start: str, end: str, output: str = None, max_pages: int = None) -> Job:
+    """Build a job, checking its dates and page limit"""
+    check_date(start)
+    check_date(end)
+    if parse_date(start) > parse_date(end):
+        raise ValueError(f"Range {start} to {end} ends before it starts")
+    return Job(start, end, output or None, check_max_pages(max_pages) if max_pages is not None else None)
+
+
+def load_jobs(path: str) -> List[Job]:
+    """
+    Read jobs from a text, JSON or JSON Lines job file
+
+    Raises:
+        ValueError: If a line or entry can't be turned into a job
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        return [make_job(**entry) for entry in json.loads(text)]
+    if stripped.startswith('{'):
+        return [make_job(**json.loads(line)) for line in text.splitlines() if line.strip()]
+
+    jobs = []
+    for number, line in enumerate(text.splitlines(), 1):
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) not in (2, 3):
+            raise ValueError(f"{path}:{number}: expected 'START END [OUTPUT]'")
+        jobs.append(make_job(*fields))
+    return jobs
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='race_cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    ranges = parser.add_argument_group('date ranges')
+    ranges.add_argument('--start', help='start date (MM-DD-YYYY)')
+    ranges.add_argument('--end', help='end date (MM-DD-YYYY), default: the start date')
+    ranges.add_argument('--range', action='append', default=[], metavar='START:END',
+                        help='a date range; may be repeated')
+    ranges.add_argument('--jobs', help='job file with one range per line (or JSON)')
+
+    scraping = parser.add_argument_group('scraping')
+    scraping.add_argument('--engine', choices=ENGINES, default='requests',
+                          help='requests (default), async (concurrent pages), hybrid (browser session, '
+                               'then HTTP), selenium, pool (several browsers) or replay (pages from --archive)')
+    scraping.add_argument('--max-pages', type=int, default=20,
+                          help=f'page limit per range, 1-{MAX_PAGES_LIMIT} (default: 20)')
+    scraping.add_argument('--concurrency', type=int, default=4,
+                          help='pages in flight (async) or browsers (pool) (default: 4)')
+    scraping.add_argument('--rate', type=float, default=1.0,
+                          help='requests per second per host for the async engine (default: 1.0)')
+    scraping.add_argument('--no-delay', action='store_true',
+                          help='skip the random 2-5 second pause before each request')
+    scraping.add_argument('--parser', choices=('bs4', 'lxml'), default='bs4', help='HTML parser (default: bs4)')
+    scraping.add_argument('--cache', metavar='PATH', help='reuse pages through a response cache file')
+    scraping.add_argument('--cache-ttl', type=float, default=3600,
+                          help='seconds a cached page is reused without asking (default: 3600)')
+    scraping.add_argument('--archive', metavar='DIR',
+                          help='keep the raw HTML of every fetched page in a compressed archive directory')
+    scraping.add_argument('--no-cloudscraper', action='store_true', help='use plain requests sessions')
+    scraping.add_argument('--pool-size', type=int, default=16,
+                          help='pooled connections per host, shared by every range (default: 16)')
+    scraping.add_argument('--http2', action='store_true',
+                          help='send plain requests over HTTP/2 (needs httpx[http2] and --no-cloudscraper)')
+    scraping.add_argument('--manual-verification', action='store_true',
+                          help='browser engines: open a window and wait for verification to be completed')
+    scraping.add_argument('--base-url', help=argparse.SUPPRESS)
+
+    output = parser.add_argument_group('output')
+    output.add_argument('--output', '-o',
+                        help='output file; may use {start} and {end} to write one file per range '
+                             '(default: races_<timestamp>.<format>)')
+    output.add_argument('--format', choices=FORMATS, help='output format (default: from --output, else xlsx)')
+    output.add_argument('--dedup', action='store_true', help='drop races repeated across ranges')
+    output.add_argument('--enrich', action='store_true',
+                        help="add distances, start time and registration link from each race's detail page")
+    output.add_argument('--details-cache', default='.race_details.sqlite', metavar='PATH',
+                        help='parsed race details reused by --enrich (default: .race_details.sqlite)')
+    output.add_argument('--detail-rate', type=float, default=4.0,
+                        help='detail page requests per second with --enrich (default: 4)')
+    output.add_argument('--report', metavar='PATH',
+                        help='write a JSON summary of the batch, with per-stage timings and counters')
+    output.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve live metrics in the Prometheus text format at http://127.0.0.1:PORT/metrics')
+    output.add_argument('--profile', nargs='?', const='', metavar='PATH',
+                        help='run under cProfile, print the slowest functions and optionally save the profile')
+    output.add_argument('--resume', action='store_true', help='skip pages already in the checkpoint journal')
+    output.add_argument('--checkpoint', help='checkpoint journal for the batch (default: none, or '
+                                             '.scrape_checkpoint.jsonl with --resume)')
+    return parser
+
+
+def parse_jobs(args: argparse.Namespace) -> List[Job]:
+    """Collect the jobs named on the command line and in the job file"""
+    jobs = []
+    if args.start:
+        jobs.append(make_job(args.start, args.end or args.start))
+    elif args.end:
+        raise ValueError("--end needs --start")
+    for text in args.range:
+        start, separator, end = text.partition(':')
+        if not separator:
+            raise ValueError(f"Invalid range '{text}'. Use START:END")
+        jobs.append(make_job(start, end))
+    if args.jobs:
+        jobs.extend(load_jobs(args.jobs))
+    if not jobs:
+        raise ValueError("Nothing to scrape: give --start, --range or --jobs")
+    return jobs
+
+
+def create_engine(args: argparse.Namespace, cache=None, archive=None):
+    """Create the one scraper shared by every job in the batch"""
+    from race_scraper import DEFAULT_BASE_URL
+
+    base_url = args.base_url or DEFAULT_BASE_URL
+    headless = not args.manual_verification
+
+    if args.engine == 'replay':
+        from html_archive import ReplayScraper
+        return ReplayScraper(archive, base_url=base_url, parser=args.parser, links=args.enrich)
+
+    if args.engine in ('selenium', 'pool'):
+        if args.engine == 'pool':
+            from selenium_pool import BrowserPool
+            return BrowserPool(size=args.concurrency, headless=headless,
+                               manual_verification=args.manual_verification, base_url=base_url,
+                               archive=archive)
+        from race_scraper_selenium import SeleniumRaceScraper
+        return SeleniumRaceScraper(headless=headless, manual_verification=args.manual_verification,
+                                   base_url=base_url, archive=archive)
+
+    scraper_options = {'parser': args.parser, 'cache': cache, 'archive': archive, 'links': args.enrich}
+
+    if args.engine == 'hybrid':
+        from hybrid_scraper import HybridRaceScraper
+        return HybridRaceScraper(headless=headless, manual_verification=args.manual_verification,
+                                 base_url=base_url, **scraper_options)
+
+    from race_scraper import RaceScraper
+    scraper = RaceScraper(use_cloudscraper=not args.no_cloudscraper, base_url=base_url, **scraper_options)
+    if args.engine == 'async':
+        from async_scraper import AsyncRaceScraper
+        return AsyncRaceScraper(scraper, requests_per_second=args.rate, max_concurrency=args.concurrency)
+    return scraper
+
+
+def scrape_job(engine, args: argparse.Namespace, job: Job, checkpoint=None) -> JobResult:
+    """Scrape one job's range with the shared engine"""
+    from async_scraper import AsyncRaceScraper
+    from pagination import PagePlan
+    from race_scraper import RaceScraper
+
+    max_pages = job.max_pages or args.max_pages
+    started = time.monotonic()
+    plan = PagePlan(max_pages)
+
+    if isinstance(engine, RaceScraper):
+        races, _ = engine.paginate(job.start, job.end, max_pages, delay=not args.no_delay,
+                                   checkpoint=checkpoint, plan=plan)
+    elif hasattr(engine, 'iter_pages'):
+        races = engine.scrape_date_range(job.start, job.end, max_pages, checkpoint=checkpoint, plan=plan)
+    else:
+        # The concurrent engines don't keep a checkpoint journal; main() rejects --resume for them
+        races = engine.scrape_date_range(job.start, job.end, max_pages, plan=plan)
+
+    return JobResult(job, races, plan.truncated, time.monotonic() - started, incomplete=plan.incomplete)
+
+
+def output_name(pattern: str, job: Job) -> str:
+    return pattern.format(start=job.start, end=job.end)
+
+
+def write_outputs(results: List[JobResult], args: argparse.Namespace) -> List[JobResult]:
+    """Export each job's races to its own file, or all races to one file"""
+    from dedup import deduplicate
+    from exporters import export_races
+
+    fmt = args.format
+    # Enriched races carry their link and detail fields only where they were found
+    fields = []
+    if args.enrich:
+        from enrichment import DETAIL_FIELDS
+        fields = ['URL'] + DETAIL_FIELDS
+    per_job = args.output and '{' in args.output
+    written = []
+    combined = []
+
+    for result in results:
+        output = result.job.output or (output_name(args.output, result.job) if per_job else None)
+        if output and result.races:
+            races = deduplicate(result.races)[0] if args.dedup else result.races
+            result = result._replace(output=export_races(races, output, fmt, fields))
+        elif not output:
+            combined.extend(result.races)
+        written.append(result)
+
+    if combined:
+        if args.dedup:
+            combined, report = deduplicate(combined)
+            print(report.summary())
+        filename = args.output or f"races_{datetime.now():%Y%m%d_%H%M%S}.{fmt or 'xlsx'}"
+        filename = export_races(combined, filename, fmt, fields)
+        written = [result._replace(output=filename) if not result.output and result.races else result
+                   for result in written]
+    return written
+
+
+def exit_code(results: List[JobResult]) -> int:
+    """The batch's exit status; the most serious problem wins"""
+    if any(result.error for result in results):
+        return EXIT_ERROR
+    if any(not result.races for result in results):
+        return EXIT_NO_RACES
+    if any(result.incomplete for result in results):
+        return EXIT_INCOMPLETE
+    if any(result.truncated for result in results):
+        return EXIT_TRUNCATED
+    return EXIT_OK
+
+
+def write_report(path: str, results: List[JobResult], status: int, transport=None):
+    """Write the batch summary, including the run's metrics, as JSON"""
+    report = {
+        'exit_code': status,
+        'jobs': [{
+            'start': result.job.start,
+            'end': result.job.end,
+            'races': len(result.races),
+            'truncated': result.truncated,
+            'incomplete': result.incomplete,
+            'seconds': round(result.seconds, 3),
+            'output': result.output,
+            'error': result.error,
+        } for result in results],
+        'metrics': METRICS.report(),
+        'transport': transport.pool_stats() if transport is not None else [],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Run a batch of scrapes; returns the exit status"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        check_max_pages(args.max_pages)
+        jobs = parse_jobs(args)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.output and args.format is None and os.path.splitext(args.output)[1].lstrip('.') not in FORMATS:
+        args.format = 'xlsx'
+    if args.engine == 'replay' and not args.archive:
+        print("Error: --engine replay needs --archive", file=sys.stderr)
+        return EXIT_USAGE
+    if (args.checkpoint or args.resume) and args.engine in ('async', 'pool'):
+        print(f"Error: --checkpoint and --resume aren't supported by the {args.engine} engine", file=sys.stderr)
+        return EXIT_USAGE
+    if args.enrich and args.engine in ('selenium', 'pool'):
+        print(f"Error: --enrich needs an HTTP engine, not {args.engine}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.http2 and not args.no_cloudscraper:
+        print("Error: --http2 needs --no-cloudscraper (cloudscraper only speaks HTTP/1.1)", file=sys.stderr)
+        return EXIT_USAGE
+
+    import transport
+    try:
+        # Every concurrent request should find a pooled connection instead of opening a throwaway one
+        shared = transport.configure(pool_size=max(args.pool_size, args.concurrency), http2=args.http2)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    checkpoint = None
+    if args.checkpoint or args.resume:
+        from checkpoint import Checkpoint, DEFAULT_CHECKPOINT
+        checkpoint = Checkpoint(args.checkpoint or DEFAULT_CHECKPOINT, resume=args.resume)
+
+    cache = None
+    if args.cache:
+        from http_cache import ResponseCache
+        cache = ResponseCache(args.cache, ttl=args.cache_ttl)
+
+    archive = None
+    if args.archive:
+        from html_archive import HtmlArchive
+        archive = HtmlArchive(args.archive)
+
+    METRICS.reset()
+    server = MetricsServer(METRICS, args.metrics_port).start() if args.metrics_port is not None else None
+
+    results: List[JobResult] = []
+    engine = None
+    enricher = details_cache = None
+    status = EXIT_ERROR
+    try:
+        engine = create_engine(args, cache, archive)
+        if args.enrich:
+            from enrichment import DetailCache, RaceEnricher
+            details_cache = DetailCache(args.details_cache)
+            # The async engine's RaceScraper does the fetching; the others are RaceScrapers themselves
+            enricher = RaceEnricher(getattr(engine, 'scraper', engine), details_cache,
+                                    max_concurrency=args.concurrency, requests_per_second=args.detail_rate,
+                                    per_host=args.concurrency)
+        with profiled(args.profile or None) if args.profile is not None else nullcontext():
+            for number, job in enumerate(jobs, 1):
+                print(f"[{number}/{len(jobs)}] {job.start} to {job.end}")
+                try:
+                    result = scrape_job(engine, args, job, checkpoint)
+                    if enricher is not None and result.races:
+                        result = result._replace(races=enricher.enrich(result.races))
+                except Exception as e:
+                    result = JobResult(job, [], False, 0.0, error=f"{type(e).__name__}: {e}")
+                    print(f"Error: {result.error}", file=sys.stderr)
+                results.append(result)
+
+            results = write_outputs(results, args)
+        status = exit_code(results)
+    except KeyboardInterrupt:
+        print("\nInterrupted.", file=sys.stderr)
+        status = EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        status = EXIT_ERROR
+    finally:
+        if engine is not None and hasattr(engine, 'close'):
+            engine.close()
+        if cache is not None:
+            cache.close()
+        if details_cache is not None:
+            details_cache.close()
+        if archive is not None:
+            archive.close()
+        if server is not None:
+            server.stop()
+        if checkpoint is not None:
+            if status == EXIT_OK:
+                checkpoint.remove()
+            else:
+                checkpoint.close()
+
+    for result in results:
+        flag = ' (incomplete)' if result.incomplete else ' (truncated)' if result.truncated else ''
+        print(f"{result.job.start} to {result.job.end}: {len(result.races)} races{flag}"
+              + (f" -> {result.output}" if result.output else '')
+              + (f" [{result.error}]" if result.error else ''))
+    if enricher is not None:
+        print(enricher.summary())
+    print(METRICS.summary())
+    print(shared.summary())
+    if args.report:
+        write_report(args.report, results, status, shared)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+In-memory race index
+Answers date-range, state, city, distance and name-prefix queries over
+scraped races without scanning every row
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from race_model import Race, RaceTable
+from race_store import normalize_text
+from sharding import parse_date
+
+DateLike = Union[date, str]
+
+
+def to_date(value: DateLike) -> date:
+    """Accept a date or an MM-DD-YYYY string"""
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def weekend_of(day: DateLike) -> Tuple[date, date]:
+    """The Saturday and Sunday of the week containing day"""
+    day = to_date(day)
+    saturday = day + timedelta(days=5 - day.weekday())
+    return saturday, saturday + timedelta(days=1)
+
+
+def merge_sorted(target: list, items: list):
+    """Merge items into the sorted list target, in place"""
+    if len(items) * 32 < len(target):
+        for item in items:
+            insort(target, item)
+    else:
+        # Timsort merges the two sorted runs in linear time
+        target.extend(items)
+        target.sort()
+
+
+class RaceIndex:
+    """
+    Indexes over a RaceTable, kept up to date as races are added
+
+    - dates: row numbers sorted by date, for range queries with bisect
+    - states and cities: hash maps to row numbers
+    - distances: (km, row) pairs sorted by distance
+    - names: (normalized name, row) pairs sorted by name, for prefix lookups
+
+    A query starts from whichever index matches the fewest rows and checks the
+    remaining conditions against the table's columns.
+    """
+
+    def __init__(self, races: Iterable[Dict[str, str]] = ()):
+        """
+        Build an index, optionally from races already scraped
+
+        Args:
+            races: Race dictionaries to add straight away
+        """
+        self.table = RaceTable()
+        self._date_ordinals = array('i')
+        self._date_rows = array('I')
+        self._by_state: Dict[str, List[int]] = {}
+        self._by_city: Dict[str, List[int]] = {}
+        self._distances: List[Tuple[float, int]] = []
+        self._names: List[Tuple[str, int]] = []
+        self._normalized_names: List[str] = []
+        self._rows_in_date_order = True
+        self.extend(races)
+
+    def extend(self, races: Iterable[Dict[str, str]]):
+        """Add races, e.g. one scraped page at a time"""
+        table = self.table
+        new_distances, new_names = [], []
+        for race in races:
+            row = len(table)
+            table.append(race)
+
+            ordinal = table.date_ordinals[row]
+            if row and ordinal < table.date_ordinals[row - 1]:
+                self._rows_in_date_order = False
+            if ordinal:
+                # Pages arrive in date order, so this is nearly always an append
+                if not self._date_ordinals or ordinal >= self._date_ordinals[-1]:
+                    position = len(self._date_ordinals)
+                else:
+                    position = bisect_right(self._date_ordinals, ordinal)
+                self._date_ordinals.insert(position, ordinal)
+                self._date_rows.insert(position, row)
+
+            state = table.states[table.state_ids[row]]
+            if state is not None:
+                self._by_state.setdefault(state, []).append(row)
+            city = table.cities[table.city_ids[row]]
+            self._by_city.setdefault(city.casefold(), []).append(row)
+
+            new_distances.extend((km, row) for km in table.distances[row])
+            name = normalize_text(table.names[row])
+            self._normalized_names.append(name)
+            new_names.append((name, row))
+
+        merge_sorted(self._distances, sorted(new_distances))
+        merge_sorted(self._names, sorted(new_names))
+
+    def add_page(self, page: int, url: str, races: List[Dict[str, str]]):
+        """Add a scraped page; matches the on_page callback of RaceScraper.paginate"""
+        self.extend(races)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def _date_span(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        lo = bisect_left(self._date_ordinals, start.toordinal()) if start else 0
+        hi = bisect_right(self._date_ordinals, end.toordinal()) if end else len(self._date_ordinals)
+        return lo, hi
+
+    def _distance_span(self, low: float, high: float) -> Tuple[int, int]:
+        return (bisect_left(self._distances, (low, -1)),
+                bisect_right(self._distances, (high, len(self.table))))
+
+    def _name_span(self, prefix: str) -> Tuple[int, int]:
+        return (bisect_left(self._names, (prefix, -1)),
+                bisect_left(self._names, (prefix + '\U0010ffff', -1)))
+
+    def rows(self, start: DateLike = None, end: DateLike = None, state: str = None, city: str = None,
+             min_km: float = None, max_km: float = None, name_prefix: str = None) -> List[int]:
+        """
+        Row numbers of the races matching every given condition, in date order
+
+        Args:
+            start: First date (inclusive), as a date or MM-DD-YYYY
+            end: Last date (inclusive), as a date or MM-DD-YYYY
+            state: Two-letter state code
+            city: City name (case-insensitive)
+            min_km: With max_km, the race must offer a distance in this band (kilometres)
+            max_km: Upper end of the distance band (kilometres)
+            name_prefix: Start of the race name (case- and whitespace-insensitive)
+
+        Returns:
+            Row numbers into self.table
+        """
+        table = self.table
+        start = to_date(start) if start is not None else None
+        end = to_date(end) if end is not None else None
+        by_distance = min_km is not None or max_km is not None
+        low_km = min_km if min_km is not None else 0.0
+        high_km = max_km if max_km is not None else float('inf')
+        prefix = normalize_text(name_prefix) if name_prefix else None
+
+        # Each index that applies: (rows it matches, how to list them, per-row check)
+        indexes: List[Tuple[int, Callable[[], Iterable[int]], Callable[[int], bool]]] = []
+        date_rows = None
+        if start or end:
+            lo, hi = self._date_span(start, end)
+            date_rows = lambda: self._date_rows[lo:hi]
+            first = start.toordinal() if start else 1
+            last = end.toordinal() if end else date.max.toordinal()
+            indexes.append((hi - lo, date_rows,
+                            lambda row: first <= table.date_ordinals[row] <= last))
+        if state is not None:
+            state_rows = self._by_state.get(state, [])
+            state_id = table.states.index(state) if state in table.states else -1
+            indexes.append((len(state_rows), lambda: state_rows,
+                            lambda row: table.state_ids[row] == state_id))
+        if city is not None:
+            folded = city.casefold()
+            city_rows = self._by_city.get(folded, [])
+            indexes.append((len(city_rows), lambda: city_rows,
+                            lambda row: table.cities[table.city_ids[row]].casefold() == folded))
+        if by_distance:
+            d_lo, d_hi = self._distance_span(low_km, high_km)
+            indexes.append((d_hi - d_lo, lambda: sorted({row for _, row in self._distances[d_lo:d_hi]}),
+                            lambda row: any(low_km <= km <= high_km for km in table.distances[row])))
+        if prefix:
+            n_lo, n_hi = self._name_span(prefix)
+            indexes.append((n_hi - n_lo, lambda: sorted(row for _, row in self._names[n_lo:n_hi]),
+                            lambda row: self._normalized_names[row].startswith(prefix)))
+
+        if not indexes:
+            matches = list(range(len(table)))
+            if not self._rows_in_date_order:
+                matches.sort(key=lambda row: (table.date_ordinals[row], row))
+            return matches
+
+        # Start from the most selective index and check the other conditions row by row
+        indexes.sort(key=lambda index: index[0])
+        candidates = indexes[0][1]()
+        checks = [check for _, _, check in indexes[1:]]
+        if checks:
+            matches = [row for row in candidates if all(check(row) for check in checks)]
+        else:
+            matches = list(candidates)
+
+        # The date index lists rows in date order and the others in row order,
+        # which is also date order unless races were added out of order
+        if indexes[0][1] is not date_rows and not self._rows_in_date_order:
+            matches.sort(key=lambda row: (table.date_ordinals[row], row))
+        return matches
+
+    def query(self, **conditions) -> List[Race]:
+        """Races matching the conditions of rows(), in date order"""
+        return [self.table[row] for row in self.rows(**conditions)]
+
+    def count(self, **conditions) -> int:
+        """Number of races matching the conditions of rows()"""
+        return len(self.rows(**conditions))
+
+    def between(self, start: DateLike, end: DateLike) -> List[Race]:
+        """Races dated within a range (inclusive)"""
+        return self.query(start=start, end=end)
+
+    def in_state(self, state: str) -> List[Race]:
+        """Races in a state, in date order"""
+        return self.query(state=state)
+
+    def weekend(self, day: DateLike, state: str = None) -> List[Race]:
+        """Races on the Saturday and Sunday of the week containing day"""
+        saturday, sunday = weekend_of(day)
+        return self.query(start=saturday, end=sunday, state=state)
+
+    def with_prefix(self, prefix: str) -> List[Race]:
+        """Races whose name starts with prefix"""
+        return self.query(name_prefix=prefix)
+
+    def states(self) -> Dict[str, int]:
+        """Number of races per state"""
+        return {state: len(rows) for state, rows in sorted(self._by_state.items())}
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Typed race records
+Parses the scraped strings once into dates, cities, state codes and
+distances, with a compact columnar table for large archives
+"""
+
+import re
+import sys
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+MONTH_ABBREVIATIONS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Fields every listing race has; anything else (e.g. 'URL') is kept as extras
+LISTING_FIELDS = ('Date', 'Race Name', 'Location')
+
+KM_PER_MILE = 1.609344
+MARATHON_KM = 42.195
+
+# A bare 'M' below this is miles, as in '100M'; from here up it's metres, as in '5000m'
+METRES_FROM = 400
+
+_DISTANCE = re.compile(r'(\d+(?:\.\d+)?)\s*(km|k|milers?|miles?|mi|m)\b', re.IGNORECASE)
+_STATE = re.compile(r'^[A-Z]{2}$')
+
+
+@lru_cache(maxsize=8192)
+def parse_listing_date(text: str) -> Optional[date]:
+    """Parse a listing date such as 'Jan 31, 2026', or None if it doesn't match"""
+    try:
+        return datetime.strptime(text.strip(), "%b %d, %Y").date()
+    except ValueError:
+        return None
+
+
+def format_listing_date(value: date) -> str:
+    """Format a date the way listings show it, e.g. 'Jan 31, 2026'"""
+    return f"{MONTH_ABBREVIATIONS[value.month - 1]} {value.day}, {value.year}"
+
+
+@lru_cache(maxsize=8192)
+def parse_location(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a listing location into city and two-letter state code
+
+    Returns:
+        (city, state); state is None when the location doesn't end in a state code
+    """
+    city, _, state = text.rpartition(',')
+    state = state.strip()
+    if city and _STATE.match(state):
+        return sys.intern(city.strip()), sys.intern(state)
+    return sys.intern(text.strip()), None
+
+
+def parse_distances(name: str) -> Tuple[float, ...]:
+    """
+    Distances mentioned in a race name, in kilometres, e.g. '5K & 10K Run' -> (5.0, 10.0)
+
+    A bare 'M' is read as miles for ultra distances, as in the listing's '10k-to-100m'
+    range, and as metres from METRES_FROM up, e.g. '5000m' -> (5.0,).
+    """
+    distances = []
+    lowered = name.lower()
+    if 'half marathon' in lowered:
+        distances.append(MARATHON_KM / 2)
+    elif 'marathon' in lowered and 'ultra' not in lowered:
+        distances.append(MARATHON_KM)
+    for amount, unit in _DISTANCE.findall(name):
+        value, unit = float(amount), unit.lower()
+        if unit.startswith('k'):
+            distances.append(value)
+        elif unit == 'm' and value >= METRES_FROM:
+            distances.append(value / 1000)
+        else:
+            distances.append(round(value * KM_PER_MILE, 3))
+    return tuple(sorted(set(distances)))
+
+
+def extra_fields(race: Dict[str, str]) -> Dict[str, str]:
+    """The fields of a scraped race besides date, name and location"""
+    return {field: value for field, value in race.items() if field not in LISTING_FIELDS}
+
+
+class Race:
+    """A single race with parsed, typed fields"""
+
+    __slots__ = ('date', 'name', 'city', 'state', 'distances', 'date_text', 'location', 'extras')
+
+    def __init__(self, date: Optional[date], name: str, city: str, state: Optional[str],
+                 distances: Tuple[float, ...] = (), date_text: str = None, location: str = None,
+                 extras: Dict[str, str] = None):
+        """
+        Args:
+            date: Race date, or None if the listing date couldn't be parsed
+            name: Race name
+            city: City
+            state: Two-letter state code, or None
+            distances: Distances in kilometres found in the race name
+            date_text: Date exactly as listed (default: formatted from date)
+            location: Location exactly as listed (default: 'City, ST')
+            extras: Any other scraped fields, such as 'URL' or the enrichment fields (default: none)
+        """
+        self.date = date
+        self.name = name
+        self.city = city
+        self.state = state
+        self.distances = distances
+        if date_text is None:
+            date_text = format_listing_date(date) if date else ''
+        self.date_text = date_text
+        self.location = location if location is not None else (f"{city}, {state}" if state else city)
+        self.extras = extras or {}
+
+    @classmethod
+    def from_dict(cls, race: Dict[str, str]) -> 'Race':
+        """Parse a scraped race dictionary"""
+        city, state = parse_location(race['Location'])
+        return cls(parse_listing_date(race['Date']), race['Race Name'], city, state,
+                   parse_distances(race['Race Name']), race['Date'], race['Location'], extra_fields(race))
+
+    def to_dict(self) -> Dict[str, str]:
+        """The race as the scrapers return it, including any extra fields"""
+        return {'Date': self.date_text, 'Race Name': self.name, 'Location': self.location, **self.extras}
+
+    def __eq__(self, other):
+        if not isinstance(other, Race):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"Race({self.date_text!r}, {self.name!r}, {self.location!r})"
+
+
+class RaceTable:
+    """
+    Column-oriented store of races
+
+    Dates are kept as day ordinals in an int array and cities and states as
+    indexes into shared lookup lists, so each row costs a few bytes plus its
+    name. Listing text is only stored for the rare rows where it can't be
+    rebuilt exactly from the parsed values, and extra fields (race links,
+    enrichment) only for the rows that have them.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.date_ordinals = array('i')  # 0 means the date couldn't be parsed
+        self.city_ids = array('I')
+        self.state_ids = array('H')  # 0 means no state code
+        self.distances: List[Tuple[float, ...]] = []
+        self.cities: List[str] = []
+        self.states: List[Optional[str]] = [None]
+        self._city_index: Dict[str, int] = {}
+        self._state_index: Dict[Optional[str], int] = {None: 0}
+        self._date_text: Dict[int, str] = {}
+        self._location_text: Dict[int, str] = {}
+        self._extras: Dict[int, Dict[str, str]] = {}
+
+    @classmethod
+    def from_dicts(cls, races: Iterable[Dict[str, str]]) -> 'RaceTable':
+        """Build a table from scraped race dictionaries (e.g. RaceScraper.iter_races)"""
+        table = cls()
+        table.extend(races)
+        return table
+
+    @classmethod
+    def from_html(cls, pages: Iterable[bytes], parser: str = 'lxml') -> 'RaceTable':
+        """Build a table straight from listing page HTML"""
+        from parsers import get_parser
+
+        backend = get_parser(parser)
+        table = cls()
+        for content in pages:
+            table.extend(backend.parse(content))
+        return table
+
+    def _city_id(self, city: str) -> int:
+        if city not in self._city_index:
+            self._city_index[city] = len(self.cities)
+            self.cities.append(city)
+        return self._city_index[city]
+
+    def _state_id(self, state: Optional[str]) -> int:
+        if state not in self._state_index:
+            self._state_index[state] = len(self.states)
+            self.states.append(state)
+        return self._state_index[state]
+
+    def append(self, race: Dict[str, str]):
+        """Add one scraped race dictionary"""
+        self.extend((race,))
+
+    def extend(self, races: Iterable[Dict[str, str]]):
+        """Add scraped race dictionaries, parsing each distinct date and location only once"""
+        for race in races:
+            row = len(self.names)
+            date_text, location_text, name = race['Date'], race['Location'], race['Race Name']
+
+            parsed_date = parse_listing_date(date_text)
+            city, state = parse_location(location_text)
+
+            self.names.append(name)
+            self.date_ordinals.append(parsed_date.toordinal() if parsed_date else 0)
+            self.city_ids.append(self._city_id(city))
+            self.state_ids.append(self._state_id(state))
+            self.distances.append(parse_distances(name))
+
+            if parsed_date is None or format_listing_date(parsed_date) != date_text:
+                self._date_text[row] = date_text
+            if (f"{city}, {state}" if state else city) != location_text:
+                self._location_text[row] = location_text
+            if len(race) > len(LISTING_FIELDS):
+                self._extras[row] = extra_fields(race)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, row: int) -> Race:
+        if row < 0:
+            row += len(self)
+        ordinal = self.date_ordinals[row]
+        return Race(
+            date.fromordinal(ordinal) if ordinal else None,
+            self.names[row],
+            self.cities[self.city_ids[row]],
+            self.states[self.state_ids[row]],
+            self.distances[row],
+            self._date_text.get(row),
+            self._location_text.get(row),
+            self._extras.get(row),
+        )
+
+    def __iter__(self) -> Iterator[Race]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def rows_in_state(self, state: str) -> List[int]:
+        """Row numbers of races in a state, compared as small integers rather than strings"""
+        state_id = self._state_index.get(state)
+        if state_id is None:
+            return []
+        return [row for row, value in enumerate(self.state_ids) if value == state_id]
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """The races as the scrapers return them, for backward compatibility"""
+        return [race.to_dict() for race in self]
@@ -5,35 +5,69 @@ Extracts race information (date, name, location) and exports to Excel
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import random
 from datetime import datetime
-from typing import List, Dict
+from importlib.util import find_spec
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import urljoin
 import sys
 import urllib3
 
-try:
-    import cloudscraper
-    CLOUDSCRAPER_AVAILABLE = True
-except ImportError:
-    CLOUDSCRAPER_AVAILABLE = False
+from metrics import METRICS, Metrics
+from pagination import PagePlan, read_pagination
+from parsers import get_parser
+from resilience import ResilientFetcher, RetryPolicy
+from transport import ACCEPT_ENCODING, Transport, shared_transport
+
+# cloudscraper is only imported when a scraper uses it; checking for it here is free
+CLOUDSCRAPER_AVAILABLE = find_spec('cloudscraper') is not None
+
+if TYPE_CHECKING:
+    from checkpoint import Checkpoint
+    from html_archive import HtmlArchive
+    from http_cache import CachedResponse, ResponseCache
 
 # Disable SSL warnings (for environments with SSL issues)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
+DEFAULT_BASE_URL = "https://runningintheusa.com/classic/list/map"
+
+# Distance segment the listing URLs used before distances could be chosen
+DEFAULT_DISTANCE = '10k-to-100m'
+
+
+
 class RaceScraper:
     """Scrapes race information from runningintheusa.com"""
 
-    def __init__(self, use_cloudscraper: bool = True):
+    def __init__(self, use_cloudscraper: bool = True, base_url: str = DEFAULT_BASE_URL,
+                 cache: 'ResponseCache' = None, parser: str = 'bs4', metrics: Metrics = None,
+                 retry: RetryPolicy = None, archive: 'HtmlArchive' = None, transport: Transport = None,
+                 links: bool = False):
         """
         Initialize the scraper
 
         Args:
             use_cloudscraper: Use cloudscraper to bypass bot protection (default: True)
+            base_url: Listing URL that page paths are appended to (default: the live site)
+            cache: Optional http_cache.ResponseCache for reusing unchanged pages
+            parser: Listing parser backend, 'bs4' or the faster 'lxml' (default: 'bs4')
+            metrics: Registry for stage timings and counters (default: the process-wide METRICS)
+            retry: Retry and backoff settings for both session types (default: RetryPolicy())
+            archive: Optional html_archive.HtmlArchive that keeps the raw HTML of every fetched page
+            transport: Connection pools to draw the session from (default: the process-wide one)
+            links: Keep each race's absolute detail page URL as 'URL', for enrichment.RaceEnricher (default: False)
         """
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.archive = archive
+        self.metrics = metrics or METRICS
+        self.parser = get_parser(parser, links=links)
+        # Cached and checkpointed races are tagged with this, so races parsed without links aren't reused
+        self.parsed_with = 'links' if links else None
+
         # Rotate user agents to appear more human-like
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -42,33 +76,21 @@ class RaceScraper:
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
         ]
 
-        # Use cloudscraper if available and requested
+        # Sessions come from the shared transport, so new scrapers reuse its warm connections
+        self.transport = transport or shared_transport()
         if use_cloudscraper and CLOUDSCRAPER_AVAILABLE:
             print("Using cloudscraper to bypass bot protection...")
-            self.session = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'windows',
-                    'mobile': False
-                }
-            )
-        else:
-            if use_cloudscraper and not CLOUDSCRAPER_AVAILABLE:
-                print("Warning: cloudscraper not available, using regular requests...")
-            self.session = requests.Session()
-
-            # Create an adapter with retry logic
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-
-            retry_strategy = Retry(
-                total=3,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            self.session.mount("http://", adapter)
-            self.session.mount("https://", adapter)
+        elif use_cloudscraper:
+            print("Warning: cloudscraper not available, using regular requests...")
+        self.use_cloudscraper = use_cloudscraper and CLOUDSCRAPER_AVAILABLE
+
+        # Retries, Retry-After and the per-host circuit breaker, for either kind of session
+        self.fetcher = ResilientFetcher(retry, metrics=self.metrics, on_response=self.record_response)
+
+    @property
+    def session(self):
+        """The calling thread's session; sessions aren't thread-safe, their connection pool is shared"""
+        return self.transport.session(cloudscraper=self.use_cloudscraper)
 
     def get_random_delay(self, min_delay: float = 2.0, max_delay: float = 5.0) -> float:
         """Generate a random delay to mimic human behavior"""
@@ -80,7 +102,7 @@ class RaceScraper:
             'User-Agent': random.choice(self.user_agents),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': ACCEPT_ENCODING,
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
@@ -94,82 +116,161 @@ class RaceScraper:
             headers['Referer'] = referer
         return headers
 
-    def scrape_page(self, url: str) -> List[Dict[str, str]]:
+    def fetch_page(self, url: str, extra_headers: Dict[str, str] = None) -> requests.Response:
+        """
+        Fetch a single page with retries, falling back to no SSL verification if needed
+
+        Args:
+            url: The URL to fetch
+            extra_headers: Headers added to the request (e.g. conditional GET headers)
+
+        Returns:
+            The successful response
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+        """
+        referer = 'https://runningintheusa.com/' if 'runningintheusa.com' in url else None
+        headers = self.get_headers(referer)
+        if extra_headers:
+            headers.update(extra_headers)
+        response = self.fetcher.get(self.session, url, headers=headers, timeout=30)
+
+        # Kept before the status check, so error and challenge pages are archived with their status too
+        if self.archive is not None and response.status_code != 304:
+            with self.metrics.timer('archive'):
+                self.archive.append(url, response.content, status=response.status_code)
+        response.raise_for_status()
+        return response
+
+    def record_response(self, response: requests.Response, seconds: float):
+        """
+        Split an attempt's time into waiting for the response headers and downloading the body
+
+        requests sets response.elapsed when the headers arrive (after connecting, TLS and
+        server time) and reads the body afterwards, so the rest of the call is the download.
+        """
+        to_headers = min(response.elapsed.total_seconds(), seconds)
+        self.metrics.observe('request', to_headers)
+        self.metrics.observe('download', seconds - to_headers)
+        self.metrics.count('requests')
+        self.metrics.count(f'responses_{response.status_code // 100}xx')
+        # Reading the content first makes urllib3 consume the whole body
+        self.metrics.count('decoded_bytes', len(response.content))
+        self.metrics.count('response_bytes', self.received_bytes(response))
+
+    @staticmethod
+    def received_bytes(response: requests.Response) -> int:
+        """
+        Size of a response body as it came over the wire, before gzip or brotli decoding
+
+        urllib3 counts the bytes it read from the socket. Responses without a raw
+        stream (HTTP/2 through httpx) fall back to Content-Length, then to the decoded size.
+        """
+        if response.raw is not None and hasattr(response.raw, 'tell'):
+            return response.raw.tell()
+        length = response.headers.get('Content-Length', '')
+        return int(length) if length.isdigit() else len(response.content)
+
+    def parse_races(self, content: bytes, url: str = None) -> List[Dict[str, str]]:
+        """
+        Extract race information from a listing page
+
+        Args:
+            content: Raw HTML of the listing page
+            url: The URL the HTML came from, for log messages and resolving race links
+
+        Returns:
+            List of dictionaries containing race information
+        """
+        races = self.parser.parse(content)
+        if url:
+            for race in races:
+                if 'URL' in race:
+                    race['URL'] = urljoin(url, race['URL'])
+
+        if not races:
+            print(f"No race items found on page: {url}")
+
+        return races
+
+    def scrape_page(self, url: str, delay: bool = True) -> List[Dict[str, str]]:
         """
         Scrape a single page for race information
 
         Args:
             url: The URL to scrape
+            delay: Sleep a random human-like delay before the request (default: True).
+                Callers that pace requests themselves pass False.
 
         Returns:
             List of dictionaries containing race information
         """
+        races, _ = self.fetch_listing(url, delay)
+        return races
+
+    def fetch_listing(self, url: str, delay: bool = True) -> Tuple[List[Dict[str, str]], Optional[bytes]]:
+        """
+        Scrape a single page, also returning its HTML for reading pagination links
+
+        Args:
+            url: The URL to scrape
+            delay: Sleep a random human-like delay before the request (default: True)
+
+        Returns:
+            Tuple of (races, raw HTML); the HTML is None if the request failed
+        """
         try:
+            cached = self.cache.lookup(url) if self.cache else None
+            if cached and self.cache.is_fresh(cached):
+                # Served from disk: no delay, no request, and no parsing unless the parser options changed
+                self.cache.record_hit()
+                self.metrics.count('cache_hits')
+                print(f"Using cached copy of {url}")
+                return self.cached_races(cached), cached.body
+
             # Add human-like delay before request
-            time.sleep(self.get_random_delay())
-
-            # Try with SSL verification first, fallback to no verification if needed
-            referer = 'https://runningintheusa.com/' if 'runningintheusa.com' in url else None
-            try:
-                response = self.session.get(url, headers=self.get_headers(referer), timeout=30, verify=True)
-            except requests.exceptions.SSLError:
-                print(f"SSL verification failed, trying without verification...")
-                response = self.session.get(url, headers=self.get_headers(referer), timeout=30, verify=False)
-
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'lxml')
-            races = []
-
-            # Find all race listings - they are in div elements with class 'list-item'
-            race_items = soup.find_all('div', class_='list-item')
-
-            if not race_items:
-                print(f"No race items found on page: {url}")
-                return []
-
-            for item in race_items:
-                try:
-                    # Extract date
-                    date_elem = item.find('div', class_='date')
-                    if not date_elem:
-                        continue
-
-                    # The date format is typically "Jan 31, 2026"
-                    date_text = date_elem.get_text(strip=True)
-
-                    # Extract race name
-                    name_elem = item.find('a', class_='thick')
-                    if not name_elem:
-                        continue
-                    race_name = name_elem.get_text(strip=True)
-
-                    # Extract location (city and state)
-                    location_elem = item.find('div', class_='location')
-                    if not location_elem:
-                        continue
-                    location_text = location_elem.get_text(strip=True)
-
-                    races.append({
-                        'Date': date_text,
-                        'Race Name': race_name,
-                        'Location': location_text
-                    })
-
-                except Exception as e:
-                    print(f"Error parsing race item: {e}")
-                    continue
-
-            return races
+            if delay:
+                with self.metrics.timer('delay'):
+                    time.sleep(self.get_random_delay())
+
+            extra_headers = self.cache.conditional_headers(cached) if cached else None
+            response = self.fetch_page(url, extra_headers)
+
+            if cached and response.status_code == 304:
+                # Unchanged since it was cached, so the stored parse is still valid
+                self.cache.mark_revalidated(cached, response)
+                self.metrics.count('cache_revalidated')
+                return self.cached_races(cached), cached.body
+
+            with self.metrics.timer('parse'):
+                races = self.parse_races(response.content, url)
+            # Pages without races are usually bot challenges; don't keep serving them
+            if self.cache and races:
+                self.cache.store(url, response, races, previous=cached, parsed_with=self.parsed_with)
+            return races, response.content
 
         except requests.exceptions.RequestException as e:
             print(f"Error fetching {url}: {e}")
-            return []
+            self.metrics.count('request_errors')
+            return [], None
         except Exception as e:
             print(f"Unexpected error scraping page: {e}")
-            return []
-
-    def build_url(self, start_date: str, end_date: str, page: int = 1) -> str:
+            self.metrics.count('page_errors')
+            return [], None
+
+    def cached_races(self, cached: 'CachedResponse') -> List[Dict[str, str]]:
+        """A cached page's races, parsed again from its body if they were parsed with other options"""
+        if cached.parsed_with == self.parsed_with:
+            return cached.races
+        with self.metrics.timer('parse'):
+            races = self.parse_races(cached.body, cached.url)
+        self.cache.replace_races(cached.url, races, self.parsed_with)
+        self.metrics.count('cache_reparsed')
+        return races
+
+    def build_url(self, start_date: str, end_date: str, page: int = 1,
+                  distance: str = DEFAULT_DISTANCE) -> str:
         """
         Build the URL for a specific page
 
@@ -177,14 +278,16 @@ class RaceScraper:
             start_date: Start date in MM-DD-YYYY format
             end_date: End date in MM-DD-YYYY format
             page: Page number (default: 1)
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
 
         Returns:
             The constructed URL
         """
-        base_url = "https://runningintheusa.com/classic/list/map"
-        return f"{base_url}/{start_date}-to-{end_date}/10k-to-100m/page-{page}"
+        return f"{self.base_url}/{start_date}-to-{end_date}/{distance}/page-{page}"
 
-    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20) -> List[Dict[str, str]]:
+    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20,
+                          checkpoint: 'Checkpoint' = None,
+                          distance: str = DEFAULT_DISTANCE) -> List[Dict[str, str]]:
         """
         Scrape all races within a date range
 
@@ -192,38 +295,160 @@ class RaceScraper:
             start_date: Start date in MM-DD-YYYY format
             end_date: End date in MM-DD-YYYY format
             max_pages: Maximum number of pages to scrape (default: 20)
+            checkpoint: Optional checkpoint.Checkpoint to resume from and record pages in
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
 
         Returns:
             List of all races found
         """
-        all_races = []
+        with self.metrics.timer('scrape'):
+            all_races, _ = self.paginate(start_date, end_date, max_pages, checkpoint=checkpoint, distance=distance)
+        return all_races
+
+    def iter_pages(self, start_date: str, end_date: str, max_pages: int = 20, delay: bool = True,
+                   plan: PagePlan = None, checkpoint: 'Checkpoint' = None, distance: str = DEFAULT_DISTANCE
+                   ) -> Iterator[Tuple[int, str, List[Dict[str, str]]]]:
+        """
+        Scrape a date range lazily, one page per step
+
+        The next page is only requested once the caller asks for it, so a slow
+        consumer naturally slows the scrape down. When page 1 links to the
+        listing's other pages, pagination stops at the last of them without
+        requesting an empty page after it.
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape (default: 20)
+            delay: Sleep a random human-like delay before each request (default: True)
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
+            checkpoint: Optional checkpoint.Checkpoint; pages already in it are not fetched
+                again, and every new page with races is appended to it
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+
+        Yields:
+            Tuples of (page number, URL, races on that page). The final page may be empty.
+        """
+        plan = plan or PagePlan(max_pages)
+        total = 0
 
         print(f"Starting scrape for dates: {start_date} to {end_date}")
         print(f"Maximum pages: {max_pages}")
         print("-" * 60)
 
-        for page in range(1, max_pages + 1):
-            url = self.build_url(start_date, end_date, page)
-            print(f"Scraping page {page}/{max_pages}...")
-            print(f"URL: {url}")
-
-            races = self.scrape_page(url)
+        page = 1
+        while page <= plan.last_page:
+            url = self.build_url(start_date, end_date, page, distance)
+            completed = checkpoint.lookup(url) if checkpoint else None
+            if completed and completed.parsed_with != self.parsed_with:
+                # Recorded without the fields this scraper's parser keeps (e.g. race links); fetch it again
+                completed = None
+            if completed:
+                print(f"Page {page} already in the checkpoint ({len(completed.races)} races)")
+                self.metrics.count('checkpoint_pages')
+                races = completed.races
+                plan.observe(page, races, info=completed.pagination)
+            else:
+                print(f"Scraping page {page}/{plan.last_page if plan.known else max_pages}...")
+                print(f"URL: {url}")
+
+                races, content = self.fetch_listing(url, delay)
+                info = read_pagination(content)
+                # fetch_listing gives no HTML when the request failed
+                plan.observe(page, races, info=info, failed=content is None)
+                # Empty pages are often blocked requests, so they are fetched again on resume
+                if checkpoint and races:
+                    checkpoint.record(url, page, races, info, self.parsed_with)
 
             if not races:
                 print(f"No races found on page {page}. Stopping pagination.")
-                break
-
-            all_races.extend(races)
+                if plan.incomplete:
+                    print(plan.summary())
+                yield page, url, races
+                return
+
+            total += len(races)
+            self.metrics.count('pages')
+            self.metrics.count('races', len(races))
             print(f"Found {len(races)} races on page {page}")
-            print(f"Total races so far: {len(all_races)}")
+            print(f"Total races so far: {total}")
             print("-" * 60)
 
-            # If we got fewer races than expected, we might be at the last page
-            if len(races) < 10:  # Assuming typical page has at least 10 races
-                print("Fewer races than expected. Likely reached the last page.")
-                break
+            yield page, url, races
 
-        return all_races
+            if plan.is_last(page):
+                if plan.truncated:
+                    print(plan.summary())
+                elif plan.known:
+                    print(f"Reached the last listed page ({page}).")
+                elif page < max_pages:
+                    print("Fewer races than expected. Likely reached the last page.")
+                return
+            page += 1
+
+    def iter_races(self, start_date: str, end_date: str, max_pages: int = 20,
+                   delay: bool = True, distance: str = DEFAULT_DISTANCE) -> Iterator[Dict[str, str]]:
+        """
+        Yield races within a date range as soon as each page is parsed
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape (default: 20)
+            delay: Sleep a random human-like delay before each request (default: True)
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+
+        Yields:
+            Race dictionaries in page order
+        """
+        for _, _, races in self.iter_pages(start_date, end_date, max_pages, delay, distance=distance):
+            yield from races
+
+    def paginate(self, start_date: str, end_date: str, max_pages: int = 20, delay: bool = True,
+                 on_page: Callable[[int, str, List[Dict[str, str]]], None] = None,
+                 checkpoint: 'Checkpoint' = None, distance: str = DEFAULT_DISTANCE, plan: PagePlan = None
+                 ) -> Tuple[List[Dict[str, str]], bool]:
+        """
+        Scrape a date range page by page, reporting whether max_pages cut it short
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape (default: 20)
+            delay: Sleep a random human-like delay before each request (default: True)
+            on_page: Called as on_page(page, url, races) after each page is scraped
+            checkpoint: Optional checkpoint.Checkpoint to resume from and record pages in
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check plan.incomplete
+
+        Returns:
+            Tuple of (all races found, True if max_pages cut the range short). Pass a plan
+            to also see whether a page in the middle failed (plan.incomplete).
+        """
+        all_races = []
+        plan = plan or PagePlan(max_pages)
+
+        for page, url, races in self.iter_pages(start_date, end_date, max_pages, delay, plan, checkpoint, distance):
+            if on_page:
+                on_page(page, url, races)
+            all_races.extend(races)
+
+        return all_races, plan.truncated
+
+    def export(self, races: Iterable[Dict[str, str]], filename: str, fmt: str = None) -> str:
+        """
+        Stream races to CSV, JSON Lines, Parquet or Excel in row batches
+
+        Args:
+            races: Any iterable of race dictionaries, e.g. iter_races(...)
+            filename: Output filename
+            fmt: 'csv', 'jsonl', 'parquet' or 'xlsx' (default: taken from the extension)
+
+        Returns:
+            The filename of the exported file
+        """
+        from exporters import export_races
+        return export_races(races, filename, fmt)
 
     def export_to_excel(self, races: List[Dict[str, str]], filename: str = None) -> str:
         """
@@ -248,9 +473,12 @@ class RaceScraper:
         if not filename.endswith('.xlsx'):
             filename += '.xlsx'
 
+        import pandas as pd
+
         # Create DataFrame and export
-        df = pd.DataFrame(races)
-        df.to_excel(filename, index=False, engine='openpyxl')
+        with self.metrics.timer('export'):
+            df = pd.DataFrame(races)
+            df.to_excel(filename, index=False, engine='openpyxl')
 
         print(f"\n✓ Successfully exported {len(races)} races to {filename}")
         return filename
@@ -291,13 +519,26 @@ def main():
 
     print()
 
+    # Every finished page goes to the checkpoint journal, so a failed run can be resumed
+    from checkpoint import Checkpoint, checkpoint_options
+    options = checkpoint_options()
+    checkpoint = Checkpoint(options.checkpoint, resume=options.resume)
+
     # Run scraper
     scraper = RaceScraper()
-    races = scraper.scrape_date_range(start_date, end_date, max_pages)
+    try:
+        races = scraper.scrape_date_range(start_date, end_date, max_pages, checkpoint=checkpoint)
+    except KeyboardInterrupt:
+        print(f"\n\nScraping interrupted. Finished pages are saved in {checkpoint.path}; "
+              f"run again with --resume to continue.")
+        sys.exit(1)
+    finally:
+        checkpoint.close()
 
     if races:
         # Export to Excel
         filename = scraper.export_to_excel(races, output_file)
+        checkpoint.remove()
 
         # Display summary
         print()
@@ -10,57 +10,189 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import pandas as pd
+from selenium.common.exceptions import TimeoutException
 import time
 import random
+import threading
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterator, List, Dict, Tuple, TYPE_CHECKING
+from urllib.parse import urlsplit
+import os
 import sys
 
+from checkpoint import Checkpoint, checkpoint_options
+from metrics import METRICS, Metrics
+from pagination import PagePlan, read_pagination
+from race_scraper import DEFAULT_DISTANCE
+
+if TYPE_CHECKING:
+    from html_archive import HtmlArchive
+
+
+DEFAULT_BASE_URL = "https://runningintheusa.com/classic/list/map"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+@lru_cache(maxsize=1)
+def chromedriver_path() -> str:
+    """Download (once per process) the ChromeDriver matching the installed Chrome"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+def create_driver(headless: bool = False) -> webdriver.Chrome:
+    """
+    Start a Chrome WebDriver configured to look like a regular browser
+
+    Args:
+        headless: Run browser in headless mode (no GUI)
+
+    Returns:
+        The started driver
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
+
+    # Add arguments to make it less detectable
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+
+    # Exclude the collection of enable-automation switches
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    # Initialize the driver
+    service = Service(chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    # Execute CDP commands to prevent detection
+    driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": USER_AGENT})
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+    return driver
+
+
+# Any element that only appears once the race listing has rendered
+LISTING_READY_SELECTOR = 'div.list-item, div.race-item, tr.race, div[data-type="race"]'
+
+
+class listing_ready:
+    """
+    WebDriverWait condition: the listing has rendered, or the page finished
+    loading and stayed without a listing for empty_grace seconds (e.g. past
+    the last page)
+    """
+
+    def __init__(self, selector: str = LISTING_READY_SELECTOR, empty_grace: float = 1.5):
+        self.selector = selector
+        self.empty_grace = empty_grace
+        self.complete_since = None
+
+    def __call__(self, driver):
+        if driver.find_elements(By.CSS_SELECTOR, self.selector):
+            return 'listing'
+        if driver.execute_script('return document.readyState') == 'complete':
+            now = time.monotonic()
+            if self.complete_since is None:
+                self.complete_since = now
+            elif now - self.complete_since >= self.empty_grace:
+                return 'empty'
+        else:
+            self.complete_since = None
+        return False
+
+
+def wait_until_ready(driver, timeout: float = 20, selector: str = LISTING_READY_SELECTOR,
+                     empty_grace: float = 1.5) -> str:
+    """
+    Wait until the current page is ready to parse
+
+    Args:
+        driver: The browser
+        timeout: Maximum seconds to wait (default: 20)
+        selector: CSS selector that marks the listing as rendered
+        empty_grace: Seconds a fully loaded page may stay without a listing before it counts as empty
+
+    Returns:
+        'listing', 'empty' or 'timeout'
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.1).until(listing_ready(selector, empty_grace))
+    except TimeoutException:
+        return 'timeout'
+
+
+class HostThrottle:
+    """Enforces a minimum interval between page loads on the same host, across threads"""
+
+    def __init__(self, min_interval: float = 2.0):
+        """
+        Args:
+            min_interval: Minimum seconds between the starts of two loads from one host (default: 2.0)
+        """
+        self.min_interval = min_interval
+        self._next_allowed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        """
+        Block until a load from the URL's host is allowed
+
+        Returns:
+            Seconds spent waiting
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = start + self.min_interval
+        waited = start - now
+        if waited > 0:
+            time.sleep(waited)
+        return waited
+
 
 class SeleniumRaceScraper:
     """Scrapes race information using Selenium WebDriver"""
 
-    def __init__(self, headless: bool = False, manual_verification: bool = True):
+    def __init__(self, headless: bool = False, manual_verification: bool = True,
+                 base_url: str = DEFAULT_BASE_URL, page_timeout: float = 20,
+                 min_interval: float = 2.0, throttle: HostThrottle = None, metrics: Metrics = None,
+                 archive: 'HtmlArchive' = None):
         """
         Initialize the Selenium scraper
 
         Args:
             headless: Run browser in headless mode (no GUI) - default False for manual verification
             manual_verification: Pause for manual human verification on first page
+            base_url: Listing URL that page paths are appended to (default: the live site)
+            page_timeout: Maximum seconds to wait for a page to be ready (default: 20)
+            min_interval: Minimum seconds between page loads on one host (default: 2.0)
+            throttle: HostThrottle to share with other browsers (created from min_interval if omitted)
+            metrics: Registry for stage timings and counters (default: the process-wide METRICS)
+            archive: Optional html_archive.HtmlArchive that keeps the HTML of every loaded page
         """
         print("Initializing Selenium WebDriver...")
 
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument('--headless=new')
-
-        # Add arguments to make it less detectable
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-
-        # Exclude the collection of enable-automation switches
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-
-        # Initialize the driver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-
-        # Execute CDP commands to prevent detection
-        self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-            "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
+        self.driver = create_driver(headless)
+        self.base_url = base_url.rstrip('/')
         self.manual_verification = manual_verification
         self.verification_completed = False
+        self.page_timeout = page_timeout
+        self.throttle = throttle or HostThrottle(min_interval)
+        self.metrics = metrics or METRICS
+        self.archive = archive
+        # One entry per loaded page: url, throttle_wait, load, time_to_ready, outcome, races
+        self.page_timings: List[Dict] = []
+        self._timings_lock = threading.Lock()
 
         print("✓ WebDriver initialized successfully")
 
@@ -79,14 +211,13 @@ class SeleniumRaceScraper:
             List of dictionaries containing race information
         """
         try:
-            # Add human-like delay
-            time.sleep(self.get_random_delay())
+            # Honour the per-host politeness interval
+            waited = self.throttle.wait(url)
 
             print(f"Loading page: {url}")
+            started = time.monotonic()
             self.driver.get(url)
-
-            # Wait for the page to load
-            time.sleep(self.get_random_delay(3, 5))
+            loaded = time.monotonic()
 
             # Handle manual verification on first page
             if self.manual_verification and not self.verification_completed:
@@ -105,12 +236,72 @@ class SeleniumRaceScraper:
 
                 self.verification_completed = True
                 print("\n✓ Verification completed! Continuing with automated scraping...\n")
+                loaded = started = time.monotonic()
+
+            outcome = wait_until_ready(self.driver, self.page_timeout)
+            ready = time.monotonic()
+            page_source = self.driver.page_source
+            if self.archive is not None:
+                with self.metrics.timer('archive'):
+                    self.archive.append(url, page_source.encode('utf-8'))
+            with self.metrics.timer('parse'):
+                races = self.parse_races(page_source)
+            self.record_timing(url, waited, loaded - started, ready - started, outcome, len(races))
+            return races
 
-                # Give a moment for any final page loads
-                time.sleep(2)
+        except Exception as e:
+            print(f"Error scraping page: {e}")
+            return []
+
+    def record_timing(self, url: str, throttle_wait: float, load: float, time_to_ready: float,
+                      outcome: str, races: int):
+        """Record where a page's load time went"""
+        with self._timings_lock:
+            self.page_timings.append({
+                'url': url,
+                'throttle_wait': round(throttle_wait, 3),
+                'load': round(load, 3),
+                'time_to_ready': round(time_to_ready, 3),
+                'outcome': outcome,
+                'races': races,
+            })
+        self.metrics.observe('throttle_wait', throttle_wait)
+        self.metrics.observe('page_load', load)
+        self.metrics.observe('time_to_ready', time_to_ready)
+        if outcome == 'timeout':
+            self.metrics.count('page_timeouts')
+        print(f"Page ready in {time_to_ready:.2f}s ({outcome}), waited {throttle_wait:.2f}s for politeness")
+
+    def timing_summary(self) -> Dict[str, float]:
+        """Aggregate page timings: pages, mean/max time to ready, total politeness wait, timeouts"""
+        with self._timings_lock:
+            timings = list(self.page_timings)
+        if not timings:
+            return {'pages': 0}
+        ready = [t['time_to_ready'] for t in timings]
+        return {
+            'pages': len(timings),
+            'mean_time_to_ready': round(sum(ready) / len(ready), 3),
+            'max_time_to_ready': max(ready),
+            'total_throttle_wait': round(sum(t['throttle_wait'] for t in timings), 3),
+            'timeouts': sum(1 for t in timings if t['outcome'] == 'timeout'),
+        }
+
+    def parse_races(self, page_source: str) -> List[Dict[str, str]]:
+        """
+        Extract race information from a rendered listing page
+
+        Args:
+            page_source: HTML of the page as rendered by the browser
+
+        Returns:
+            List of dictionaries containing race information
+        """
+        from bs4 import BeautifulSoup
 
-            # Get the page source and parse with BeautifulSoup
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+        try:
+            # Parse with BeautifulSoup
+            soup = BeautifulSoup(page_source, 'html.parser')
             races = []
 
             # Try multiple possible selectors for race items
@@ -195,53 +386,106 @@ class SeleniumRaceScraper:
             return races
 
         except Exception as e:
-            print(f"Error scraping page: {e}")
+            print(f"Error parsing page: {e}")
             return []
 
-    def build_url(self, start_date: str, end_date: str, page: int = 1) -> str:
+    def build_url(self, start_date: str, end_date: str, page: int = 1,
+                  distance: str = DEFAULT_DISTANCE) -> str:
         """Build the URL for a specific page"""
-        base_url = "https://runningintheusa.com/classic/list/map"
-        return f"{base_url}/{start_date}-to-{end_date}/10k-to-100m/page-{page}"
+        return f"{self.base_url}/{start_date}-to-{end_date}/{distance}/page-{page}"
 
-    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20) -> List[Dict[str, str]]:
+    def iter_pages(self, start_date: str, end_date: str, max_pages: int = 20, checkpoint: 'Checkpoint' = None,
+                   distance: str = DEFAULT_DISTANCE, plan: PagePlan = None
+                   ) -> Iterator[Tuple[int, str, List[Dict[str, str]]]]:
         """
-        Scrape all races within a date range
+        Scrape a date range lazily, loading the next page only when asked for it
 
         Args:
             start_date: Start date in MM-DD-YYYY format
             end_date: End date in MM-DD-YYYY format
             max_pages: Maximum number of pages to scrape
+            checkpoint: Optional checkpoint.Checkpoint; pages already in it are not loaded
+                again, and every new page with races is appended to it
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
 
-        Returns:
-            List of all races found
+        Yields:
+            Tuples of (page number, URL, races on that page). The final page may be empty.
         """
-        all_races = []
+        plan = plan or PagePlan(max_pages)
+        total = 0
 
         print(f"Starting scrape for dates: {start_date} to {end_date}")
         print(f"Maximum pages: {max_pages}")
         print("-" * 60)
 
-        for page in range(1, max_pages + 1):
-            url = self.build_url(start_date, end_date, page)
-            print(f"Scraping page {page}/{max_pages}...")
+        page = 1
+        while page <= plan.last_page:
+            url = self.build_url(start_date, end_date, page, distance)
+            completed = checkpoint.lookup(url) if checkpoint else None
+            if completed:
+                print(f"Page {page} already in the checkpoint ({len(completed.races)} races)")
+                self.metrics.count('checkpoint_pages')
+                races = completed.races
+                plan.observe(page, races, info=completed.pagination)
+            else:
+                print(f"Scraping page {page}/{plan.last_page if plan.known else max_pages}...")
 
-            races = self.scrape_page(url)
+                races = self.scrape_page(url)
+                info = read_pagination(self.driver.page_source if races else None)
+                plan.observe(page, races, info=info)
+                if checkpoint and races:
+                    checkpoint.record(url, page, races, info)
 
             if not races:
                 print(f"No races found on page {page}. Stopping pagination.")
-                break
+                yield page, url, races
+                return
 
-            all_races.extend(races)
+            total += len(races)
+            self.metrics.count('pages')
+            self.metrics.count('races', len(races))
             print(f"Found {len(races)} races on page {page}")
-            print(f"Total races so far: {len(all_races)}")
+            print(f"Total races so far: {total}")
             print("-" * 60)
 
-            # If we got fewer races than expected, we might be at the last page
-            if len(races) < 10:
-                print("Fewer races than expected. Likely reached the last page.")
-                break
+            yield page, url, races
+
+            if plan.is_last(page):
+                if plan.truncated or plan.incomplete:
+                    print(plan.summary())
+                elif plan.known:
+                    print(f"Reached the last listed page ({page}).")
+                elif page < max_pages:
+                    print("Fewer races than expected. Likely reached the last page.")
+                return
+            page += 1
+
+    def iter_races(self, start_date: str, end_date: str, max_pages: int = 20, checkpoint: 'Checkpoint' = None,
+                   distance: str = DEFAULT_DISTANCE, plan: PagePlan = None) -> Iterator[Dict[str, str]]:
+        """Yield races within a date range as soon as each page is parsed"""
+        for _, _, races in self.iter_pages(start_date, end_date, max_pages, checkpoint, distance, plan):
+            yield from races
+
+    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20,
+                          checkpoint: 'Checkpoint' = None, distance: str = DEFAULT_DISTANCE,
+                          plan: PagePlan = None) -> List[Dict[str, str]]:
+        """
+        Scrape all races within a date range
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape
+            checkpoint: Optional checkpoint.Checkpoint to resume from and record pages in
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
 
-        return all_races
+        Returns:
+            List of all races found
+        """
+        with self.metrics.timer('scrape'):
+            return list(self.iter_races(start_date, end_date, max_pages, checkpoint, distance, plan))
 
     def export_to_excel(self, races: List[Dict[str, str]], filename: str = None) -> str:
         """Export races to an Excel file"""
@@ -256,8 +500,11 @@ class SeleniumRaceScraper:
         if not filename.endswith('.xlsx'):
             filename += '.xlsx'
 
-        df = pd.DataFrame(races)
-        df.to_excel(filename, index=False, engine='openpyxl')
+        import pandas as pd
+
+        with self.metrics.timer('export'):
+            df = pd.DataFrame(races)
+            df.to_excel(filename, index=False, engine='openpyxl')
 
         print(f"\n✓ Successfully exported {len(races)} races to {filename}")
         return filename
@@ -309,14 +556,19 @@ def main():
     print("You will be asked to complete any human verification challenges.")
     print()
 
+    # Every finished page goes to the checkpoint journal, so a failed run can be resumed
+    options = checkpoint_options()
+    checkpoint = Checkpoint(options.checkpoint, resume=options.resume)
+
     # Run scraper using context manager (non-headless with manual verification by default)
     try:
         with SeleniumRaceScraper(headless=False, manual_verification=True) as scraper:
-            races = scraper.scrape_date_range(start_date, end_date, max_pages)
+            races = scraper.scrape_date_range(start_date, end_date, max_pages, checkpoint=checkpoint)
 
             if races:
                 # Export to Excel
                 filename = scraper.export_to_excel(races, output_file)
+                checkpoint.remove()
 
                 # Display summary
                 print()
@@ -325,6 +577,7 @@ def main():
                 print("=" * 60)
                 print(f"Total races found: {len(races)}")
                 print(f"Output file: {filename}")
+                print(f"Page timing: {scraper.timing_summary()}")
                 print()
                 print("Sample of first 3 races:")
                 for i, race in enumerate(races[:3], 1):
@@ -338,6 +591,10 @@ def main():
         print(f"\nError: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        checkpoint.close()
+        if os.path.exists(checkpoint.path):
+            print(f"Finished pages are saved in {checkpoint.path}; run again with --resume to continue.")
 
 
 if __name__ == "__main__":
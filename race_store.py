@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Persistent race store and incremental scraping
+Keeps every race seen in SQLite so repeated runs only fetch stale ranges
+and report what changed
+"""
+
+import sqlite3
+import time
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
+
+from pagination import PagePlan
+from race_model import parse_listing_date
+from sharding import plan_shards, parse_date
+
+if TYPE_CHECKING:
+    from race_scraper import RaceScraper
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so cosmetic differences share an identity"""
+    return ' '.join(text.casefold().split())
+
+
+def race_date(race: Dict[str, str]) -> Optional[str]:
+    """The race's date as YYYY-MM-DD, or None if the listing date can't be parsed"""
+    parsed = parse_listing_date(race['Date'])
+    return parsed.isoformat() if parsed else None
+
+
+def race_identity(race: Dict[str, str]) -> str:
+    """Normalized (Date, Race Name, Location) key identifying a race across runs"""
+    return '|'.join([
+        race_date(race) or normalize_text(race['Date']),
+        normalize_text(race['Race Name']),
+        normalize_text(race['Location']),
+    ])
+
+
+class ChangeReport:
+    """Races inserted, updated and removed by an incremental run"""
+
+    def __init__(self):
+        self.inserted: List[Dict[str, str]] = []
+        self.updated: List[Dict[str, str]] = []
+        self.removed: List[Dict[str, str]] = []
+        self.ranges_scraped = 0
+        self.ranges_skipped = 0
+
+    @property
+    def changed(self) -> List[Dict[str, str]]:
+        """Inserted and updated races - the rows worth writing out"""
+        return self.inserted + self.updated
+
+    def merge(self, other: 'ChangeReport'):
+        """Add another report's changes to this one"""
+        self.inserted.extend(other.inserted)
+        self.updated.extend(other.updated)
+        self.removed.extend(other.removed)
+        self.ranges_scraped += other.ranges_scraped
+        self.ranges_skipped += other.ranges_skipped
+
+    def summary(self) -> str:
+        return (f"{len(self.inserted)} inserted, {len(self.updated)} updated, {len(self.removed)} removed "
+                f"({self.ranges_scraped} ranges scraped, {self.ranges_skipped} still fresh)")
+
+
+class RaceStore:
+    """SQLite store of races keyed on their normalized identity"""
+
+    def __init__(self, path: str = 'races.sqlite'):
+        """
+        Open (or create) the store
+
+        Args:
+            path: SQLite database file (default: races.sqlite)
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS races ('
+            ' identity TEXT PRIMARY KEY,'
+            ' race_date TEXT,'
+            ' date TEXT NOT NULL,'
+            ' race_name TEXT NOT NULL,'
+            ' location TEXT NOT NULL,'
+            ' first_seen REAL NOT NULL,'
+            ' last_seen REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS races_by_date ON races (race_date);'
+            'CREATE TABLE IF NOT EXISTS scraped_ranges ('
+            ' start_date TEXT NOT NULL,'
+            ' end_date TEXT NOT NULL,'
+            ' scraped_at REAL NOT NULL,'
+            ' PRIMARY KEY (start_date, end_date));'
+            'CREATE TABLE IF NOT EXISTS scraped_pages ('
+            ' url TEXT PRIMARY KEY,'
+            ' scraped_at REAL NOT NULL,'
+            ' race_count INTEGER NOT NULL);'
+        )
+        self._conn.commit()
+
+    def range_last_scraped(self, start_date: str, end_date: str) -> Optional[float]:
+        """
+        When a range was last fully scraped
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+
+        Returns:
+            Timestamp of the most recent scrape covering the whole range, or None
+        """
+        row = self._conn.execute(
+            'SELECT MAX(scraped_at) FROM scraped_ranges WHERE start_date <= ? AND end_date >= ?',
+            (parse_date(start_date).isoformat(), parse_date(end_date).isoformat())
+        ).fetchone()
+        return row[0]
+
+    def record_page(self, url: str, race_count: int):
+        """Remember when a listing page was last scraped"""
+        self._conn.execute('INSERT OR REPLACE INTO scraped_pages VALUES (?, ?, ?)',
+                           (url, time.time(), race_count))
+        self._conn.commit()
+
+    def page_last_scraped(self, url: str) -> Optional[float]:
+        """When a listing page was last scraped, or None"""
+        row = self._conn.execute('SELECT scraped_at FROM scraped_pages WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def races_between(self, start_date: str, end_date: str) -> List[Dict[str, str]]:
+        """Stored races dated within a range (MM-DD-YYYY), in date order"""
+        rows = self._conn.execute(
+            'SELECT date, race_name, location FROM races WHERE race_date BETWEEN ? AND ? '
+            'ORDER BY race_date, first_seen',
+            (parse_date(start_date).isoformat(), parse_date(end_date).isoformat())
+        ).fetchall()
+        return [{'Date': d, 'Race Name': n, 'Location': l} for d, n, l in rows]
+
+    def apply_range(self, start_date: str, end_date: str, races: List[Dict[str, str]],
+                    complete: bool = True) -> ChangeReport:
+        """
+        Merge a fresh scrape of a range into the store
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            races: Every race the scrape found in the range
+            complete: Whether the scrape covered the whole range. Races missing
+                from an incomplete scrape are not treated as removed.
+
+        Returns:
+            ChangeReport for this range
+        """
+        report = ChangeReport()
+        now = time.time()
+        first, last = parse_date(start_date).isoformat(), parse_date(end_date).isoformat()
+        existing = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                'SELECT identity, date, race_name, location FROM races WHERE race_date BETWEEN ? AND ?',
+                (first, last))
+        }
+
+        seen = set()
+        for race in races:
+            identity = race_identity(race)
+            seen.add(identity)
+            values = (race['Date'], race['Race Name'], race['Location'])
+            stored = self._conn.execute('SELECT date, race_name, location FROM races WHERE identity = ?',
+                                        (identity,)).fetchone()
+            if stored is None:
+                self._conn.execute('INSERT INTO races VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (identity, race_date(race)) + values + (now, now))
+                report.inserted.append(race)
+            elif tuple(stored) != values:
+                self._conn.execute(
+                    'UPDATE races SET date = ?, race_name = ?, location = ?, last_seen = ? WHERE identity = ?',
+                    values + (now, identity))
+                report.updated.append(race)
+            else:
+                self._conn.execute('UPDATE races SET last_seen = ? WHERE identity = ?', (now, identity))
+
+        # An empty result is more likely a blocked request than an emptied range
+        if complete and races:
+            for identity, (d, n, l) in existing.items():
+                if identity not in seen:
+                    self._conn.execute('DELETE FROM races WHERE identity = ?', (identity,))
+                    report.removed.append({'Date': d, 'Race Name': n, 'Location': l})
+
+        if complete:
+            self._conn.execute('INSERT OR REPLACE INTO scraped_ranges VALUES (?, ?, ?)', (first, last, now))
+
+        self._conn.commit()
+        return report
+
+    def close(self):
+        """Close the underlying database"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class IncrementalScraper:
+    """Scrapes only the parts of a date range whose stored copy is stale"""
+
+    def __init__(self, store: RaceStore, scraper: 'RaceScraper' = None, max_age: float = 6 * 3600,
+                 granularity: str = 'week', max_pages: int = 50, delay: bool = True):
+        """
+        Initialize the incremental scraper
+
+        Args:
+            store: RaceStore holding previous results
+            scraper: RaceScraper used for stale ranges (created if omitted)
+            max_age: Seconds after which a scraped range is fetched again (default: 6 hours)
+            granularity: Size of the ranges staleness is tracked for: 'day', 'week' or 'month'
+            max_pages: Pagination ceiling per range (default: 50)
+            delay: Keep the random human-like delay before each request (default: True)
+        """
+        self.store = store
+        if scraper is None:
+            from race_scraper import RaceScraper
+            scraper = RaceScraper()
+        self.scraper = scraper
+        self.max_age = max_age
+        self.granularity = granularity
+        self.max_pages = max_pages
+        self.delay = delay
+
+    def stale_ranges(self, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """Shards of a date range that have not been scraped within max_age"""
+        now = time.time()
+        stale = []
+        for shard_start, shard_end in plan_shards(start_date, end_date, self.granularity):
+            scraped_at = self.store.range_last_scraped(shard_start, shard_end)
+            if scraped_at is None or now - scraped_at >= self.max_age:
+                stale.append((shard_start, shard_end))
+        return stale
+
+    def scrape(self, start_date: str, end_date: str) -> ChangeReport:
+        """
+        Bring the store up to date for a date range
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+
+        Returns:
+            ChangeReport listing inserted, updated and removed races
+        """
+        report = ChangeReport()
+        shards = plan_shards(start_date, end_date, self.granularity)
+        stale = self.stale_ranges(start_date, end_date)
+        report.ranges_skipped = len(shards) - len(stale)
+
+        for shard_start, shard_end in stale:
+            plan = PagePlan(self.max_pages)
+            races, truncated = self.scraper.paginate(
+                shard_start, shard_end, self.max_pages, self.delay,
+                on_page=lambda page, url, page_races: self.store.record_page(url, len(page_races)),
+                plan=plan
+            )
+            if truncated:
+                print(f"Warning: {shard_start} to {shard_end} hit {self.max_pages} pages; "
+                      f"not checking it for removed races")
+            if plan.incomplete:
+                # Races after a failed page were never seen, so they must not be counted as removed
+                print(f"Warning: page {plan.lost_pages[0]} of {shard_start} to {shard_end} failed; "
+                      f"not checking it for removed races and scraping it again next run")
+            # An incomplete range is not recorded as scraped, so it stays stale
+            shard_report = self.store.apply_range(shard_start, shard_end, races,
+                                                  complete=not (truncated or plan.incomplete))
+            shard_report.ranges_scraped = 1
+            report.merge(shard_report)
+
+        print(f"Incremental scrape {start_date} to {end_date}: {report.summary()}")
+        return report
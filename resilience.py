@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Retries, backoff and per-host circuit breaking for HTTP sessions
+Works the same for plain requests sessions and cloudscraper sessions, so every
+scraper handles throttling and server errors the same way
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import METRICS, Metrics
+
+# Responses worth another attempt: throttling and temporary server trouble
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+def parse_retry_after(value: Optional[str], now: float = None) -> Optional[float]:
+    """
+    Seconds to wait according to a Retry-After header
+
+    Args:
+        value: Header value, either delay seconds ("120") or an HTTP date
+        now: Current Unix time, for HTTP dates (default: time.time())
+
+    Returns:
+        Seconds to wait (never negative), or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class RetryPolicy:
+    """How many attempts a request gets and how long to wait between them"""
+
+    def __init__(self, attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_retry_after: float = 300.0, statuses: Iterable[int] = RETRY_STATUSES):
+        """
+        Args:
+            attempts: Tries per request, including the first (default: 4)
+            base_delay: Backoff ceiling for the first retry; it doubles per retry (default: 1.0)
+            max_delay: Largest backoff ceiling (default: 60)
+            max_retry_after: Longest Retry-After that is honoured; longer ones end the retries (default: 300)
+            statuses: Status codes that are retried (default: 429, 500, 502, 503, 504)
+        """
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.statuses: FrozenSet[int] = frozenset(statuses)
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter exponential backoff before retry number retry (0 for the first retry)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class CircuitBreaker:
+    """
+    Shared request gate for one host
+
+    Every request to the host waits in acquire() while the host is paused, so
+    one worker hitting a 429 pauses the whole pool instead of each worker
+    failing on its own. After failure_threshold failures in a row the breaker
+    opens: nothing is sent until the cooldown ends, then a single probe
+    request is let through while the others wait for its result. A failed
+    probe reopens the breaker with twice the cooldown, up to max_cooldown.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        """
+        Args:
+            failure_threshold: Failures in a row that open the breaker (default: 5)
+            cooldown: Seconds the breaker first stays open (default: 30)
+            max_cooldown: Longest cooldown after repeated failed probes (default: 300)
+        """
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Wait until a request may be sent to the host
+
+        Returns:
+            Seconds spent waiting (0 if the host was open straight away)
+        """
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._condition.wait(self.paused_until - now)
+                elif self.state == self.OPEN:
+                    # Cooldown over: this caller sends the probe
+                    self.state = self.HALF_OPEN
+                    break
+                elif self.state == self.HALF_OPEN:
+                    self._condition.wait()
+                else:
+                    break
+                waited = True
+        return time.monotonic() - started if waited else 0.0
+
+    def record_success(self):
+        """The host answered normally"""
+        with self._condition:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self.cooldown = self.base_cooldown
+                self._condition.notify_all()
+
+    def record_failure(self, pause: float = 0.0):
+        """
+        The host throttled, failed or could not be reached
+
+        Args:
+            pause: Seconds every caller should hold off, e.g. from Retry-After (default: 0)
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.failures += 1
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state == self.HALF_OPEN:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.state = self.OPEN
+                self.opened += 1
+                self.failures = 0
+                self.paused_until = max(self.paused_until, now + self.cooldown)
+            self._condition.notify_all()
+
+
+class HostBreakers:
+    """One CircuitBreaker per host, created on first use"""
+
+    def __init__(self, **breaker_options):
+        """
+        Args:
+            **breaker_options: Passed to each CircuitBreaker (failure_threshold, cooldown, max_cooldown)
+        """
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(**self.breaker_options)
+            return self._breakers[host]
+
+
+# Shared by every scraper in the process, so per-thread scrapers pause together
+BREAKERS = HostBreakers()
+
+
+class ResilientFetcher:
+    """Sends GET requests through a session with retries, backoff and the host's circuit breaker"""
+
+    def __init__(self, policy: RetryPolicy = None, breakers: HostBreakers = None, metrics: Metrics = None,
+                 on_response: Callable[[requests.Response, float], None] = None):
+        """
+        Args:
+            policy: Retry and backoff settings (default: RetryPolicy())
+            breakers: Circuit breakers to share (default: the process-wide BREAKERS)
+            metrics: Registry for retry counters and wait times (default: the process-wide METRICS)
+            on_response: Called with every attempt's response and its duration in seconds
+        """
+        self.policy = policy or RetryPolicy()
+        self.breakers = breakers or BREAKERS
+        self.metrics = metrics or METRICS
+        self.on_response = on_response
+        # Hosts whose certificate failed to verify; later requests skip straight to verify=False
+        self.insecure_hosts: Set[str] = set()
+
+    def get(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        """
+        GET a URL, retrying connection errors and retryable statuses
+
+        Args:
+            session: requests or cloudscraper session to send through
+            url: The URL to fetch
+            **kwargs: Passed to session.get (headers, timeout, ...)
+
+        Returns:
+            The final response, which may still have an error status once the attempts run out
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt could not connect
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+
+        for retry in range(self.policy.attempts):
+            last_attempt = retry == self.policy.attempts - 1
+            waited = breaker.acquire()
+            if waited:
+                self.metrics.observe('breaker_wait', waited)
+            opened = breaker.opened
+
+            try:
+                response = self._send(session, url, host, kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                self._count_opened(breaker, opened)
+                if last_attempt:
+                    raise
+                print(f"{type(e).__name__} for {url}; retrying")
+                self._backoff(self.policy.backoff(retry))
+                continue
+            except Exception:
+                # Still report back, so a half-open breaker is not left waiting for this probe
+                breaker.record_failure()
+                raise
+
+            if response.status_code not in self.policy.statuses:
+                breaker.record_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None and retry_after > self.policy.max_retry_after:
+                print(f"{url} asked to retry after {retry_after:.0f}s; giving up on it")
+                breaker.record_failure(pause=retry_after)
+                return response
+
+            self.metrics.count('throttled' if response.status_code == 429 else 'server_errors')
+            if retry_after is None:
+                delay = self.policy.backoff(retry)
+            else:
+                delay = retry_after
+            if response.status_code == 429 or retry_after is not None:
+                # The host wants everyone to slow down: pause every worker, not just this one
+                breaker.record_failure(pause=delay)
+                delay = 0.0
+            else:
+                breaker.record_failure()
+            self._count_opened(breaker, opened)
+
+            if last_attempt:
+                return response
+            print(f"HTTP {response.status_code} for {url}; retrying")
+            self._backoff(delay)
+
+        return response
+
+    def _send(self, session: requests.Session, url: str, host: str, kwargs: dict) -> requests.Response:
+        verify = host not in self.insecure_hosts
+        started = time.perf_counter()
+        try:
+            response = session.get(url, verify=verify, **kwargs)
+        except requests.exceptions.SSLError:
+            if not verify:
+                raise
+            print(f"SSL verification failed for {host}; skipping verification for this host from now on")
+            self.insecure_hosts.add(host)
+            self.metrics.count('ssl_fallbacks')
+            started = time.perf_counter()
+            response = session.get(url, verify=False, **kwargs)
+        if self.on_response:
+            self.on_response(response, time.perf_counter() - started)
+        return response
+
+    def _backoff(self, delay: float):
+        self.metrics.count('retries')
+        if delay > 0:
+            self.metrics.observe('backoff', delay)
+            time.sleep(delay)
+
+    def _count_opened(self, breaker: CircuitBreaker, opened_before: int):
+        if breaker.opened > opened_before:
+            print(f"Circuit breaker opened: pausing requests to this host for {breaker.cooldown:.0f}s")
+            self.metrics.count('breaker_opened')
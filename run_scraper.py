@@ -29,8 +29,14 @@ def main():
     print("   ✗ Usually blocked by website bot detection")
     print("   ✗ Will likely fail to collect data")
     print()
+    print("3. Hybrid Scraper")
+    print("   ✓ Chrome only for the first page and verification")
+    print("   ✓ Remaining pages over fast HTTP with the verified session")
+    print("   ✓ Falls back to the browser if a page is blocked")
+    print("   ✗ Requires Chrome browser installed")
+    print()
 
-    choice = input("Enter your choice (1 or 2): ").strip()
+    choice = input("Enter your choice (1, 2 or 3): ").strip()
 
     if choice == "1":
         print("\nLaunching Selenium Scraper...")
@@ -70,8 +76,27 @@ def main():
             print(f"\nDetails: {e}")
             sys.exit(1)
 
+    elif choice == "3":
+        print("\nLaunching Hybrid Scraper...")
+        print("-" * 70)
+        print()
+        # Check if file exists
+        if not os.path.exists("hybrid_scraper.py"):
+            print("Error: hybrid_scraper.py not found!")
+            sys.exit(1)
+
+        # Import and run
+        try:
+            from hybrid_scraper import main as hybrid_main
+            hybrid_main()
+        except ImportError as e:
+            print(f"\nError: Missing dependencies!")
+            print(f"Please run: pip install -r requirements.txt")
+            print(f"\nDetails: {e}")
+            sys.exit(1)
+
     else:
-        print("\nInvalid choice. Please run again and enter 1 or 2.")
+        print("\nInvalid choice. Please run again and enter 1, 2 or 3.")
         sys.exit(1)
 
 
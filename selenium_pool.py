@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Browser pool for the Selenium scraper
+Several Chrome instances share the session from the one verified browser
+and load listing pages in parallel
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+from pagination import PagePlan
+from race_scraper import DEFAULT_DISTANCE
+from race_scraper_selenium import SeleniumRaceScraper, create_driver, wait_until_ready, DEFAULT_BASE_URL
+
+if TYPE_CHECKING:
+    from html_archive import HtmlArchive
+
+
+class BrowserPool:
+    """Pool of Chrome drivers that share one verified session and a page queue"""
+
+    def __init__(self, size: int = 3, headless: bool = False, manual_verification: bool = True,
+                 page_timeout: float = 20, min_interval: float = 2.0, base_url: str = DEFAULT_BASE_URL,
+                 archive: 'HtmlArchive' = None):
+        """
+        Initialize the pool
+
+        Only the first browser is started here, so the usual verification can be
+        completed in it; the others are started once its session exists.
+
+        Args:
+            size: Number of browsers loading pages at once (default: 3)
+            headless: Run the first browser headless - default False for manual verification.
+                Additional browsers always run headless.
+            manual_verification: Pause for manual human verification on the first page
+            page_timeout: Seconds to wait for the listing to render (default: 20)
+            min_interval: Minimum seconds between page loads on one host, shared by
+                every browser in the pool (default: 2.0)
+            base_url: Listing URL that page paths are appended to (default: the live site)
+            archive: Optional html_archive.HtmlArchive that keeps the HTML of every page any browser loads
+        """
+        self.size = max(1, size)
+        self.primary = SeleniumRaceScraper(headless=headless, manual_verification=manual_verification,
+                                           base_url=base_url, page_timeout=page_timeout,
+                                           min_interval=min_interval, archive=archive)
+        self.drivers = [self.primary.driver]
+
+    def _start_worker_driver(self):
+        """Start another browser and copy the primary browser's cookies into it"""
+        driver = create_driver(headless=True)
+        base = urlsplit(self.primary.base_url)
+
+        # Cookies can only be set for the domain the browser is currently on
+        driver.get(f"{base.scheme}://{base.netloc}/")
+        for cookie in self.primary.driver.get_cookies():
+            cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+            except WebDriverException as e:
+                print(f"Could not copy cookie {cookie.get('name')}: {e}")
+
+        self.drivers.append(driver)
+        return driver
+
+    def load_page(self, driver, url: str) -> List[Dict[str, str]]:
+        """
+        Load a page and parse it as soon as the listing has rendered
+
+        Args:
+            driver: The pool browser to use
+            url: The URL to load
+
+        Returns:
+            List of dictionaries containing race information (empty if the listing never appears)
+        """
+        races, _ = self.load_listing(driver, url)
+        return races
+
+    def load_listing(self, driver, url: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """Load a page like load_page, also returning its page source (None if the browser failed)"""
+        waited = self.primary.throttle.wait(url)
+        try:
+            started = time.monotonic()
+            driver.get(url)
+            loaded = time.monotonic()
+            outcome = wait_until_ready(driver, self.primary.page_timeout)
+            ready = time.monotonic()
+            page_source = driver.page_source
+        except WebDriverException as e:
+            # Includes a browser that crashed mid-run; the page is reported as failed
+            print(f"Error loading {url}: {e}")
+            return [], None
+
+        if self.primary.archive is not None:
+            with self.primary.metrics.timer('archive'):
+                self.primary.archive.append(url, page_source.encode('utf-8'))
+        with self.primary.metrics.timer('parse'):
+            races = self.primary.parse_races(page_source)
+        self.primary.record_timing(url, waited, loaded - started, ready - started, outcome, len(races))
+        return races, page_source
+
+    def scrape_date_range(self, start_date: str, end_date: str, max_pages: int = 20,
+                          distance: str = DEFAULT_DISTANCE, plan: PagePlan = None) -> List[Dict[str, str]]:
+        """
+        Scrape all races within a date range using every browser in the pool
+
+        Page 1 is loaded by the primary browser (including manual verification).
+        If it links to the listing's other pages, exactly those pages are handed
+        out to the pool's browsers; otherwise pages are handed out in order and
+        pagination stops at the first empty or short page, as in
+        SeleniumRaceScraper.scrape_date_range.
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            max_pages: Maximum number of pages to scrape
+            distance: Listing distance segment, e.g. '5k-to-10k' (default: '10k-to-100m')
+            plan: PagePlan to record the pages in (default: a new one), e.g. to check truncation
+
+        Returns:
+            List of all races found, in page order
+        """
+        print(f"Starting pooled scrape for dates: {start_date} to {end_date}")
+        print(f"Maximum pages: {max_pages}, browsers: {self.size}")
+        print("-" * 60)
+
+        plan = plan or PagePlan(max_pages)
+        first_page = self.primary.scrape_page(self.primary.build_url(start_date, end_date, 1, distance))
+        plan.observe(1, first_page, self.primary.driver.page_source)
+        print(f"Found {len(first_page)} races on page 1")
+        if plan.is_last(1):
+            if plan.truncated or plan.incomplete:
+                print(plan.summary())
+            if first_page:
+                self.primary.metrics.count('pages')
+                self.primary.metrics.count('races', len(first_page))
+            return first_page
+
+        while len(self.drivers) < min(self.size, plan.last_page - 1 if plan.known else self.size):
+            self._start_worker_driver()
+
+        results: Dict[int, List[Dict[str, str]]] = {1: first_page}
+        state = {'next_page': 2}
+        lock = threading.Lock()
+
+        def work(driver):
+            while True:
+                with lock:
+                    page = state['next_page']
+                    if page > plan.last_page:
+                        return
+                    state['next_page'] += 1
+
+                races, page_source = self.load_listing(driver, self.primary.build_url(start_date, end_date, page, distance))
+                print(f"Found {len(races)} races on page {page}")
+
+                with lock:
+                    results[page] = races
+                    plan.observe(page, races, page_source, failed=page_source is None)
+
+        threads = [threading.Thread(target=work, args=(driver,)) for driver in self.drivers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # A worker that died after taking a page leaves no result for it
+        for page in [page for page in range(2, state['next_page']) if page not in results]:
+            plan.observe(page, [], failed=True)
+
+        all_races = []
+        for page in range(1, plan.last_page + 1):
+            all_races.extend(results.get(page, []))
+            if results.get(page):
+                self.primary.metrics.count('pages')
+        self.primary.metrics.count('races', len(all_races))
+
+        if plan.truncated or plan.incomplete:
+            print(plan.summary())
+        print(f"Total races: {len(all_races)}")
+        print("-" * 60)
+        return all_races
+
+    def export_to_excel(self, races: List[Dict[str, str]], filename: str = None) -> str:
+        """Export races to an Excel file"""
+        return self.primary.export_to_excel(races, filename)
+
+    def close(self):
+        """Close every browser in the pool"""
+        for driver in self.drivers[1:]:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+        self.drivers = self.drivers[:1]
+        self.primary.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Date-range sharding for large scrapes
+Splits a long range into day, week or month shards and scrapes them in parallel
+"""
+
+import calendar
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Dict, Tuple, TYPE_CHECKING
+
+from dedup import Deduplicator
+from pagination import FULL_PAGE_SIZE, PagePlan
+
+if TYPE_CHECKING:
+    from race_scraper import RaceScraper
+
+DATE_FORMAT = "%m-%d-%Y"
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def parse_date(text: str) -> date:
+    """Parse an MM-DD-YYYY date"""
+    return datetime.strptime(text, DATE_FORMAT).date()
+
+
+def format_date(value: date) -> str:
+    """Format a date as MM-DD-YYYY, as used in listing URLs"""
+    return value.strftime(DATE_FORMAT)
+
+
+def shard_end(start: date, granularity: str) -> date:
+    """Last day of the shard of the given granularity that starts on start"""
+    if granularity == 'day':
+        return start
+    if granularity == 'week':
+        return start + timedelta(days=6)
+    if granularity == 'month':
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    raise ValueError(f"Unknown granularity '{granularity}'. Choose from: {', '.join(GRANULARITIES)}")
+
+
+def plan_shards(start_date: str, end_date: str, granularity: str = 'week') -> List[Tuple[str, str]]:
+    """
+    Split a date range into consecutive, non-overlapping shards
+
+    Weeks are 7-day blocks from start_date; months follow calendar months, so the
+    first and last month shards may be partial.
+
+    Args:
+        start_date: Start date in MM-DD-YYYY format
+        end_date: End date in MM-DD-YYYY format
+        granularity: 'day', 'week' or 'month' (default: 'week')
+
+    Returns:
+        List of (start_date, end_date) pairs in MM-DD-YYYY format
+    """
+    cursor, last = parse_date(start_date), parse_date(end_date)
+    shards = []
+    while cursor <= last:
+        end = min(shard_end(cursor, granularity), last)
+        shards.append((format_date(cursor), format_date(end)))
+        cursor = end + timedelta(days=1)
+    return shards
+
+
+class ShardedScraper:
+    """Scrapes a large date range as many small shards across a worker pool"""
+
+    def __init__(self, scraper_factory: Callable[[], 'RaceScraper'] = None, workers: int = 4,
+                 max_pages: int = 50, target_pages: int = None, delay: bool = True):
+        """
+        Initialize the sharded scraper
+
+        Args:
+            scraper_factory: Creates the RaceScraper each worker thread uses (default: RaceScraper)
+            workers: Number of shards scraped at once (default: 4)
+            max_pages: Pagination ceiling for a single shard (default: 50)
+            target_pages: Pages an adaptively sized shard aims for (default: half of max_pages)
+            delay: Keep the random human-like delay before each request (default: True)
+        """
+        if scraper_factory is None:
+            from race_scraper import RaceScraper
+            scraper_factory = RaceScraper
+        self.scraper_factory = scraper_factory
+        self.workers = workers
+        self.max_pages = max_pages
+        self.target_pages = target_pages or max(1, max_pages // 2)
+        self.delay = delay
+        self.truncated_shards: List[Tuple[str, str]] = []
+        self.incomplete_shards: List[Tuple[str, str]] = []
+        self.stats = {'shards': 0, 'splits': 0, 'duplicates': 0}
+        self._local = threading.local()
+        self._observed_days = 0
+        self._observed_races = 0
+
+    def _scraper(self) -> 'RaceScraper':
+        """The calling worker thread's own scraper"""
+        if not hasattr(self._local, 'scraper'):
+            self._local.scraper = self.scraper_factory()
+        return self._local.scraper
+
+    def _scrape_shard(self, start: date, end: date) -> Tuple[List[Dict[str, str]], PagePlan]:
+        plan = PagePlan(self.max_pages)
+        races, _ = self._scraper().paginate(format_date(start), format_date(end), self.max_pages, self.delay,
+                                            plan=plan)
+        return races, plan
+
+    def _next_end(self, cursor: date, last: date, granularity: str, adaptive: bool) -> date:
+        """Pick where the next shard ends, using the race density seen so far"""
+        end = shard_end(cursor, granularity)
+        if adaptive and self._observed_days and self._observed_races:
+            races_per_day = self._observed_races / self._observed_days
+            days = max(1, int(self.target_pages * FULL_PAGE_SIZE / races_per_day))
+            end = cursor + timedelta(days=days - 1)
+        return min(end, last)
+
+    def scrape(self, start_date: str, end_date: str, granularity: str = 'week',
+               adaptive: bool = True) -> List[Dict[str, str]]:
+        """
+        Scrape a date range as parallel shards and merge the results
+
+        Shards that reach max_pages are split in half and scraped again, so no
+        shard is silently truncated; only a single-day shard that still reaches
+        the ceiling is kept as is and recorded in truncated_shards. Shards with a
+        page that failed to load are kept and recorded in incomplete_shards.
+
+        Args:
+            start_date: Start date in MM-DD-YYYY format
+            end_date: End date in MM-DD-YYYY format
+            granularity: Initial shard size: 'day', 'week' or 'month' (default: 'week')
+            adaptive: Resize later shards from the races per day seen so far (default: True)
+
+        Returns:
+            De-duplicated list of races in date-range order
+        """
+        shard_end(parse_date(start_date), granularity)  # validate granularity up front
+        cursor, last = parse_date(start_date), parse_date(end_date)
+        retry: deque = deque()
+        results: Dict[date, List[Dict[str, str]]] = {}
+        pending = {}
+
+        def next_shard():
+            nonlocal cursor
+            if retry:
+                return retry.popleft()
+            if cursor > last:
+                return None
+            shard = (cursor, self._next_end(cursor, last, granularity, adaptive))
+            cursor = shard[1] + timedelta(days=1)
+            return shard
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                while len(pending) < self.workers:
+                    shard = next_shard()
+                    if shard is None:
+                        break
+                    pending[pool.submit(self._scrape_shard, *shard)] = shard
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end = pending.pop(future)
+                    races, plan = future.result()
+                    truncated = plan.truncated
+
+                    if truncated and end > start:
+                        middle = start + (end - start) // 2
+                        print(f"Shard {format_date(start)} to {format_date(end)} hit {self.max_pages} pages; splitting")
+                        self.stats['splits'] += 1
+                        retry.append((start, middle))
+                        retry.append((middle + timedelta(days=1), end))
+                        continue
+
+                    if truncated:
+                        print(f"Warning: shard {format_date(start)} still hit {self.max_pages} pages; results truncated")
+                        self.truncated_shards.append((format_date(start), format_date(end)))
+
+                    if plan.incomplete:
+                        print(f"Warning: shard {format_date(start)} to {format_date(end)} is missing "
+                              f"page {plan.lost_pages[0]}; results incomplete")
+                        self.incomplete_shards.append((format_date(start), format_date(end)))
+
+                    self.stats['shards'] += 1
+                    self._observed_days += (end - start).days + 1
+                    self._observed_races += len(races)
+                    results[start] = races
+
+        return self._merge(results)
+
+    def _merge(self, results: Dict[date, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Concatenate shard results in date order, keeping the first copy of each race"""
+        # Shards overlap only where pagination shifted, so exact matches are enough here
+        deduplicator = Deduplicator(fuzzy=False)
+        for start in sorted(results):
+            deduplicator.extend(results[start])
+        merged = deduplicator.races
+        self.stats['duplicates'] += deduplicator.report.merged
+
+        print(f"Merged {len(merged)} races from {self.stats['shards']} shards "
+              f"({self.stats['splits']} splits, {self.stats['duplicates']} duplicates dropped)")
+        return merged
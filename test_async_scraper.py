@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Tests for the concurrent page fetcher, run against a local fake site"""
+
+import asyncio
+import time
+
+from async_scraper import AsyncRaceScraper, TokenBucket
+from fake_site import FakeRaceSite, make_races
+
+
+def test_returns_races_in_page_order():
+    races = make_races(25)
+    with FakeRaceSite(races, page_size=10, latency=0.05) as site:
+        with AsyncRaceScraper(use_cloudscraper=False, base_url=site.base_url,
+                              requests_per_second=100, max_concurrency=3) as scraper:
+            result = scraper.scrape_date_range("01-01-2026", "12-31-2026", max_pages=20)
+
+    assert result == races
+
+
+def test_stops_at_first_empty_page():
+    races = make_races(30)
+    with FakeRaceSite(races, page_size=10) as site:
+        with AsyncRaceScraper(use_cloudscraper=False, base_url=site.base_url,
+                              requests_per_second=100, max_concurrency=2) as scraper:
+            result = scraper.scrape_date_range("01-01-2026", "12-31-2026", max_pages=20)
+
+    assert result == races
+
+
+def test_respects_max_pages_and_concurrency():
+    races = make_races(100)
+    with FakeRaceSite(races, page_size=10, latency=0.1) as site:
+        with AsyncRaceScraper(use_cloudscraper=False, base_url=site.base_url,
+                              requests_per_second=100, max_concurrency=3) as scraper:
+            result = scraper.scrape_date_range("01-01-2026", "12-31-2026", max_pages=6)
+
+        assert result == races[:60]
+        assert 1 < site.max_in_flight <= 3
+
+
+def test_token_bucket_limits_rate():
+    async def take(bucket, count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=20, burst=1)
+    started = time.monotonic()
+    asyncio.run(take(bucket, 6))
+
+    # The first token is available immediately, the other five take 1/20 s each
+    assert time.monotonic() - started >= 5 / 20 * 0.9
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Tests for the fake site's fault injection and the benchmark harness"""
+
+import glob
+import json
+import os
+import urllib.error
+import urllib.request
+
+import bench_scraper
+from fake_site import FakeRaceSite, make_races
+
+
+def test_fake_site_injects_throttling_and_errors():
+    statuses = []
+    with FakeRaceSite(make_races(5), throttle_rate=0.5, error_rate=0.5, retry_after=2) as site:
+        for _ in range(20):
+            try:
+                urllib.request.urlopen(site.base_url + '/all/10k-to-100m/page-1')
+            except urllib.error.HTTPError as e:
+                statuses.append(e.code)
+                assert e.headers['Retry-After'] == '2'
+
+    assert len(statuses) == 20
+    assert set(statuses) == {429, 503}
+    assert site.status_counts == {429: statuses.count(429), 503: statuses.count(503)}
+
+
+def test_engine_case_recovers_from_injected_faults():
+    row = bench_scraper.run_engine_case('requests', 'lxml', size=10, pages=10,
+                                        throttle_rate=0.2, error_rate=0.2)
+
+    assert row['complete'] and row['races'] == 100
+    faults = sum(count for status, count in row['status_counts'].items() if status != '200')
+    assert faults > 0
+    assert row['retries'] == faults
+    assert row['pages_per_sec'] > 0 and row['export_seconds'] >= 0
+
+
+def test_runs_are_saved_per_commit_and_compared(tmp_path):
+    results = str(tmp_path)
+    bench_scraper.main(['--sizes', '10', '--pages', '2', '--engines', 'requests', '--parsers', 'lxml',
+                        '--latency', '0', '--results', results])
+    path, = glob.glob(os.path.join(results, '*.json'))
+    with open(path) as f:
+        run = json.load(f)
+
+    assert run['commit'] in os.path.basename(path)
+    assert [row['size'] for row in run['engines']] == [10]
+    assert {row['page'] for row in run['parsers']} >= {'synthetic-10', 'fixture-listing_edge_cases'}
+
+    slower = json.loads(json.dumps(run))
+    slower['engines'][0]['pages_per_sec'] /= 2
+    changes = bench_scraper.compare(slower, run)
+    regressions = [change for change in changes if change['regression']]
+    assert [(change['case'], change['metric']) for change in regressions] == [('requests lxml 10', 'pages_per_sec')]
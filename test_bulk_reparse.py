@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Tests for re-parsing an archive on a process pool"""
+
+import csv
+
+import pytest
+
+import bulk_reparse
+from fake_site import make_races, race_slug, render_detail_page, render_listing_page
+from html_archive import HtmlArchive
+from parsers import get_parser
+
+RACES = make_races(120)
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    """12 pages of 10 races, with an older copy of page 1 that has a single race"""
+    path = str(tmp_path / 'archive')
+    with HtmlArchive(path, codec='zlib') as archive:
+        archive.append('page-1', render_listing_page(RACES[:1]).encode('utf-8'), fetched_at=1)
+        for number in range(12):
+            archive.append(f'page-{number + 1}', render_listing_page(RACES[number * 10:number * 10 + 10]).encode(),
+                           fetched_at=10 + number)
+    return path
+
+
+def test_results_match_a_serial_parse_in_archive_order(archive_path):
+    reparser = bulk_reparse.BulkReparser(archive_path, parser='bs4', workers=2, chunk_size=5)
+    pages = list(reparser.run())
+
+    assert [location.url for location, _ in pages] == [f'page-{number}' for number in range(1, 13)]
+    assert [race for _, races in pages for race in races] == RACES
+    assert reparser.stats['chunks'] == 3
+    assert sum(worker['pages'] for worker in reparser.worker_stats.values()) == 12
+    assert 'pages/s' in reparser.report()
+
+
+def test_every_version_can_be_reparsed(archive_path):
+    reparser = bulk_reparse.BulkReparser(archive_path, workers=2, chunk_size=4, latest=False)
+    races = list(reparser.races())
+
+    assert len(races) == 121 and races[0] == races[1] == RACES[0]
+
+
+def test_chunks_come_back_as_compact_payloads(archive_path):
+    with HtmlArchive(archive_path) as archive:
+        locations = archive.locations(latest=True)[:2]
+    bulk_reparse._init_worker('lxml')
+    result = bulk_reparse.parse_chunk(7, locations)
+
+    assert result.index == 7 and result.pages == 2 and isinstance(result.payload, bytes)
+    # Field names appear once, not once per race
+    assert result.payload.count(b'Race Name') == 1
+    parser = get_parser('lxml')
+    with HtmlArchive(archive_path) as archive:
+        expected = [parser.parse(archive.lookup(location.url).body) for location in locations]
+    assert bulk_reparse.decode_chunk(result) == expected
+
+
+def test_command_exports_races(archive_path, tmp_path, capsys):
+    output = str(tmp_path / 'races.csv')
+    assert bulk_reparse.main([archive_path, '--output', output, '--workers', '2', '--chunk-size', '3']) == 0
+    with open(output, newline='', encoding='utf-8') as f:
+        assert list(csv.DictReader(f)) == RACES
+    assert 'worker' in capsys.readouterr().out
+
+    assert bulk_reparse.main([str(tmp_path / 'missing')]) == 2
+
+
+def test_detail_pages_are_skipped(archive_path):
+    with HtmlArchive(archive_path) as archive:
+        archive.append(f'https://example.com/race/{race_slug(RACES[0])}', render_detail_page(RACES[0]).encode())
+        archive.append('https://example.com/classic/list/map/01-01-2026_to_12-31-2026/10k-to-100m/page-13',
+                       render_listing_page([]).encode())
+    reparser = bulk_reparse.BulkReparser(archive_path, workers=1, chunk_size=5)
+    pages = list(reparser.run())
+
+    assert len(pages) == 13 and reparser.stats['skipped'] == 1
+    assert [race for _, races in pages for race in races] == RACES
+
+
+def test_error_pages_and_corrupt_records_do_not_stop_the_run(archive_path):
+    with HtmlArchive(archive_path) as archive:
+        archive.append('page-13', b'<html>Too Many Requests</html>', status=429)
+        locations = archive.locations(latest=True)
+    reparser = bulk_reparse.BulkReparser(archive_path, workers=1, chunk_size=5)
+    assert list(reparser.races()) == RACES
+    assert reparser.stats['error_pages'] == 1 and reparser.stats['errors'] == 0
+
+    # A record whose bytes no longer decompress counts as one error
+    broken = locations[0]._replace(size=locations[0].size - 4)
+    bulk_reparse._init_worker('lxml')
+    result = bulk_reparse.parse_chunk(0, [broken] + locations[1:3])
+    assert result.errors == 1
+    assert bulk_reparse.decode_chunk(result)[1:] == [RACES[10:20], RACES[20:30]]
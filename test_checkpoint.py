@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for the checkpoint journal, run against a local fake site"""
+
+import os
+
+import pytest
+
+from checkpoint import Checkpoint, checkpoint_options
+from fake_site import FakeRaceSite, make_races
+from race_scraper import RaceScraper
+
+RANGE = ("01-01-2026", "12-31-2026")
+
+
+def page_numbers(site):
+    return [int(path.rstrip('/').rsplit('page-', 1)[1]) for path in site.requested_paths]
+
+
+def test_resume_skips_completed_pages(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    races = make_races(45)
+
+    with FakeRaceSite(races, pagination=True) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+
+        # The first run dies after page 3
+        with Checkpoint(path) as checkpoint:
+            with pytest.raises(KeyboardInterrupt):
+                for page, _, _ in scraper.iter_pages(*RANGE, delay=False, checkpoint=checkpoint):
+                    if page == 3:
+                        raise KeyboardInterrupt
+        assert page_numbers(site) == [1, 2, 3]
+
+        with Checkpoint(path, resume=True) as checkpoint:
+            result, truncated = scraper.paginate(*RANGE, delay=False, checkpoint=checkpoint)
+
+    assert result == races
+    assert not truncated
+    assert page_numbers(site) == [1, 2, 3, 4, 5]
+
+
+def test_partial_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record('http://example/page-1', 1, make_races(2))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"url": "http://example/page-2", "page": 2, "rac')
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.lookup('http://example/page-1').races == make_races(2)
+        assert checkpoint.lookup('http://example/page-2') is None
+        checkpoint.record('http://example/page-2', 2, make_races(3))
+
+    # The page recorded after the partial line survives the next resume
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.lookup('http://example/page-2').races == make_races(3)
+
+
+def test_fresh_journal_and_cleanup(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record('http://example/page-1', 1, make_races(2))
+
+    with Checkpoint(path, resume=False) as checkpoint:
+        assert checkpoint.lookup('http://example/page-1') is None
+    # Nothing was recorded, so no journal is left behind
+    assert not os.path.exists(path)
+
+
+def test_checkpoint_options_ignore_other_arguments():
+    options = checkpoint_options(['--resume', '--verbose', '--checkpoint', 'run.jsonl'])
+    assert options.resume
+    assert options.checkpoint == 'run.jsonl'
+    assert not checkpoint_options([]).resume
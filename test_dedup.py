@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for exact and fuzzy race de-duplication"""
+
+from dedup import Deduplicator, deduplicate, normalize_name
+from fake_site import make_races
+
+
+def race(name, location='Park City, UT', day='Jan 31, 2026'):
+    return {'Date': day, 'Race Name': name, 'Location': location}
+
+
+def test_normalize_name_ignores_case_punctuation_and_filler():
+    assert normalize_name('5K & 10K Run') == normalize_name('5k/10k run') == '5k 10k run'
+    assert normalize_name('  The Café Half-Marathon ') == 'cafe half marathon'
+
+
+def test_overlapping_ranges_keep_first_copy_in_order():
+    races = make_races(50)
+
+    unique, report = deduplicate(races[:30] + races[20:])
+
+    assert unique == races
+    assert report.total == 60
+    assert len(report.exact) == 10
+    assert report.fuzzy == []
+
+
+def test_spelling_variants_are_merged_and_reported():
+    first = race('Frostbite 5K & 10K Run')
+    variants = [
+        race('frostbite 5k/10k run'),
+        race('Frostbite  5K and 10K Run', location='Park City,UT'),
+        race('Frostbite 5K & 10K Runn'),
+    ]
+
+    unique, report = deduplicate([first] + variants)
+
+    assert unique == [first]
+    assert [dropped for _, dropped in report.exact] == variants[:2]
+    (kept, dropped, score), = report.fuzzy
+    assert kept is first and dropped is variants[2]
+    assert 0.8 <= score < 1
+
+
+def test_different_races_are_kept_apart():
+    races = [
+        race('Turkey Trot 5K'),
+        race('Turkey Trot 10K'),                                 # different distance
+        race('Turkey Trot 5K', location='Moab, UT'),             # different city
+        race('Turkey Trot 5K', location='Park City, KS'),        # different state
+        race('Turkey Trot 5K', day='Feb 1, 2026'),               # different day
+        race('Race Number 1 Trail Run'),
+        race('Race Number 11 Trail Run'),
+    ]
+
+    unique, report = deduplicate(races)
+
+    assert unique == races
+    assert report.merged == 0
+
+
+def test_exact_only_mode_and_incremental_use():
+    deduplicator = Deduplicator(fuzzy=False)
+
+    assert deduplicator.add(race('Frostbite 5K & 10K Run'))
+    assert not deduplicator.add(race('frostbite 5k/10k run'))
+    assert deduplicator.add(race('Frostbite 5K & 10K Runn'))
+    assert deduplicator.report.summary() == "2 unique of 3 races (1 exact and 0 fuzzy duplicates merged)"
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Tests for race detail enrichment"""
+
+import csv
+
+import pytest
+
+import race_cli
+from enrichment import DETAIL_FIELDS, DetailCache, DetailParser, RaceEnricher
+from fake_site import FakeRaceSite, make_races, race_details, race_slug, render_detail_page, render_listing_page
+from parsers import get_parser
+from race_scraper import RaceScraper
+
+RACES = make_races(40)
+
+
+def details_of(race):
+    return {field: race[field] for field in DETAIL_FIELDS if field in race}
+
+
+@pytest.mark.parametrize('backend', ['bs4', 'lxml'])
+def test_parsers_keep_race_links_only_when_asked(backend):
+    html = render_listing_page(RACES[:3]).encode('utf-8')
+
+    assert get_parser(backend).parse(html) == RACES[:3]
+    linked = get_parser(backend, links=True).parse(html)
+    assert [race['URL'] for race in linked] == [f"/race/{race_slug(race)}" for race in RACES[:3]]
+
+
+def test_detail_pages_are_parsed():
+    parser = DetailParser()
+    assert parser.parse(render_detail_page(RACES[0]).encode('utf-8')) == race_details(RACES[0])
+
+    # Definition lists and a register button outside the list work too
+    page = (b'<html><body><dl><dt>Distance</dt><dd> 5K,\n 10K </dd><dt>Start time:</dt><dd>7:00 AM</dd></dl>'
+            b'<a href="https://signup.example/1">Register now</a></body></html>')
+    assert parser.parse(page) == {'Distances': '5K, 10K', 'Start Time': '7:00 AM',
+                                  'Registration URL': 'https://signup.example/1'}
+    assert parser.parse(b'') == {}
+
+
+def test_races_are_enriched_through_a_bounded_queue(tmp_path):
+    cache = DetailCache(str(tmp_path / 'details.sqlite'))
+    with FakeRaceSite(RACES, page_size=10, latency=0.02) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, links=True)
+        races, _ = scraper.paginate('01-01-2026', '02-28-2026', 10, delay=False)
+        enricher = RaceEnricher(scraper, cache, max_concurrency=6, requests_per_second=200, per_host=3, burst=3)
+        # The second copy of a race shares its detail page request
+        enriched = enricher.enrich(races + races[:1])
+
+        assert enriched[-1] == enriched[0]
+        assert [details_of(race) for race in enriched[:-1]] == [race_details(race) for race in RACES]
+        assert enriched[0]['URL'] == site.base_url.split('/classic')[0] + f"/race/{race_slug(RACES[0])}"
+        assert enricher.stats['fetched'] == 40 and len(cache) == 40
+        assert 1 < site.max_in_flight <= 3
+
+        # Cached and already enriched races cost no requests
+        requests_before = len(site.requested_paths)
+        again = RaceEnricher(scraper, cache).enrich(races[:5] + enriched[5:10] + [{'Race Name': 'Unlinked'}])
+        assert len(site.requested_paths) == requests_before
+        assert [details_of(race) for race in again[:10]] == [race_details(race) for race in RACES[:10]]
+    assert 'without a link' in enricher.summary()
+
+
+def test_failed_detail_pages_leave_races_unchanged():
+    with FakeRaceSite(RACES, page_size=10) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, links=True)
+        missing = {**RACES[0], 'URL': site.base_url.split('/classic')[0] + '/race/no-such-race'}
+        enricher = RaceEnricher(scraper, requests_per_second=100)
+        assert enricher.enrich([missing]) == [missing]
+        assert enricher.stats['failed'] == 1
+
+
+def test_detail_cache_expires(tmp_path):
+    cache = DetailCache(str(tmp_path / 'details.sqlite'), ttl=0)
+    cache.store('https://example.com/race/1', {'Start Time': '7:00 AM'})
+    assert cache.lookup('https://example.com/race/1') is None
+
+    cache.ttl = 60
+    assert cache.lookup('https://example.com/race/1') == {'Start Time': '7:00 AM'}
+    cache.close()
+
+
+def test_cli_exports_enriched_races(tmp_path):
+    output = str(tmp_path / 'races.csv')
+    with FakeRaceSite(RACES[:28], page_size=10) as site:
+        status = race_cli.main(['--start', '01-01-2026', '--end', '01-31-2026', '--no-cloudscraper', '--no-delay',
+                                '--base-url', site.base_url, '--output', output, '--enrich',
+                                '--details-cache', str(tmp_path / 'details.sqlite'), '--detail-rate', '100'])
+    assert status == race_cli.EXIT_OK
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [details_of(row) for row in rows] == [race_details(race) for race in RACES[:28]]
+
+    assert race_cli.main(['--start', '01-01-2026', '--engine', 'selenium', '--enrich']) == race_cli.EXIT_USAGE
+
+
+def test_enricher_can_run_again_and_survives_parser_errors(monkeypatch):
+    with FakeRaceSite(RACES, page_size=10) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, links=True)
+        races, _ = scraper.paginate('01-01-2026', '01-31-2026', 10, delay=False)
+        enricher = RaceEnricher(scraper, requests_per_second=200, max_concurrency=8, per_host=2)
+        # Each call runs its own event loop; the per-host limits must not carry over
+        assert len(enricher.enrich(races[:10])) == len(enricher.enrich(races[10:20])) == 10
+
+        def broken(content):
+            raise ValueError('unexpected markup')
+
+        failing = RaceEnricher(scraper, requests_per_second=200, max_concurrency=2, queue_size=1)
+        monkeypatch.setattr(failing.parser, 'parse', broken)
+        assert failing.enrich(races) == races
+        assert failing.stats['failed'] == len(races)
+
+
+def test_pages_without_details_are_not_cached(tmp_path, monkeypatch):
+    cache = DetailCache(str(tmp_path / 'details.sqlite'))
+    with FakeRaceSite(RACES, page_size=10) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, links=True)
+        races, _ = scraper.paginate('01-01-2026', '01-31-2026', 10, delay=False)
+        challenged = RaceEnricher(scraper, cache, requests_per_second=200)
+        # e.g. a challenge page served with status 200
+        monkeypatch.setattr(challenged.parser, 'parse', lambda content: {})
+        assert challenged.enrich(races[:3]) == races[:3]
+        assert challenged.stats['failed'] == 3 and len(cache) == 0
+
+        enricher = RaceEnricher(scraper, cache, requests_per_second=200)
+        assert [details_of(race) for race in enricher.enrich(races[:3])] == [race_details(r) for r in RACES[:3]]
+        assert enricher.stats['fetched'] == 3
+    cache.close()
+
+
+def test_cached_and_checkpointed_pages_keep_links(tmp_path):
+    from checkpoint import Checkpoint
+    from http_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    with FakeRaceSite(RACES[:28], page_size=10) as site:
+        plain = RaceScraper(use_cloudscraper=False, base_url=site.base_url, cache=cache)
+        with Checkpoint(str(tmp_path / 'journal.jsonl')) as checkpoint:
+            plain.paginate('01-01-2026', '01-31-2026', 5, delay=False, checkpoint=checkpoint)
+
+        linked = RaceScraper(use_cloudscraper=False, base_url=site.base_url, cache=cache, links=True)
+        requests_before = len(site.requested_paths)
+        races, _ = linked.paginate('01-01-2026', '01-31-2026', 5, delay=False)
+        # Served from the cache, parsed again from the stored HTML
+        assert len(site.requested_paths) == requests_before
+        assert len(races) == 28 and all('URL' in race for race in races)
+        assert cache.lookup(linked.build_url('01-01-2026', '01-31-2026', 1)).parsed_with == 'links'
+
+        uncached = RaceScraper(use_cloudscraper=False, base_url=site.base_url, links=True)
+        with Checkpoint(str(tmp_path / 'journal.jsonl')) as checkpoint:
+            races, _ = uncached.paginate('01-01-2026', '01-31-2026', 5, delay=False, checkpoint=checkpoint)
+        # Journal pages without links are fetched again
+        assert len(site.requested_paths) == requests_before + 3
+        assert all('URL' in race for race in races)
+    cache.close()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Round-trip tests for the streaming exporters"""
+
+import csv
+import json
+from datetime import date
+
+import pytest
+
+from exporters import PYARROW_AVAILABLE, export_races
+from fake_site import generate_races, make_races
+
+
+def test_csv_and_jsonl_round_trip(tmp_path):
+    races = make_races(25)
+
+    filename = export_races(generate_races(25), str(tmp_path / 'races'), 'csv')
+    with open(filename, newline='', encoding='utf-8') as f:
+        assert list(csv.DictReader(f)) == races
+
+    filename = export_races(iter(races), str(tmp_path / 'races.jsonl'))
+    with open(filename, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == races
+
+
+def test_xlsx_round_trip(tmp_path):
+    from openpyxl import load_workbook
+
+    races = make_races(25)
+    filename = export_races(iter(races), str(tmp_path / 'races.xlsx'))
+    rows = list(load_workbook(filename).active.iter_rows(values_only=True))
+
+    assert rows[0] == ('Date', 'Race Name', 'Location')
+    assert [dict(zip(rows[0], row)) for row in rows[1:]] == races
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx', 'parquet'])
+def test_fields_of_later_batches_are_kept_or_rejected(tmp_path, fmt):
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        pytest.skip("pyarrow not installed")
+    from exporters import EXPORTERS
+
+    # Only races after the first batch were enriched
+    races = make_races(4)
+    races[3] = {**races[3], 'URL': 'https://example.com/race/4', 'Start Time': '7:00 AM'}
+    exporter = EXPORTERS[fmt](batch_size=2)
+    filename = str(tmp_path / f'races.{fmt}')
+
+    assert exporter.write(iter(races), filename, fields=['URL', 'Start Time']) == 4
+    if fmt == 'csv':
+        with open(filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert rows[3]['Start Time'] == '7:00 AM' and rows[0]['URL'] == ''
+
+    with pytest.raises(ValueError, match='Start Time'):
+        exporter.write(iter(races), filename, fields=['URL'])
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+def test_parquet_has_typed_dates(tmp_path):
+    import pyarrow.parquet as pq
+
+    races = make_races(3) + [{'Date': 'TBD', 'Race Name': 'Unscheduled', 'Location': 'Moab, UT'}]
+    filename = export_races(iter(races), str(tmp_path / 'races.parquet'))
+    table = pq.read_table(filename)
+
+    assert str(table.schema.field('Date').type) == 'date32[day]'
+    assert table.column('Date').to_pylist() == [date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 3), None]
+    assert table.column('Date Text').to_pylist() == [race['Date'] for race in races]
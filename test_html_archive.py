@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Tests for the compressed page archive and replaying scrapes from it"""
+
+import csv
+import os
+
+import pytest
+import requests
+
+import race_cli
+from fake_site import FakeRaceSite, make_races
+from html_archive import HtmlArchive, ReplayScraper
+from race_scraper import RaceScraper
+
+
+def page(number: int) -> bytes:
+    return (f'<html><body>page {number}</body></html>\n' * 40).encode('utf-8')
+
+
+def test_pages_are_found_by_url_and_fetch_time(tmp_path):
+    with HtmlArchive(str(tmp_path), codec='zlib') as archive:
+        archive.append('https://example.com/a', page(1), fetched_at=100)
+        archive.append('https://example.com/b', page(2), fetched_at=150)
+        archive.append('https://example.com/a', page(3), fetched_at=200)
+
+        assert archive.lookup('https://example.com/a').body == page(3)
+        assert archive.lookup('https://example.com/a', at=199).body == page(1)
+        assert archive.lookup('https://example.com/a', at=50) is None
+        assert archive.lookup('https://example.com/c') is None
+        assert archive.versions('https://example.com/a') == [100, 200]
+        assert [p.fetched_at for p in archive.pages(latest=True)] == [150, 200]
+        assert archive.stats['stored_bytes'] * 5 < archive.stats['raw_bytes']
+
+
+def test_segments_roll_over_and_reopen(tmp_path):
+    with HtmlArchive(str(tmp_path), codec='zlib', max_segment_bytes=200) as archive:
+        for number in range(10):
+            archive.append(f'u{number}', page(number))
+            # A segment mapped for reading keeps growing until it rolls over
+            assert archive.lookup(f'u{number}').body == page(number)
+    segments = [name for name in os.listdir(tmp_path) if name.endswith('.zz')]
+    assert len(segments) > 1
+
+    with HtmlArchive(str(tmp_path), codec='zlib', max_segment_bytes=200) as archive:
+        archive.append('u10', page(10))
+        assert [p.body for p in archive.pages()] == [page(number) for number in range(11)]
+
+
+def test_zstd_and_zlib_segments_mix(tmp_path):
+    pytest.importorskip('zstandard')
+    with HtmlArchive(str(tmp_path), codec='zlib') as archive:
+        archive.append('old', page(1))
+    with HtmlArchive(str(tmp_path), codec='zstd') as archive:
+        archive.append('new', page(2))
+        assert archive.lookup('old').body == page(1)
+        assert archive.lookup('new').body == page(2)
+
+
+def test_index_is_rebuilt_from_segments(tmp_path):
+    with HtmlArchive(str(tmp_path), codec='zlib') as archive:
+        for number in range(5):
+            archive.append(f'u{number}', page(number), fetched_at=number)
+    segment, = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path) if name.endswith('.zz')]
+    # A crash mid-append leaves a partial record at the end of the segment
+    with open(segment, 'r+b') as f:
+        f.truncate(os.path.getsize(segment) - 10)
+
+    with HtmlArchive(str(tmp_path), codec='zlib') as archive:
+        assert archive.rebuild_index() == 4
+        assert [p.url for p in archive.pages()] == ['u0', 'u1', 'u2', 'u3']
+        assert archive.lookup('u3').body == page(3)
+
+
+def test_replay_reparses_without_the_network(tmp_path):
+    races = make_races(45)
+    with FakeRaceSite(races, pagination=True) as site:
+        base_url = site.base_url
+        with HtmlArchive(str(tmp_path)) as archive:
+            scraper = RaceScraper(use_cloudscraper=False, base_url=base_url, archive=archive)
+            scraped, _ = scraper.paginate("01-01-2026", "12-31-2026", delay=False)
+            assert len(archive) == len(site.requested_paths) == 5
+
+    # The site is gone; a different parser reads the same HTML
+    with HtmlArchive(str(tmp_path)) as archive:
+        replay = ReplayScraper(archive, base_url=base_url, parser='lxml')
+        assert replay.scrape_date_range("01-01-2026", "12-31-2026") == scraped == races
+        assert replay.scrape_date_range("01-01-2027", "12-31-2027") == []
+        assert replay.metrics.counters['request_errors'] >= 1
+
+
+def test_cli_archives_then_replays(tmp_path):
+    archive = str(tmp_path / 'archive')
+    scraped, replayed = str(tmp_path / 'scraped.csv'), str(tmp_path / 'replayed.csv')
+    with FakeRaceSite(make_races(30), pagination=True) as site:
+        base = ['--base-url', site.base_url, '--no-cloudscraper', '--no-delay', '--start', '01-01-2026',
+                '--end', '02-28-2026', '--archive', archive]
+        assert race_cli.main(base + ['--output', scraped]) == race_cli.EXIT_OK
+    assert race_cli.main(base + ['--engine', 'replay', '--output', replayed]) == race_cli.EXIT_OK
+    assert race_cli.main(['--engine', 'replay', '--start', '01-01-2026']) == race_cli.EXIT_USAGE
+
+    with open(scraped, newline='') as a, open(replayed, newline='') as b:
+        assert list(csv.DictReader(a)) == list(csv.DictReader(b))
+
+
+def test_error_pages_are_archived_with_their_status(tmp_path):
+    races = make_races(25)
+    with FakeRaceSite(races, required_cookie='cf_clearance=verified') as site:
+        with HtmlArchive(str(tmp_path)) as archive:
+            scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, archive=archive)
+            url = scraper.build_url("01-01-2026", "12-31-2026", 1)
+            assert scraper.scrape_page(url, delay=False) == []
+            assert archive.lookup(url).status == 403
+
+            # Replaying the challenge page fails the same way the fetch did
+            replay = ReplayScraper(archive, base_url=site.base_url)
+            with pytest.raises(requests.exceptions.HTTPError, match='403'):
+                replay.fetch_page(url)
+
+
+def test_a_later_error_page_does_not_hide_a_good_copy(tmp_path):
+    import bulk_reparse
+    from fake_site import render_listing_page
+
+    races = make_races(5)
+    url = 'https://example.com/classic/list/map/01-01-2026-to-01-31-2026/10k-to-100m/page-1'
+    with HtmlArchive(str(tmp_path), codec='zlib') as archive:
+        archive.append(url, render_listing_page(races).encode('utf-8'), fetched_at=100, status=200)
+        archive.append(url, b'<html>Service Unavailable</html>', fetched_at=200, status=503)
+
+        assert archive.lookup(url).status == 200
+        assert archive.lookup(url, at=99) is None
+        assert [location.fetched_at for location in archive.locations(latest=True)] == [100]
+        replay = ReplayScraper(archive, base_url='https://example.com/classic/list/map')
+        assert replay.fetch_listing(url)[0] == races
+
+    assert list(bulk_reparse.BulkReparser(str(tmp_path), workers=1).races()) == races
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Tests for the on-disk response cache, run against a local fake site"""
+
+from unittest import mock
+
+from fake_site import FakeRaceSite, make_races
+from http_cache import ResponseCache
+from race_scraper import RaceScraper
+
+
+def make_scraper(site, cache):
+    scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, cache=cache)
+    return scraper, scraper.build_url("01-01-2026", "01-31-2026", 1)
+
+
+def test_fresh_hit_skips_request_delay_and_parse(tmp_path):
+    races = make_races(10)
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttl=3600)
+    with FakeRaceSite(races) as site:
+        scraper, url = make_scraper(site, cache)
+        assert scraper.scrape_page(url, delay=False) == races
+
+        with mock.patch('time.sleep') as sleep, mock.patch.object(scraper, 'parse_races') as parse:
+            assert scraper.scrape_page(url) == races
+        sleep.assert_not_called()
+        parse.assert_not_called()
+        assert len(site.requested_paths) == 1
+
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    races = make_races(10)
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttl=0)
+    with FakeRaceSite(races) as site:
+        scraper, url = make_scraper(site, cache)
+        scraper.scrape_page(url, delay=False)
+
+        with mock.patch.object(scraper, 'parse_races') as parse:
+            assert scraper.scrape_page(url, delay=False) == races
+        parse.assert_not_called()
+
+        # A changed page is downloaded and parsed again
+        site.races = make_races(12)[2:]
+        assert scraper.scrape_page(url, delay=False) == site.races
+
+    assert cache.stats['revalidated'] == 1
+    assert cache.stats['changed'] == 1
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    races = make_races(10)
+    with FakeRaceSite(races) as site:
+        scraper, url = make_scraper(site, ResponseCache(path))
+        scraper.scrape_page(url, delay=False)
+        scraper.cache.close()
+
+        scraper, url = make_scraper(site, ResponseCache(path))
+        assert scraper.scrape_page(url, delay=False) == races
+        assert len(site.requested_paths) == 1
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    races = make_races(30)
+    with FakeRaceSite(races) as site:
+        probe = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        page_size = max(len(site.page_html(page).encode('utf-8')) for page in (1, 2, 3))
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=page_size * 2 + 10)
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, cache=cache)
+        urls = [probe.build_url("01-01-2026", "01-31-2026", page) for page in (1, 2, 3)]
+
+        scraper.scrape_page(urls[0], delay=False)
+        scraper.scrape_page(urls[1], delay=False)
+        scraper.scrape_page(urls[0], delay=False)
+        scraper.scrape_page(urls[2], delay=False)
+
+    assert cache.stats['evictions'] == 1
+    assert cache.lookup(urls[0]) is not None
+    assert cache.lookup(urls[1]) is None
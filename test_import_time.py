@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Import-time checks: heavy dependencies load only on the code paths that use them"""
+
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Third-party packages that each cost tens to hundreds of milliseconds to import
+HEAVY = {'pandas', 'pyarrow', 'bs4', 'lxml', 'cloudscraper', 'selenium', 'webdriver_manager', 'openpyxl'}
+
+
+def import_times(*args: str) -> Dict[str, int]:
+    """Run python -X importtime in a fresh interpreter; returns cumulative microseconds per module"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def heavy_modules(times: Dict[str, int]) -> set:
+    return {name.split('.')[0] for name in times} & HEAVY
+
+
+@pytest.mark.parametrize('module', [
+    'race_scraper', 'async_scraper', 'parsers', 'exporters', 'http_cache',
+    'sharding', 'race_store', 'race_model', 'race_index', 'dedup', 'checkpoint', 'metrics', 'resilience',
+    'query_planner', 'html_archive', 'bulk_reparse', 'transport', 'enrichment',
+])
+def test_modules_import_without_heavy_dependencies(module):
+    assert heavy_modules(import_times('-c', f'import {module}')) == set()
+
+
+def test_cli_help_starts_quickly():
+    times = import_times('-c', 'import race_cli; race_cli.main(["--help"])')
+
+    assert heavy_modules(times) == set()
+    assert 'requests' not in times
+    # About 20 ms here; eagerly importing pandas and friends took over half a second
+    assert times['race_cli'] < 250_000
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Tests for run metrics, run against a local fake site"""
+
+import gzip
+import io
+import json
+import urllib.request
+from datetime import timedelta
+
+import requests
+from urllib3 import HTTPResponse
+
+import race_cli
+from fake_site import FakeRaceSite, make_races
+from http_cache import ResponseCache
+from metrics import Histogram, Metrics, MetricsServer
+from race_scraper import RaceScraper
+
+RANGE = ("01-01-2026", "12-31-2026")
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 2, 1, 0]
+    assert histogram.quantile(0.0) == 0.05
+    assert 0.1 <= histogram.quantile(0.5) <= 1.0
+    assert histogram.quantile(1.0) == 2.0
+    assert histogram.to_dict()['count'] == 5
+
+
+def test_scrape_records_stages_and_counters(tmp_path):
+    races = make_races(25)
+    metrics = Metrics()
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+
+    with FakeRaceSite(races, pagination=True) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, cache=cache, metrics=metrics)
+        scraper.get_random_delay = lambda: 0.01
+        scraper.scrape_date_range(*RANGE)
+        report = metrics.report()
+
+        assert report['counters']['pages'] == 3
+        assert report['counters']['races'] == 25
+        assert report['counters']['requests'] == 3
+        assert report['counters']['responses_2xx'] == 3
+        assert report['counters']['response_bytes'] == report['counters']['decoded_bytes'] > 0
+        assert {'request', 'download', 'parse', 'delay', 'scrape'} <= set(report['stages'])
+        assert report['stages']['scrape']['count'] == 1
+
+        # The second run is served from the cache: no requests, no parsing
+        scraper.scrape_date_range(*RANGE)
+    cache.close()
+
+    assert metrics.counters['cache_hits'] == 3
+    assert metrics.counters['requests'] == 3
+    assert metrics.stages['parse'].count == 3
+
+
+def test_response_bytes_are_counted_before_decoding():
+    metrics = Metrics()
+    scraper = RaceScraper(use_cloudscraper=False, metrics=metrics)
+    body = b'<html><body>' + b'<div class="race">Moab 10K</div>' * 200 + b'</body></html>'
+    compressed = gzip.compress(body)
+    raw = HTTPResponse(io.BytesIO(compressed), headers={'Content-Encoding': 'gzip'}, status=200,
+                       preload_content=False)
+    request = scraper.session.prepare_request(requests.Request('GET', 'http://races.example/'))
+    response = scraper.session.get_adapter(request.url).build_response(request, raw)
+    response.elapsed = timedelta(0)
+
+    scraper.record_response(response, 0.01)
+    assert metrics.counters['response_bytes'] == len(compressed)
+    assert metrics.counters['decoded_bytes'] == len(body)
+
+
+def test_prometheus_endpoint():
+    metrics = Metrics()
+    metrics.count('pages', 2)
+    metrics.observe('parse', 0.02)
+
+    with MetricsServer(metrics, port=0) as server:
+        with urllib.request.urlopen(server.url) as response:
+            text = response.read().decode('utf-8')
+
+    assert 'race_scraper_pages_total 2' in text
+    assert 'race_scraper_stage_seconds_bucket{stage="parse",le="0.025"} 1' in text
+    assert 'race_scraper_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'race_scraper_stage_seconds_count{stage="parse"} 1' in text
+
+
+def test_cli_report_and_profile(tmp_path, capsys):
+    report = tmp_path / 'report.json'
+    profile = tmp_path / 'run.prof'
+
+    with FakeRaceSite(make_races(15)) as site:
+        status = race_cli.main(['--base-url', site.base_url, '--no-cloudscraper', '--no-delay',
+                                '--start', '01-01-2026', '--end', '01-31-2026',
+                                '--output', str(tmp_path / 'races.csv'),
+                                '--report', str(report), '--profile', str(profile)])
+
+    assert status == race_cli.EXIT_OK
+    metrics = json.loads(report.read_text())['metrics']
+    assert metrics['counters']['races'] == 15
+    assert metrics['counters']['races_exported'] == 15
+    assert {'request', 'parse', 'export'} <= set(metrics['stages'])
+    assert profile.exists()
+    assert 'function calls' in capsys.readouterr().out
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Tests for pagination planning, run against a local fake site"""
+
+from async_scraper import AsyncRaceScraper
+from fake_site import FakeRaceSite, make_races
+from pagination import PagePlan, read_pagination
+from race_scraper import RaceScraper
+
+RANGE = ("01-01-2026", "12-31-2026")
+
+
+def page_numbers(site):
+    return [int(path.rstrip('/').rsplit('page-', 1)[1]) for path in site.requested_paths]
+
+
+def test_read_pagination():
+    html = ('<a href="/classic/list/map/x/10k-to-100m/page-2">2</a>'
+            '<a href=\'/classic/list/map/x/10k-to-100m/page-14/\'>Last</a>'
+            '<p>Showing 1-25 of 1,234 races</p>')
+    assert read_pagination(html) == (14, 1234)
+    assert read_pagination(b'<p>87 races found</p>') == (None, 87)
+    assert read_pagination(b'<div class="list"></div>') == (None, None)
+    assert read_pagination(None) == (None, None)
+
+
+def test_plan_learns_page_size_and_handles_pages_out_of_order():
+    plan = PagePlan(max_pages=10)
+    plan.observe(1, [{}] * 25, '<a href="/page-4">4</a>')
+
+    assert (plan.page_size, plan.last_page) == (25, 4)
+    plan.observe(3, [{}] * 25)
+    plan.observe(4, [{}] * 7)
+    assert plan.is_last(4) and not plan.truncated
+
+
+def test_failed_pages_without_a_page_count():
+    plan = PagePlan(max_pages=10)
+    plan.observe(1, [{}] * 10)
+    plan.observe(2, [], failed=True)
+    # Without page links a failed page looks like the end, so it must be flagged
+    assert plan.is_last(1) and plan.incomplete
+    assert plan.summary().startswith('Warning: page 2 came back without races')
+
+    # A failed request past a short page (e.g. one fetched ahead concurrently) loses nothing
+    plan = PagePlan(max_pages=10)
+    plan.observe(1, [{}] * 10)
+    plan.observe(2, [{}] * 4)
+    plan.observe(3, [], failed=True)
+    assert not plan.incomplete
+
+
+def test_no_trailing_request_when_pages_are_linked():
+    races = make_races(40)
+    with FakeRaceSite(races, pagination=True) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        result, truncated = scraper.paginate(*RANGE, max_pages=20, delay=False)
+
+    assert result == races
+    assert not truncated
+    # Four full pages; the old short-page heuristic also requested an empty page 5
+    assert page_numbers(site) == [1, 2, 3, 4]
+
+
+def test_windowed_links_and_result_counts_extend_the_plan():
+    races = make_races(75)
+    for options in (dict(pagination=True, link_window=1), dict(show_total=True)):
+        with FakeRaceSite(races, **options) as site:
+            scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+            result, truncated = scraper.paginate(*RANGE, max_pages=20, delay=False)
+
+        assert result == races
+        assert page_numbers(site) == list(range(1, 9))
+
+
+def test_truncation_is_reported():
+    races = make_races(100)
+    with FakeRaceSite(races, pagination=True) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        plan = PagePlan(max_pages=4)
+        pages = list(scraper.iter_pages(*RANGE, max_pages=4, delay=False, plan=plan))
+
+    assert [page for page, _, _ in pages] == [1, 2, 3, 4]
+    assert plan.truncated
+    assert plan.listed_pages == 10
+    assert "page 10" in plan.summary()
+
+
+def test_unlinked_listing_falls_back_to_short_page():
+    races = make_races(30)
+    with FakeRaceSite(races) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        result, truncated = scraper.paginate(*RANGE, max_pages=3, delay=False)
+
+    assert result == races
+    assert truncated  # page 3 was full, so the range may go on
+    assert page_numbers(site) == [1, 2, 3]
+
+
+def test_async_fetches_exactly_the_planned_pages():
+    races = make_races(65)
+    with FakeRaceSite(races, pagination=True, latency=0.05) as site:
+        with AsyncRaceScraper(use_cloudscraper=False, base_url=site.base_url,
+                              requests_per_second=100, max_concurrency=4) as scraper:
+            result = scraper.scrape_date_range(*RANGE, max_pages=20)
+
+    assert result == races
+    assert sorted(page_numbers(site)) == list(range(1, 8))
+    assert site.max_in_flight > 1
+
+
+def test_failed_page_inside_a_listed_range_marks_it_incomplete(tmp_path, monkeypatch):
+    import race_cli
+
+    fetch_listing = RaceScraper.fetch_listing
+
+    def failing_page_3(self, url, delay=True):
+        # fetch_listing returns no races when a request fails
+        return ([], None) if url.rstrip('/').endswith('page-3') else fetch_listing(self, url, delay)
+
+    monkeypatch.setattr(RaceScraper, 'fetch_listing', failing_page_3)
+    with FakeRaceSite(make_races(50), pagination=True) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        plan = PagePlan(20)
+        races, truncated = scraper.paginate(*RANGE, max_pages=20, delay=False, plan=plan)
+        assert len(races) == 20 and not truncated
+        assert plan.incomplete and plan.missing == [3] and 'page 3 of 5' in plan.summary()
+
+        status = race_cli.main(['--start', RANGE[0], '--end', RANGE[1], '--no-cloudscraper', '--no-delay',
+                                '--base-url', site.base_url, '--output', str(tmp_path / 'races.csv')])
+    assert status == race_cli.EXIT_INCOMPLETE
+
+
+def test_sharded_and_planned_crawls_report_failed_pages(monkeypatch):
+    from query_planner import Query, QueryPlan
+    from sharding import ShardedScraper
+
+    fetch_listing = RaceScraper.fetch_listing
+
+    def failing_page_2(self, url, delay=True):
+        return ([], None) if url.rstrip('/').endswith('page-2') else fetch_listing(self, url, delay)
+
+    monkeypatch.setattr(RaceScraper, 'fetch_listing', failing_page_2)
+    with FakeRaceSite(make_races(28), page_size=10) as site:
+        sharded = ShardedScraper(lambda: RaceScraper(use_cloudscraper=False, base_url=site.base_url),
+                                 workers=1, max_pages=5, delay=False)
+        assert len(sharded.scrape('01-01-2026', '01-31-2026', granularity='month')) == 10
+        assert sharded.incomplete_shards == [('01-01-2026', '01-31-2026')]
+
+        crawls = QueryPlan([Query('january', '01-01-2026', '01-31-2026')])
+        crawls.execute(RaceScraper(use_cloudscraper=False, base_url=site.base_url), max_pages=5, delay=False)
+        assert len(crawls.incomplete_crawls) == 1 and crawls.truncated_crawls == []
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Parity tests and microbenchmark for the listing parser backends"""
+
+import os
+import time
+
+from fake_site import make_races, render_listing_page
+from parsers import BeautifulSoupParser, LxmlParser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def test_parsers_agree_on_edge_cases():
+    content = load_fixture('listing_edge_cases.html')
+    expected = BeautifulSoupParser().parse(content)
+
+    assert LxmlParser().parse(content) == expected
+    assert [race['Race Name'] for race in expected] == [
+        'Arches Ultra', 'AZTOracleRumble & Run', 'Café 5K & 10K Run',
+        'Two Day Relay', 'Nested Listing', 'Nested Listing',
+    ]
+
+
+def test_parsers_agree_on_generated_pages():
+    for count in (0, 1, 10, 250):
+        content = render_listing_page(make_races(count)).encode('utf-8')
+        assert LxmlParser().parse(content) == BeautifulSoupParser().parse(content)
+
+
+def test_parsers_agree_on_undeclared_encodings():
+    for content in (b'', b'   ',
+                    '<div class="list-item"><div class="date">Jan 1</div><a class="thick">Café</a>'
+                    '<div class="location">X, UT</div></div>'.encode('utf-8'),
+                    '<div class="list-item"><div class="date">Jan 1</div><a class="thick">Café</a>'
+                    '<div class="location">X, UT</div></div>'.encode('windows-1252')):
+        assert LxmlParser().parse(content) == BeautifulSoupParser().parse(content)
+
+
+def benchmark(parser, content, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parser.parse(content)
+    return (time.perf_counter() - started) / rounds
+
+
+def test_lxml_parser_is_faster():
+    content = render_listing_page(make_races(500)).encode('utf-8')
+    bs4_seconds = benchmark(BeautifulSoupParser(), content, 3)
+    lxml_seconds = benchmark(LxmlParser(), content, 3)
+
+    assert lxml_seconds * 2 < bs4_seconds
+
+
+if __name__ == '__main__':
+    for count in (10, 100, 1000):
+        content = render_listing_page(make_races(count)).encode('utf-8')
+        bs4_seconds = benchmark(BeautifulSoupParser(), content, 5)
+        lxml_seconds = benchmark(LxmlParser(), content, 5)
+        print(f"{count:>5} items: bs4 {bs4_seconds / count * 1e6:8.1f} µs/item, "
+              f"lxml {lxml_seconds / count * 1e6:8.1f} µs/item, "
+              f"speedup {bs4_seconds / lxml_seconds:5.1f}x")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests for distance facets, crawl planning and routing races back to queries"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from fake_site import FakeRaceSite
+from query_planner import Crawl, Query, QueryPlan, elementary_bands, parse_distance
+from race_model import format_listing_date, parse_distances, parse_listing_date
+from race_scraper import RaceScraper
+
+NAMES = ['5K Fun Run', '10K Classic', 'Half Marathon', '50 Mile Ultra', '5K & 10K Family Run']
+
+
+def make_distance_races(days: int):
+    """One race a day from Jan 1, 2026, cycling through distances"""
+    first = date(2026, 1, 1)
+    return [{'Date': format_listing_date(first + timedelta(days=i)),
+             'Race Name': f"{NAMES[i % len(NAMES)]} {i + 1}",
+             'Location': 'Moab, UT'}
+            for i in range(days)]
+
+
+def expected(races, query):
+    band = parse_distance(query.distance)
+    start, end = (date(int(d[6:]), int(d[:2]), int(d[3:5])) for d in (query.start_date, query.end_date))
+    return [race for race in races
+            if start <= parse_listing_date(race['Date']) <= end
+            and any(band.low <= km <= band.high for km in parse_distances(race['Race Name']))]
+
+
+def test_parse_distance():
+    band = parse_distance('10k-to-100m')
+    assert (band.low, round(band.high, 3), band.segment) == (10.0, 160.934, '10k-to-100m')
+    assert parse_distance('5K-to-5K').segment == '5k-to-5k'
+    for bad in ('10k', '10k-to-100x', '100m-to-10k'):
+        with pytest.raises(ValueError):
+            parse_distance(bad)
+
+
+def test_bands_are_split_at_every_requested_boundary():
+    bands = [parse_distance('5k-to-100m'), parse_distance('10k-to-26.2m'), parse_distance('5k-to-5k')]
+    assert [band.segment for band in elementary_bands(bands)] == [
+        '5k-to-5k', '5k-to-10k', '10k-to-26.2m', '26.2m-to-100m']
+
+
+def test_overlapping_queries_share_crawls():
+    plan = QueryPlan([
+        Query('all', '01-01-2026', '03-31-2026', '5k-to-100m'),
+        Query('long', '02-01-2026', '04-30-2026', '10k-to-100m'),
+        Query('short', '01-01-2026', '01-31-2026', '5k-to-10k'),
+        Query('summer', '06-01-2026', '06-30-2026', '10k-to-100m'),
+    ])
+
+    assert plan.crawls == [
+        Crawl('01-01-2026', '03-31-2026', '5k-to-10k', ('short', 'all')),
+        Crawl('01-01-2026', '04-30-2026', '10k-to-100m', ('all', 'long')),
+        Crawl('06-01-2026', '06-30-2026', '10k-to-100m', ('summer',)),
+    ]
+
+
+def test_back_to_back_ranges_merge_into_one_crawl():
+    plan = QueryPlan([Query('jan', '01-01-2026', '01-31-2026'), Query('feb', '02-01-2026', '02-28-2026')])
+    assert plan.crawls == [Crawl('01-01-2026', '02-28-2026', '10k-to-100m', ('jan', 'feb'))]
+
+
+def test_invalid_queries_are_rejected():
+    with pytest.raises(ValueError):
+        QueryPlan([Query('a', '01-01-2026', '01-31-2026'), Query('a', '02-01-2026', '02-28-2026')])
+    with pytest.raises(ValueError):
+        QueryPlan([Query('a', '02-01-2026', '01-01-2026')])
+
+
+def test_one_crawl_serves_every_query():
+    races = make_distance_races(120)
+    queries = [
+        Query('all', '01-01-2026', '03-31-2026', '5k-to-100m'),
+        Query('long', '02-01-2026', '04-30-2026', '10k-to-100m'),
+        Query('short', '01-01-2026', '01-31-2026', '5k-to-10k'),
+        Query('half', '01-15-2026', '02-15-2026', '13m-to-13.2m'),
+    ]
+    plan = QueryPlan(queries)
+
+    with FakeRaceSite(races) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        results = plan.execute(scraper, delay=False)
+        shared_pages = list(site.requested_paths)
+
+    # The same queries crawled one by one
+    with FakeRaceSite(races) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        for query in queries:
+            scraper.paginate(query.start_date, query.end_date, delay=False, distance=query.distance)
+        separate_pages = list(site.requested_paths)
+
+    for query in queries:
+        assert results[query.name] == expected(races, query), query.name
+    # One paginated listing per crawl, and fewer pages than crawling each query
+    assert len({path.rsplit('/page-', 1)[0] for path in shared_pages}) == len(plan.crawls)
+    assert len(shared_pages) < len(separate_pages)
+    # '5K & 10K' races are listed in both bands around 10k but kept once
+    assert plan.stats['duplicates'] > 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Tests for the non-interactive command line, run against a local fake site"""
+
+import csv
+import json
+
+import pytest
+
+import race_cli
+from fake_site import FakeRaceSite, make_races
+
+
+def run(site, *args):
+    return race_cli.main(['--base-url', site.base_url, '--no-cloudscraper', '--no-delay', *args])
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_load_jobs_reads_text_json_and_jsonl(tmp_path):
+    text = tmp_path / 'jobs.txt'
+    text.write_text("# nightly\n01-01-2026 01-31-2026\n\n02-01-2026 02-28-2026 feb.csv  # second\n")
+    listed = tmp_path / 'jobs.json'
+    listed.write_text(json.dumps([{'start': '01-01-2026', 'end': '01-31-2026', 'max_pages': 5}]))
+    lines = tmp_path / 'jobs.jsonl'
+    lines.write_text('{"start": "03-01-2026", "end": "03-02-2026", "output": "mar.jsonl"}\n')
+
+    assert race_cli.load_jobs(str(text)) == [
+        race_cli.Job('01-01-2026', '01-31-2026'),
+        race_cli.Job('02-01-2026', '02-28-2026', 'feb.csv'),
+    ]
+    assert race_cli.load_jobs(str(listed)) == [race_cli.Job('01-01-2026', '01-31-2026', None, 5)]
+    assert race_cli.load_jobs(str(lines)) == [race_cli.Job('03-01-2026', '03-02-2026', 'mar.jsonl')]
+
+
+@pytest.mark.parametrize('args', [
+    [],
+    ['--start', '2026-01-01'],
+    ['--start', '02-01-2026', '--end', '01-01-2026'],
+    ['--range', '01-01-2026'],
+    ['--jobs', 'no-such-file.txt'],
+    ['--start', '01-01-2026', '--max-pages', '0'],
+    ['--start', '01-01-2026', '--max-pages', '51'],
+    # The concurrent engines don't keep a checkpoint journal
+    ['--start', '01-01-2026', '--engine', 'async', '--resume'],
+    ['--start', '01-01-2026', '--engine', 'pool', '--checkpoint', 'run.jsonl'],
+])
+def test_bad_input_exits_with_usage_status(args):
+    assert race_cli.main(args) == race_cli.EXIT_USAGE
+
+
+@pytest.mark.parametrize('max_pages', [0, 51, 'lots'])
+def test_job_file_page_limit_is_checked(tmp_path, max_pages):
+    jobs = tmp_path / 'jobs.json'
+    jobs.write_text(json.dumps([{'start': '01-01-2026', 'end': '01-31-2026', 'max_pages': max_pages}]))
+    assert race_cli.main(['--jobs', str(jobs)]) == race_cli.EXIT_USAGE
+
+
+def test_batch_writes_a_file_per_range_and_a_report(tmp_path):
+    races = make_races(50)  # 28 in January, 22 in February
+    output = str(tmp_path / 'races_{start}.csv')
+    report = tmp_path / 'report.json'
+
+    with FakeRaceSite(races, pagination=True) as site:
+        status = run(site, '--range', '01-01-2026:01-31-2026', '--range', '02-01-2026:02-28-2026',
+                     '--output', output, '--report', str(report))
+
+    assert status == race_cli.EXIT_OK
+    assert len(site.requested_paths) == 6
+    assert len(read_csv(output.format(start='01-01-2026'))) == 28
+    assert len(read_csv(output.format(start='02-01-2026'))) == 22
+
+    summary = json.loads(report.read_text())
+    assert summary['exit_code'] == 0
+    assert [job['races'] for job in summary['jobs']] == [28, 22]
+
+
+def test_combined_output_can_drop_duplicates(tmp_path):
+    output = str(tmp_path / 'all.csv')
+
+    with FakeRaceSite(make_races(15)) as site:
+        status = run(site, '--range', '01-01-2026:01-10-2026', '--range', '01-05-2026:01-31-2026',
+                     '--output', output, '--dedup')
+
+    assert status == race_cli.EXIT_OK
+    assert len(read_csv(output)) == 15
+
+
+def test_exit_status_reports_truncation_and_empty_ranges(tmp_path):
+    output = str(tmp_path / 'races.jsonl')
+
+    with FakeRaceSite(make_races(50), pagination=True) as site:
+        for engine in ('requests', 'async'):
+            status = run(site, '--start', '01-01-2026', '--end', '12-31-2026', '--max-pages', '2',
+                         '--engine', engine, '--rate', '100', '--output', output)
+            assert status == race_cli.EXIT_TRUNCATED
+
+    with FakeRaceSite([]) as site:
+        assert run(site, '--start', '01-01-2026', '--output', output) == race_cli.EXIT_NO_RACES
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for the in-memory race index, checked against plain list scans"""
+
+import random
+import time
+from datetime import date
+
+import pytest
+
+from fake_site import make_races
+from race_index import RaceIndex, weekend_of
+from race_model import Race
+
+
+def scan(races, start=None, end=None, state=None, city=None, min_km=None, max_km=None, name_prefix=None):
+    """The list-comprehension answer the index must agree with"""
+    parsed = [Race.from_dict(race) for race in races]
+    matches = [
+        (race.date, row) for row, race in enumerate(parsed)
+        if (start is None or race.date >= start)
+        and (end is None or race.date <= end)
+        and (state is None or race.state == state)
+        and (city is None or race.city.casefold() == city.casefold())
+        and (min_km is None and max_km is None
+             or any((min_km or 0) <= km <= (max_km or 1e9) for km in race.distances))
+        and (name_prefix is None or race.name.lower().startswith(name_prefix.lower()))
+    ]
+    return [row for _, row in sorted(matches)]
+
+
+def sample_races(count):
+    races = make_races(count)
+    for i, race in enumerate(races):
+        race['Race Name'] = ['Spring 5K', 'Canyon Half Marathon', 'Ridge 50K & 10 Mile', race['Race Name']][i % 4]
+    return races
+
+
+@pytest.mark.parametrize('conditions', [
+    dict(start=date(2026, 3, 7), end=date(2026, 3, 8)),
+    dict(state='UT'),
+    dict(city='MOAB', start=date(2026, 2, 1)),
+    dict(state='CO', end=date(2026, 1, 10)),
+    dict(min_km=20, max_km=30),
+    dict(min_km=40, state='AZ'),
+    dict(name_prefix='canyon'),
+    dict(name_prefix='ridge 50', state='UT', start=date(2026, 5, 1), end=date(2026, 6, 30)),
+    dict(state='ZZ'),
+])
+def test_rows_match_list_scan(conditions):
+    races = sample_races(2000)
+    random.Random(1).shuffle(races)
+
+    assert RaceIndex(races).rows(**conditions) == scan(races, **conditions)
+
+
+def test_incremental_pages_match_bulk_build():
+    races = sample_races(500)
+    index = RaceIndex()
+    for start in range(0, len(races), 10):
+        index.add_page(start // 10 + 1, 'url', races[start:start + 10])
+
+    bulk = RaceIndex(races)
+    for conditions in (dict(state='NV'), dict(name_prefix='spring'), dict(min_km=10, max_km=10)):
+        assert index.rows(**conditions) == bulk.rows(**conditions)
+    assert len(index) == 500
+    assert index.table.to_dicts() == races
+
+
+def test_weekend_and_string_dates():
+    races = sample_races(1000)
+    index = RaceIndex(races)
+
+    assert weekend_of('03-04-2026') == (date(2026, 3, 7), date(2026, 3, 8))
+    weekend = index.weekend('03-04-2026')
+    assert weekend
+    assert all(race.date in weekend_of('03-04-2026') for race in weekend)
+    state = weekend[0].state
+    assert index.weekend('03-04-2026', state=state) == [race for race in weekend if race.state == state]
+    assert index.count(start='03-07-2026', end='03-08-2026') == len(
+        scan(races, start=date(2026, 3, 7), end=date(2026, 3, 8)))
+
+
+def test_undated_races_are_only_returned_without_date_conditions():
+    races = sample_races(20) + [{'Date': 'TBD', 'Race Name': 'Mystery Run', 'Location': 'Moab, UT'}]
+    index = RaceIndex(races)
+
+    assert 20 in index.rows(state='UT')
+    assert 20 not in index.rows(state='UT', start=date(2026, 1, 1))
+
+
+def test_selective_lookup_is_fast():
+    index = RaceIndex(sample_races(50000))
+
+    started = time.perf_counter()
+    for _ in range(100):
+        index.rows(name_prefix='ridge 50k & 10 mile', state='UT', start=date(2026, 3, 1), end=date(2026, 3, 31))
+    assert (time.perf_counter() - started) / 100 < 0.005
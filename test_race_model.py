@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for the typed race record and the columnar race table"""
+
+from datetime import date
+
+import pytest
+
+from fake_site import make_races, render_listing_page
+from race_model import Race, RaceTable, parse_distances, parse_location
+
+
+def test_race_from_dict_parses_fields():
+    race = Race.from_dict({'Date': 'Jan 31, 2026', 'Race Name': 'Frostbite 5K & 10K',
+                           'Location': 'Park City, UT'})
+
+    assert race.date == date(2026, 1, 31)
+    assert (race.city, race.state) == ('Park City', 'UT')
+    assert race.distances == (5.0, 10.0)
+    assert race.to_dict() == {'Date': 'Jan 31, 2026', 'Race Name': 'Frostbite 5K & 10K',
+                              'Location': 'Park City, UT'}
+
+
+def test_parse_location_without_state():
+    assert parse_location('Virtual') == ('Virtual', None)
+    assert parse_location('Washington, District of Columbia') == ('Washington, District of Columbia', None)
+    assert parse_location('Anchorage,AK') == ('Anchorage', 'AK')
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Half Marathon', (21.0975,)),
+    ('City Marathon & 5K', (5.0, 42.195)),
+    ('Moab 100M Endurance Run', (160.934,)),
+    ('Turkey Trot 4 Mile', (6.437,)),
+    ('Race Number 5 Trail Run', ()),
+    ('Track 5000m', (5.0,)),
+    ('Summer 5 Miler', (8.047,)),
+    ('50 Miler & 50K', (50.0, 80.467)),
+    ('Grand Slam 200m', (321.869,)),
+])
+def test_parse_distances(name, expected):
+    assert parse_distances(name) == pytest.approx(expected)
+
+
+def test_table_round_trips_including_irregular_text():
+    races = make_races(60) + [
+        {'Date': 'TBD', 'Race Name': 'Mystery Run', 'Location': 'Virtual'},
+        {'Date': 'Feb 01, 2026', 'Race Name': 'Padded Day 10k', 'Location': 'Provo,UT'},
+        # Scraped with links and enriched
+        {'Date': 'Feb 2, 2026', 'Race Name': 'Linked 5K', 'Location': 'Moab, UT',
+         'URL': 'https://example.com/race/linked-5k', 'Start Time': '7:00 AM'},
+    ]
+
+    table = RaceTable.from_dicts(races)
+
+    assert len(table) == len(races)
+    assert table.to_dicts() == races
+    assert table[-3].date is None
+    assert table[-2].date == date(2026, 2, 1)
+    assert table[-2].state == 'UT'
+    assert table[-1].extras == {'URL': 'https://example.com/race/linked-5k', 'Start Time': '7:00 AM'}
+    assert Race.from_dict(races[-1]).to_dict() == races[-1]
+    assert [table[row] for row in range(len(table))] == list(table)
+
+
+def test_table_shares_lookup_values():
+    table = RaceTable.from_dicts(make_races(200))
+
+    assert len(table.cities) < 20
+    assert len(table.states) < 20
+    assert table[0].city is table[len(table.cities)].city
+
+
+def test_rows_in_state_matches_string_filter():
+    races = make_races(100)
+    table = RaceTable.from_dicts(races)
+    state = table[3].state
+
+    rows = table.rows_in_state(state)
+
+    assert rows == [i for i, race in enumerate(races) if race['Location'].endswith(', ' + state)]
+    assert table.rows_in_state('ZZ') == []
+
+
+def test_from_html_matches_from_dicts():
+    races = make_races(25)
+    pages = [render_listing_page(races[i:i + 10]).encode('utf-8') for i in range(0, 25, 10)]
+
+    assert RaceTable.from_html(pages).to_dicts() == races
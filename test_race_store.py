@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Tests for the persistent race store and incremental scraping"""
+
+from fake_site import FakeRaceSite, make_races
+from race_scraper import RaceScraper
+from race_store import IncrementalScraper, RaceStore, race_identity
+
+
+def test_identity_ignores_case_and_spacing():
+    assert race_identity({'Date': 'Jan 31, 2026', 'Race Name': 'Arches  Ultra', 'Location': 'Moab, UT'}) == \
+        race_identity({'Date': 'Jan 31, 2026', 'Race Name': 'arches ultra', 'Location': 'MOAB, UT '})
+
+
+def test_incremental_runs_report_changes_and_skip_fresh_ranges(tmp_path):
+    races = make_races(56)  # January and February
+    with FakeRaceSite(races) as site, RaceStore(str(tmp_path / 'races.sqlite')) as store:
+        scraper = IncrementalScraper(store, RaceScraper(use_cloudscraper=False, base_url=site.base_url),
+                                     granularity='month', delay=False)
+
+        first = scraper.scrape("01-01-2026", "02-28-2026")
+        assert first.inserted == races
+        assert first.ranges_scraped == 2
+
+        # Nothing is stale yet, so nothing is requested
+        requests_before = len(site.requested_paths)
+        assert scraper.scrape("01-01-2026", "02-28-2026").ranges_skipped == 2
+        assert len(site.requested_paths) == requests_before
+
+        # Rename one race, retitle another and drop a third
+        site.races = [dict(race) for race in races[1:]]
+        site.races[0]['Race Name'] = site.races[0]['Race Name'].upper()
+        site.races.append({'Date': 'Feb 28, 2026', 'Race Name': 'Brand New Race', 'Location': 'Bend, OR'})
+        scraper.max_age = 0
+        second = scraper.scrape("01-01-2026", "02-28-2026")
+
+        assert [race['Race Name'] for race in second.inserted] == ['Brand New Race']
+        assert [race['Race Name'] for race in second.updated] == [site.races[0]['Race Name']]
+        assert second.removed == [races[0]]
+        assert len(store.races_between("01-01-2026", "02-28-2026")) == 56
+        assert store.page_last_scraped(scraper.scraper.build_url("01-01-2026", "01-31-2026", 1)) is not None
+
+
+def test_failed_page_does_not_remove_stored_races(tmp_path, monkeypatch):
+    races = make_races(28)
+    fetch_listing = RaceScraper.fetch_listing
+
+    def failing_page_2(self, url, delay=True):
+        # A ConnectionError ends up as no races and no HTML
+        return ([], None) if url.rstrip('/').endswith('page-2') else fetch_listing(self, url, delay)
+
+    with FakeRaceSite(races) as site, RaceStore(str(tmp_path / 'races.sqlite')) as store:
+        scraper = IncrementalScraper(store, RaceScraper(use_cloudscraper=False, base_url=site.base_url),
+                                     granularity='month', max_age=0, delay=False)
+        assert len(scraper.scrape("01-01-2026", "01-31-2026").inserted) == 28
+        scraped_at = store.range_last_scraped("01-01-2026", "01-31-2026")
+
+        monkeypatch.setattr(RaceScraper, 'fetch_listing', failing_page_2)
+        report = scraper.scrape("01-01-2026", "01-31-2026")
+
+        assert report.removed == []
+        assert len(store.races_between("01-01-2026", "01-31-2026")) == 28
+        assert store.range_last_scraped("01-01-2026", "01-31-2026") == scraped_at
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Tests for retries, Retry-After handling and the per-host circuit breaker"""
+
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from fake_site import FakeRaceSite, make_races
+from metrics import Metrics
+from race_scraper import RaceScraper
+from resilience import CircuitBreaker, HostBreakers, ResilientFetcher, RetryPolicy, parse_retry_after
+
+URL = 'http://races.example/classic/list/map/page-1'
+FAST = RetryPolicy(attempts=4, base_delay=0.01)
+
+
+def response(status, retry_after=None):
+    result = requests.Response()
+    result.status_code = status
+    result._content = b'<html></html>'
+    if retry_after is not None:
+        result.headers['Retry-After'] = retry_after
+    return result
+
+
+class ScriptedSession:
+    """Answers GETs from a list of statuses (or exceptions) and records each call's verify flag"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.verify = []
+
+    def get(self, url, verify=True, **kwargs):
+        self.verify.append(verify)
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-5') == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(formatdate(1_000_030, usegmt=True), now=1_000_000) == 30
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.backoff(retry) for retry in range(8) for _ in range(20)]
+
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 100
+    assert all(policy.backoff(0) <= 1.0 for _ in range(20))
+
+
+def test_retry_after_is_honoured_and_counted():
+    metrics = Metrics()
+    session = ScriptedSession(response(429, '0.2'), response(200))
+    fetcher = ResilientFetcher(FAST, HostBreakers(), metrics)
+
+    started = time.monotonic()
+    result = fetcher.get(session, URL)
+
+    assert result.status_code == 200
+    assert time.monotonic() - started >= 0.2
+    assert metrics.counters['throttled'] == 1
+    assert metrics.counters['retries'] == 1
+    assert metrics.stages['breaker_wait'].count == 1
+
+
+def test_gives_up_after_the_last_attempt():
+    metrics = Metrics()
+    session = ScriptedSession(response(503))
+    fetcher = ResilientFetcher(FAST, HostBreakers(failure_threshold=10), metrics)
+
+    assert fetcher.get(session, URL).status_code == 503
+    assert len(session.verify) == 4
+    assert metrics.counters['retries'] == 3
+    assert metrics.counters['server_errors'] == 4
+
+
+def test_ssl_fallback_is_remembered_per_host():
+    metrics = Metrics()
+    session = ScriptedSession(requests.exceptions.SSLError('bad certificate'), response(200), response(200))
+    fetcher = ResilientFetcher(FAST, HostBreakers(), metrics)
+
+    fetcher.get(session, URL)
+    fetcher.get(session, URL)
+
+    # Only the first request tried to verify; the old fallback retried every page
+    assert session.verify == [True, False, False]
+    assert metrics.counters['ssl_fallbacks'] == 1
+
+
+def test_throttling_pauses_every_worker_on_the_host():
+    breakers = HostBreakers()
+    breakers.get('races.example').record_failure(pause=0.2)
+
+    waits = []
+    workers = [threading.Thread(target=lambda: waits.append(breakers.get('races.example').acquire()))
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(waits) == 3 and min(waits) >= 0.15
+    assert breakers.get('other.example').acquire() < 0.05
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.1)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.acquire() >= 0.05
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # A second worker waits until the probe succeeds
+    released = []
+    waiter = threading.Thread(target=lambda: released.append(breaker.acquire()))
+    waiter.start()
+    time.sleep(0.1)
+    assert not released
+    breaker.record_success()
+    waiter.join(1)
+    assert released and breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_doubles_the_cooldown():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05, max_cooldown=0.15)
+    breaker.record_failure()
+    for expected in (0.1, 0.15):
+        breaker.acquire()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.cooldown == expected
+
+
+@pytest.mark.parametrize('use_cloudscraper', [False, True])
+def test_both_session_types_retry_injected_faults(use_cloudscraper):
+    if use_cloudscraper:
+        pytest.importorskip('cloudscraper')
+    races = make_races(60)
+    metrics = Metrics()
+
+    with FakeRaceSite(races, pagination=True, throttle_rate=0.15, error_rate=0.15, retry_after=0) as site:
+        scraper = RaceScraper(use_cloudscraper=use_cloudscraper, base_url=site.base_url, metrics=metrics,
+                              retry=FAST)
+        result, _ = scraper.paginate("01-01-2026", "12-31-2026", delay=False)
+        faults = sum(count for status, count in site.status_counts.items() if status != 200)
+
+    assert result == races
+    assert faults > 0
+    assert metrics.counters['retries'] == faults
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for the Selenium readiness waits and browser pool (the pool test needs Chrome)"""
+
+import shutil
+import time
+
+import pytest
+
+from fake_site import FakeRaceSite, make_races
+from race_scraper_selenium import HostThrottle, wait_until_ready
+
+CHROME = any(shutil.which(name) for name in ('google-chrome', 'chromium', 'chromium-browser', 'chrome'))
+
+
+class StubDriver:
+    """Just enough of a WebDriver for the readiness condition"""
+
+    def __init__(self, listing_after: float = None, ready_state: str = 'complete'):
+        self.created = time.monotonic()
+        self.listing_after = listing_after
+        self.ready_state = ready_state
+
+    def find_elements(self, by, selector):
+        if self.listing_after is not None and time.monotonic() - self.created >= self.listing_after:
+            return [object()]
+        return []
+
+    def execute_script(self, script):
+        return self.ready_state
+
+
+def test_ready_as_soon_as_listing_renders():
+    started = time.monotonic()
+    assert wait_until_ready(StubDriver(listing_after=0.2), timeout=5) == 'listing'
+    assert time.monotonic() - started < 1
+
+
+def test_loaded_page_without_listing_counts_as_empty():
+    assert wait_until_ready(StubDriver(), timeout=5, empty_grace=0.2) == 'empty'
+    assert wait_until_ready(StubDriver(ready_state='loading'), timeout=0.3) == 'timeout'
+
+
+def test_throttle_spaces_loads_per_host():
+    throttle = HostThrottle(min_interval=0.2)
+    assert throttle.wait("http://a.example/1") == 0
+    assert throttle.wait("http://b.example/1") == 0
+    assert throttle.wait("http://a.example/2") > 0.1
+
+
+class CrashingDriver:
+    """A browser that loads the page, then dies before its source can be read"""
+
+    def get(self, url):
+        pass
+
+    def find_elements(self, by, selector):
+        return [object()]
+
+    def execute_script(self, script):
+        return 'complete'
+
+    @property
+    def page_source(self):
+        from selenium.common.exceptions import WebDriverException
+        raise WebDriverException('chrome not reachable')
+
+
+def test_crashed_browser_reports_a_failed_page():
+    from types import SimpleNamespace
+
+    from selenium_pool import BrowserPool
+
+    pool = BrowserPool.__new__(BrowserPool)
+    pool.primary = SimpleNamespace(throttle=HostThrottle(min_interval=0), page_timeout=1)
+    assert pool.load_listing(CrashingDriver(), 'http://races.example/page-2') == ([], None)
+    assert pool.load_page(CrashingDriver(), 'http://races.example/page-2') == []
+
+
+@pytest.mark.skipif(not CHROME, reason="Chrome is not installed")
+def test_pool_returns_races_in_page_order():
+    from pagination import PagePlan
+    from selenium_pool import BrowserPool
+
+    races = make_races(45)
+    with FakeRaceSite(races, latency=0.05) as site:
+        with BrowserPool(size=3, headless=True, manual_verification=False, page_timeout=5,
+                         min_interval=0, base_url=site.base_url) as pool:
+            plan = PagePlan(20)
+            assert pool.scrape_date_range("01-01-2026", "12-31-2026", max_pages=20, plan=plan) == races
+            assert not plan.truncated and not plan.incomplete
+            assert len(pool.drivers) == 3
+            assert pool.primary.timing_summary()['timeouts'] == 0
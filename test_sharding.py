@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Tests for date-range sharding, run against a local fake site"""
+
+from fake_site import FakeRaceSite, make_races
+from race_scraper import RaceScraper
+from sharding import ShardedScraper, plan_shards
+
+
+def test_plan_shards_covers_range_without_overlap():
+    assert plan_shards("01-30-2026", "03-02-2026", 'month') == [
+        ("01-30-2026", "01-31-2026"),
+        ("02-01-2026", "02-28-2026"),
+        ("03-01-2026", "03-02-2026"),
+    ]
+    assert plan_shards("01-01-2026", "01-16-2026", 'week') == [
+        ("01-01-2026", "01-07-2026"),
+        ("01-08-2026", "01-14-2026"),
+        ("01-15-2026", "01-16-2026"),
+    ]
+    assert len(plan_shards("01-01-2026", "01-31-2026", 'day')) == 31
+
+
+def test_sharded_scrape_matches_full_listing():
+    races = make_races(200)
+    with FakeRaceSite(races, page_size=10, latency=0.01) as site:
+        scraper = ShardedScraper(lambda: RaceScraper(use_cloudscraper=False, base_url=site.base_url),
+                                 workers=4, max_pages=2, delay=False)
+        result = scraper.scrape("01-01-2026", "12-31-2026", granularity='month')
+
+    assert result == races
+    # 28 races a month do not fit in two pages of 10, so month shards must split
+    assert scraper.stats['splits'] > 0
+    assert scraper.truncated_shards == []
+
+
+def test_single_day_at_ceiling_is_reported():
+    races = [{'Date': 'Jan 1, 2026', 'Race Name': f"Race {i}", 'Location': 'Moab, UT'} for i in range(30)]
+    with FakeRaceSite(races, page_size=10) as site:
+        scraper = ShardedScraper(lambda: RaceScraper(use_cloudscraper=False, base_url=site.base_url),
+                                 workers=2, max_pages=2, delay=False)
+        result = scraper.scrape("01-01-2026", "01-02-2026", granularity='week')
+
+    assert result == races[:20]
+    assert scraper.truncated_shards == [("01-01-2026", "01-01-2026")]
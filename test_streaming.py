@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Tests for the streaming race iterators, run against a local fake site"""
+
+import asyncio
+
+from async_scraper import AsyncRaceScraper
+from fake_site import FakeRaceSite, make_races
+from race_scraper import RaceScraper
+
+
+def test_iter_races_fetches_pages_on_demand():
+    races = make_races(45)
+    with FakeRaceSite(races) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        stream = scraper.iter_races("01-01-2026", "12-31-2026", max_pages=20, delay=False)
+
+        assert next(stream) == races[0]
+        assert len(site.requested_paths) == 1
+
+        assert [races[0]] + list(stream) == races
+        assert len(site.requested_paths) == 5
+
+
+def test_paginate_reports_truncation():
+    races = make_races(45)
+    with FakeRaceSite(races) as site:
+        scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url)
+        assert scraper.paginate("01-01-2026", "12-31-2026", max_pages=3, delay=False) == (races[:30], True)
+        assert scraper.paginate("01-01-2026", "12-31-2026", max_pages=5, delay=False) == (races, False)
+
+
+def test_async_iterator_buffers_at_most_the_concurrency_window():
+    races = make_races(100)
+
+    async def first_race(scraper):
+        stream = scraper.iter_races_async("01-01-2026", "12-31-2026", max_pages=10)
+        race = await stream.__anext__()
+        # Give any in-flight requests time to finish while the consumer is idle
+        await asyncio.sleep(0.3)
+        await stream.aclose()
+        return race
+
+    with FakeRaceSite(races, latency=0.05) as site:
+        with AsyncRaceScraper(use_cloudscraper=False, base_url=site.base_url,
+                              requests_per_second=100, max_concurrency=3) as scraper:
+            assert asyncio.run(first_race(scraper)) == races[0]
+        assert len(site.requested_paths) <= 3
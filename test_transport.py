@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Tests for the shared connection pools"""
+
+import gzip
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+import transport
+from fake_site import FakeRaceSite, make_races
+from race_scraper import RaceScraper
+from transport import Transport
+
+
+def test_new_scrapers_reuse_warm_connections():
+    races = make_races(84)  # 28 races in each of January to March
+    pools = Transport(pool_size=4)
+    with FakeRaceSite(races, page_size=10) as site:
+        for start, end in (('01-01-2026', '01-31-2026'), ('02-01-2026', '02-28-2026'), ('03-01-2026', '03-31-2026')):
+            scraper = RaceScraper(use_cloudscraper=False, base_url=site.base_url, transport=pools)
+            races, truncated = scraper.paginate(start, end, max_pages=3, delay=False)
+            assert len(races) == 28 and not truncated
+
+    [pool] = pools.pool_stats()
+    assert pool['session'] == 'requests' and pool['pool_size'] == 4
+    assert pool['requests'] >= 9 and pool['opened'] == 1
+    assert pool['in_use'] == 0 and pool['idle'] == 1
+    assert pool['reuse'] > 0.8
+    assert 'reused' in pools.summary()
+    pools.close()
+    assert pools.pool_stats() == []
+
+
+def test_scrapers_share_the_process_wide_transport():
+    first = RaceScraper(use_cloudscraper=False)
+    second = RaceScraper(use_cloudscraper=False)
+
+    assert first.transport is transport.shared_transport()
+    assert first.session is second.session
+
+
+def test_each_thread_gets_its_own_session_over_the_shared_pool():
+    pools = Transport()
+    main = pools.session()
+    main.cookies.set('cf_clearance', 'verified')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        other = executor.submit(pools.session).result()
+
+    assert other is not main
+    assert other.get_adapter('http://races.example/') is main.get_adapter('http://races.example/')
+    # Cookies set on one thread's session are sent by every thread
+    assert other.cookies.get('cf_clearance') == 'verified'
+
+
+def test_cloudscraper_keeps_its_adapter_with_a_larger_pool():
+    pytest.importorskip('cloudscraper')
+    pools = Transport(pool_size=12)
+    session = pools.session(cloudscraper=True)
+    adapter = session.get_adapter('https://www.runningintheusa.com/')
+
+    assert type(adapter).__module__.startswith('cloudscraper')
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 12
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(pools.session, True).result()
+    assert other is not session and other.get_adapter('https://www.runningintheusa.com/') is adapter
+
+
+def test_only_decodable_encodings_are_advertised():
+    scraper = RaceScraper(use_cloudscraper=False)
+    assert scraper.get_headers()['Accept-Encoding'] == transport.ACCEPT_ENCODING
+    assert ('br' in transport.ACCEPT_ENCODING) == transport.BROTLI_AVAILABLE
+
+    # Compressed bodies reach the parser decoded
+    session = Transport().session()
+    raw = HTTPResponse(io.BytesIO(gzip.compress(b'<html>ok</html>')), headers={'Content-Encoding': 'gzip'},
+                       status=200, preload_content=False)
+    request = session.prepare_request(requests.Request('GET', 'http://races.example/'))
+    assert session.get_adapter(request.url).build_response(request, raw).content == b'<html>ok</html>'
+
+
+def test_http2_needs_httpx():
+    if transport.HTTPX_AVAILABLE and transport.H2_AVAILABLE:
+        session = Transport(http2=True).session()
+        assert isinstance(session, transport.Http2Session)
+    else:
+        with pytest.raises(ImportError, match='httpx'):
+            Transport(http2=True)
+
+
+def test_cli_reports_pool_stats(tmp_path):
+    import race_cli
+
+    report = tmp_path / 'report.json'
+    with FakeRaceSite(make_races(56), page_size=10) as site:
+        status = race_cli.main(['--range', '01-01-2026:01-31-2026', '--range', '02-01-2026:02-28-2026',
+                                '--no-cloudscraper', '--no-delay', '--base-url', site.base_url,
+                                '--output', str(tmp_path / 'races.csv'), '--report', str(report)])
+    assert status == 0
+    [pool] = json.loads(report.read_text())['transport']
+    assert pool['opened'] < pool['requests']
+
+    if not (transport.HTTPX_AVAILABLE and transport.H2_AVAILABLE):
+        assert race_cli.main(['--start', '01-01-2026', '--no-cloudscraper', '--http2']) == race_cli.EXIT_USAGE
+    assert race_cli.main(['--start', '01-01-2026', '--http2']) == race_cli.EXIT_USAGE
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Process-wide HTTP transport shared by the scrapers
+Keeps one pool of keep-alive connections per process, so every new scraper
+and every new date range reuses warm connections instead of repeating the
+TCP and TLS handshakes. HTTP/2 is used when httpx and h2 are installed and
+asked for.
+"""
+
+import socket
+import ssl
+import threading
+from importlib.util import find_spec
+from typing import Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+
+# Optional packages are imported when a session that needs them is created; checking here is free
+BROTLI_AVAILABLE = find_spec('brotli') is not None or find_spec('brotlicffi') is not None
+HTTPX_AVAILABLE = find_spec('httpx') is not None
+H2_AVAILABLE = find_spec('h2') is not None
+
+# Only advertise what can be decoded: without brotli a 'br' response would come back as raw bytes
+ACCEPT_ENCODING = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+
+
+def keepalive_socket_options(idle: int = 60, interval: int = 15, count: int = 4) -> List[Tuple[int, int, int]]:
+    """
+    Socket options that turn on TCP keep-alive probes, on top of urllib3's defaults
+
+    Idle pooled connections are then noticed as dead by the OS instead of
+    failing the next request that picks them up.
+    """
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', interval), ('TCP_KEEPCNT', count)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with a sized connection pool and optional socket options"""
+
+    def __init__(self, pool_connections: int, pool_maxsize: int, pool_block: bool = False,
+                 socket_options: List[Tuple[int, int, int]] = None):
+        # Set first: HTTPAdapter.__init__ already builds the pool manager
+        self.socket_options = socket_options
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options:
+            kwargs.setdefault('socket_options', self.socket_options)
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Http2Session:
+    """
+    requests-style get() over an httpx client with HTTP/2
+
+    Responses and errors are converted to their requests equivalents, so
+    retries, the SSL fallback and metrics work unchanged.
+    """
+
+    def __init__(self, pool_size: int, keepalive_expiry: float):
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.http_versions: Dict[str, int] = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, verify: bool):
+        import httpx
+
+        with self._lock:
+            if verify not in self._clients:
+                limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                                      keepalive_expiry=self.keepalive_expiry)
+                self._clients[verify] = httpx.Client(http2=True, verify=verify, limits=limits,
+                                                     follow_redirects=True)
+            return self._clients[verify]
+
+    def get(self, url: str, verify: bool = True, headers: Dict[str, str] = None, timeout: float = None,
+            **kwargs) -> requests.Response:
+        import httpx
+
+        client = self._client(verify)
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            reply = client.get(url, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.ConnectError as e:
+            if isinstance(e.__context__, ssl.SSLError) or 'CERTIFICATE_VERIFY_FAILED' in str(e):
+                raise requests.exceptions.SSLError(str(e)) from e
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.http_versions[reply.http_version] = self.http_versions.get(reply.http_version, 0) + 1
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.headers = CaseInsensitiveDict(reply.headers)
+        response._content = reply.content
+        response.url = str(reply.url)
+        response.reason = reply.reason_phrase
+        response.elapsed = reply.elapsed
+        return response
+
+    def pool_stats(self) -> List[Dict]:
+        """Counted here rather than read from httpx, whose pool internals are private"""
+        with self._lock:
+            if not self.requests:
+                return []
+            return [{'session': 'http2', 'host': '*', 'pool_size': self.pool_size, 'requests': self.requests,
+                     'in_use': self.in_flight, 'max_in_use': self.max_in_flight,
+                     'http_versions': dict(self.http_versions)}]
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+
+
+class Transport:
+    """
+    Shared sessions and connection pools for every scraper in the process
+
+    One set of pooled adapters is kept per kind (plain requests, cloudscraper,
+    or HTTP/2 through httpx), so connections opened for one date range are
+    reused by the next one. requests.Session isn't thread-safe, so every
+    thread gets its own session. The sessions mount the shared adapters and
+    share one cookie jar (CookieJar locks internally). Pool sizes, TCP
+    keep-alive and HTTP/2 are set here once.
+    """
+
+    def __init__(self, pool_size: int = 16, max_hosts: int = 8, block: bool = False,
+                 tcp_keepalive: bool = True, http2: bool = False, keepalive_expiry: float = 60.0):
+        """
+        Args:
+            pool_size: Connections kept per host (default: 16)
+            max_hosts: Hosts whose pools are kept at once (default: 8)
+            block: Wait for a free pooled connection instead of opening an extra one (default: False)
+            tcp_keepalive: Send TCP keep-alive probes on idle connections (default: True)
+            http2: Send plain (non-cloudscraper) requests over HTTP/2; needs httpx and h2 (default: False)
+            keepalive_expiry: Seconds an idle HTTP/2 connection is kept (default: 60)
+
+        Raises:
+            ImportError: If http2 is asked for without httpx and h2 installed
+        """
+        if http2 and not (HTTPX_AVAILABLE and H2_AVAILABLE):
+            raise ImportError("HTTP/2 requires httpx with h2: pip install 'httpx[http2]'")
+        self.pool_size = pool_size
+        self.max_hosts = max_hosts
+        self.block = block
+        self.socket_options = keepalive_socket_options() if tcp_keepalive else None
+        self.http2 = http2
+        self.keepalive_expiry = keepalive_expiry
+        # Per kind: the mounted adapters (prefix -> adapter) and the cookie jar every thread's session shares
+        self._pools: Dict[str, Tuple[Dict[str, HTTPAdapter], RequestsCookieJar]] = {}
+        self._http2: Http2Session = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def session(self, cloudscraper: bool = False):
+        """
+        This thread's session of a kind, created on first use
+
+        Args:
+            cloudscraper: A cloudscraper session instead of the plain one (default: False)
+
+        Returns:
+            A requests.Session or cloudscraper session for the calling thread, or the
+            Http2Session (httpx clients are thread-safe, so that one is shared)
+        """
+        kind = 'cloudscraper' if cloudscraper else 'http2' if self.http2 else 'requests'
+        with self._lock:
+            if kind == 'http2':
+                if self._http2 is None:
+                    self._http2 = Http2Session(self.pool_size, self.keepalive_expiry)
+                return self._http2
+            sessions = self._local.__dict__.setdefault('sessions', {})
+            if kind not in sessions:
+                sessions[kind] = self._create(kind)
+            return sessions[kind]
+
+    def _create(self, kind: str):
+        if kind == 'cloudscraper':
+            import cloudscraper
+
+            session = cloudscraper.create_scraper(browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False})
+            if kind not in self._pools:
+                # Keep cloudscraper's own TLS adapter (its cipher suite is part of the bypass); only resize its pool
+                for adapter in session.adapters.values():
+                    if isinstance(adapter, HTTPAdapter):
+                        adapter._pool_connections, adapter._pool_maxsize = self.max_hosts, self.pool_size
+                        adapter._pool_block = self.block
+                        options = {'socket_options': self.socket_options} if self.socket_options else {}
+                        adapter.init_poolmanager(self.max_hosts, self.pool_size, block=self.block, **options)
+        else:
+            session = requests.Session()
+            if kind not in self._pools:
+                adapter = PooledAdapter(self.max_hosts, self.pool_size, self.block, self.socket_options)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+
+        if kind not in self._pools:
+            self._pools[kind] = (dict(session.adapters), session.cookies)
+        else:
+            adapters, cookies = self._pools[kind]
+            for prefix, adapter in adapters.items():
+                session.mount(prefix, adapter)
+            session.cookies = cookies
+        return session
+
+    def pool_stats(self) -> List[Dict]:
+        """
+        Utilization of every connection pool
+
+        Returns:
+            One dictionary per host and session kind: pool_size, in_use (connections
+            checked out right now), idle (open and waiting), opened (connections made
+            so far), requests and reuse (share of requests that didn't open a connection)
+        """
+        with self._lock:
+            pools = [(kind, adapters) for kind, (adapters, _) in self._pools.items()]
+            http2 = self._http2
+        stats = http2.pool_stats() if http2 is not None else []
+        for kind, adapters in pools:
+            seen = set()
+            for adapter in adapters.values():
+                if id(adapter) in seen or not isinstance(adapter, HTTPAdapter):
+                    continue
+                seen.add(id(adapter))
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    queued = list(pool.pool.queue) if pool.pool is not None else []
+                    stats.append({
+                        'session': kind,
+                        'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                        'pool_size': pool.pool.maxsize if pool.pool is not None else 0,
+                        # urllib3 fills the queue with placeholders, so whatever is missing is checked out
+                        'in_use': (pool.pool.maxsize - len(queued)) if pool.pool is not None else 0,
+                        'idle': sum(1 for connection in queued if connection is not None),
+                        'opened': pool.num_connections,
+                        'requests': pool.num_requests,
+                        'reuse': round(1 - pool.num_connections / pool.num_requests, 3) if pool.num_requests else 0.0,
+                    })
+        return stats
+
+    def summary(self) -> str:
+        """One line per connection pool"""
+        lines = []
+        for pool in self.pool_stats():
+            if 'http_versions' in pool:
+                versions = ', '.join(f"{count} over {version}" for version, count in sorted(pool['http_versions'].items()))
+                lines.append(f"{pool['session']}: {pool['requests']} requests ({versions}), "
+                             f"up to {pool['max_in_use']}/{pool['pool_size']} in flight")
+            else:
+                lines.append(f"{pool['session']} {pool['host']}: {pool['requests']} requests over "
+                             f"{pool['opened']} connections ({pool['reuse']:.0%} reused), "
+                             f"{pool['in_use']}/{pool['pool_size']} in use, {pool['idle']} idle")
+        return '\n'.join(lines) or "No connections opened"
+
+    def close(self):
+        """Close the pooled connections; sessions asked for afterwards start new pools"""
+        with self._lock:
+            for adapters, _ in self._pools.values():
+                for adapter in set(adapters.values()):
+                    adapter.close()
+            self._pools.clear()
+            if self._http2 is not None:
+                self._http2.close()
+                self._http2 = None
+            self._local = threading.local()
+
+
+# Shared by every scraper in the process unless one is given its own
+_shared = Transport()
+
+
+def shared_transport() -> Transport:
+    """The process-wide transport"""
+    return _shared
+
+
+def configure(**options) -> Transport:
+    """
+    Replace the process-wide transport, e.g. configure(pool_size=32, http2=True)
+
+    Scrapers created afterwards use the new one; existing scrapers keep theirs.
+
+    Args:
+        **options: Passed to Transport
+
+    Returns:
+        The new process-wide transport
+    """
+    global _shared
+    previous, _shared = _shared, Transport(**options)
+    previous.close()
+    return _shared